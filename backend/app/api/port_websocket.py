@@ -1,49 +1,149 @@
 """WebSocket endpoint for real-time port change notifications."""
 import asyncio
+import json
+import logging
+from typing import Optional
 from fastapi import WebSocket, WebSocketDisconnect
+from app.api.websocket import frame_compressor
+from app.config import get_settings
+from app.services.compression import COMPRESS_SUBPROTOCOL, FrameCompressor
+from app.services.port_inventory import diff_ports, get_port_inventory
 from app.services.port_monitor import PortMonitor
-from app.backends.serial_backend import SerialBackend
+
+logger = logging.getLogger(__name__)
 
 
 # Global port monitor instance
 _port_monitor: PortMonitor = None
-_connected_clients: set[WebSocket] = set()
+# Connected clients and their compressor (None for plain JSON text frames)
+_connected_clients: dict[WebSocket, Optional[FrameCompressor]] = {}
+# Inventory generation each client holds, the base for delta updates
+_client_generations: dict[WebSocket, int] = {}
+# Snapshot of the last broadcast
+_last_broadcast: dict = {"generation": 0, "ports": []}
+# One broadcast at a time keeps every client's updates in order
+_broadcast_lock = asyncio.Lock()
+
+
+def _serialize(message: dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+
+async def _send_frame(client: WebSocket, payload: bytes) -> None:
+    """Send a serialized JSON message, compressed for clients that opted in."""
+    compressor = _connected_clients.get(client)
+    if compressor:
+        await client.send_bytes(compressor.encode(payload))
+    else:
+        await client.send_text(payload.decode('utf-8'))
+
+
+async def _send_message(client: WebSocket, message: dict) -> None:
+    """Send a JSON message, compressed for clients that opted in."""
+    await _send_frame(client, _serialize(message))
+
+
+async def _send_update(client: WebSocket, full: bytes, delta: bytes, base: int,
+                       generation: int, timeout: float) -> None:
+    """Send the delta if the client holds the base snapshot, else everything."""
+    payload = delta if _client_generations.get(client) == base else full
+    await asyncio.wait_for(_send_frame(client, payload), timeout)
+    _client_generations[client] = generation
+
+
+def _drop_client(client: WebSocket) -> None:
+    """Forget a failed client; it gets the full list when it reconnects."""
+    _connected_clients.pop(client, None)
+    _client_generations.pop(client, None)
+
+    async def close():
+        try:
+            await asyncio.wait_for(client.close(code=1011), 1.0)
+        except Exception:
+            pass
+
+    asyncio.create_task(close())
 
 
 async def broadcast_port_changes(ports: list[dict]):
-    """Broadcast port changes to all connected clients."""
-    global _connected_clients
-    
+    """Broadcast port changes to all connected clients.
+
+    Messages are serialized once and sent to every client concurrently, so
+    a stalled browser only delays itself; clients that miss the send
+    timeout are disconnected. Clients holding the previous snapshot get a
+    "ports_delta" message instead of the full list.
+    """
+    global _last_broadcast
+
+    async with _broadcast_lock:
+        inventory = get_port_inventory()
+        # Always announce the latest snapshot; updates queued behind a slow
+        # broadcast collapse into one
+        previous = _last_broadcast
+        current = {"generation": inventory.generation, "ports": inventory.ports}
+        if current["generation"] == previous["generation"]:
+            return
+        _last_broadcast = current
+
+        if not _connected_clients:
+            logger.debug("Port monitor: %s ports detected, but no clients connected", len(current['ports']))
+            return
+
+        full = _serialize({"type": "ports_changed", **current})
+        delta = _serialize({
+            "type": "ports_delta",
+            "generation": current["generation"],
+            "base_generation": previous["generation"],
+            **diff_ports(previous["ports"], current["ports"]),
+        })
+        timeout = get_settings().ws_ports_send_timeout
+        clients = list(_connected_clients)
+        results = await asyncio.gather(
+            *(_send_update(client, full, delta, previous["generation"], current["generation"], timeout)
+              for client in clients),
+            return_exceptions=True,
+        )
+
+    failed = [client for client, result in zip(clients, results) if isinstance(result, BaseException)]
+    for client in failed:
+        _drop_client(client)
+    logger.info("Port monitor: Sent %d ports (generation %d) to %d client(s), dropped %d",
+                len(current['ports']), current['generation'], len(clients) - len(failed), len(failed))
+
+
+async def _broadcast_event(message: dict) -> None:
+    """Send one message to every client concurrently, dropping stalled ones."""
     if not _connected_clients:
-        print(f"Port monitor: {len(ports)} ports detected, but no clients connected")
         return
-    
-    message = {
-        "type": "ports_changed",
-        "ports": ports
-    }
-    
-    print(f"Port monitor: Broadcasting {len(ports)} ports to {len(_connected_clients)} client(s)")
-    
-    # Send to all connected clients
-    disconnected = set()
-    for client in _connected_clients:
-        try:
-            await client.send_json(message)
-            print(f"Port monitor: Successfully sent update to client")
-        except Exception as e:
-            print(f"Error sending port update to client: {e}")
-            disconnected.add(client)
-    
-    # Remove disconnected clients
-    _connected_clients -= disconnected
+    payload = _serialize(message)
+    timeout = get_settings().ws_ports_send_timeout
+    async with _broadcast_lock:
+        clients = list(_connected_clients)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(_send_frame(client, payload), timeout) for client in clients),
+            return_exceptions=True,
+        )
+    for client, result in zip(clients, results):
+        if isinstance(result, BaseException):
+            _drop_client(client)
+
+
+def broadcast_trigger_updates(updates: list[dict]) -> None:
+    """Trigger registry listener: push changed counters and values to clients."""
+    asyncio.get_running_loop().create_task(_broadcast_event({"type": "triggers", "updates": updates}))
 
 
 def get_port_monitor() -> PortMonitor:
     """Get or create the global port monitor instance."""
     global _port_monitor
     if _port_monitor is None:
-        _port_monitor = PortMonitor(broadcast_port_changes)
+        settings = get_settings()
+        _port_monitor = PortMonitor(
+            broadcast_port_changes,
+            mode=settings.port_monitor_mode,
+            debounce=settings.port_monitor_debounce_ms / 1000,
+            poll_interval=settings.port_monitor_poll_interval,
+        )
         _port_monitor.start()
     return _port_monitor
 
@@ -52,24 +152,35 @@ async def port_websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for port change notifications."""
     global _connected_clients
     
-    await websocket.accept()
-    _connected_clients.add(websocket)
-    print(f"Port WebSocket: Client connected. Total clients: {len(_connected_clients)}")
+    offered = websocket.scope.get('subprotocols') or []
+    compression = get_settings().ws_compression_enabled
+    subprotocol = COMPRESS_SUBPROTOCOL if compression and COMPRESS_SUBPROTOCOL in offered else None
+    await websocket.accept(subprotocol=subprotocol)
+    try:
+        _connected_clients[websocket] = frame_compressor(websocket, subprotocol)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close()
+        return
+    logger.debug("Port WebSocket: Client connected. Total clients: %s", len(_connected_clients))
     
     # Get port monitor (starts it if not already running)
     monitor = get_port_monitor()
-    print("Port WebSocket: Port monitor started/retrieved")
+    logger.debug("Port WebSocket: Port monitor started/retrieved")
     
     # Send initial port list
     try:
-        ports = SerialBackend.list_ports()
-        print(f"Port WebSocket: Sending initial {len(ports)} ports to client")
-        await websocket.send_json({
-            "type": "ports_changed",
-            "ports": ports
-        })
+        # Under the broadcast lock so no update can overtake the snapshot
+        async with _broadcast_lock:
+            snapshot = await get_port_inventory().snapshot()
+            logger.debug("Port WebSocket: Sending initial %s ports to client", len(snapshot['ports']))
+            await asyncio.wait_for(_send_message(websocket, {
+                "type": "ports_changed",
+                **snapshot
+            }), get_settings().ws_ports_send_timeout)
+            _client_generations[websocket] = snapshot["generation"]
     except Exception as e:
-        print(f"Error sending initial ports: {e}")
+        logger.error("Error sending initial ports: %s", e)
     
     try:
         # Keep connection alive and handle any incoming messages
@@ -82,15 +193,16 @@ async def port_websocket_endpoint(websocket: WebSocket):
                     await websocket.send_text("pong")
             except asyncio.TimeoutError:
                 # Send keepalive
-                await websocket.send_json({"type": "keepalive"})
+                await _send_message(websocket, {"type": "keepalive"})
             except WebSocketDisconnect:
                 break
     except WebSocketDisconnect:
         pass
     except Exception as e:
-        print(f"Port WebSocket error: {e}")
+        logger.error("Port WebSocket error: %s", e)
     finally:
-        _connected_clients.discard(websocket)
+        _connected_clients.pop(websocket, None)
+        _client_generations.pop(websocket, None)
         # If no clients connected, we could stop the monitor, but let's keep it running
         # in case clients reconnect quickly
 
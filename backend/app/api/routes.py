@@ -1,10 +1,17 @@
+import asyncio
+import logging
 from typing import Optional
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Response
+from pydantic import BaseModel, Field
+from app.logging_config import logging_stats
 from app.services.connection_manager import ConnectionManager
+from app.services.port_inventory import get_port_inventory
+from app.services.timeseries import DEFAULT_POINTS
 from app.backends.serial_backend import SerialBackend
 from app.version import get_version_info
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 connection_manager = ConnectionManager()
 
@@ -16,25 +23,96 @@ class ConnectionRequest(BaseModel):
     log_file: Optional[str] = None
     log_mode: str = "printable"
     log_tx: bool = True
+    history_size: Optional[int] = Field(default=None, gt=0)
+    scrollback: Optional[bool] = None
+    log_max_bytes: Optional[int] = None
+    log_rotate_interval: Optional[float] = None
+    telnet_mode: Optional[str] = None
+    auto_reconnect: Optional[bool] = None
+    # Line settings; left unset they keep the port (or server) defaults
+    bytesize: Optional[int] = None
+    parity: Optional[str] = None
+    stopbits: Optional[float] = None
+    xonxoff: Optional[bool] = None
+    rtscts: Optional[bool] = None
+
+
+class ShareRequest(BaseModel):
+    port: str
+    listen_port: int = 0
+    mode: str = "raw"
+    host: Optional[str] = None
+    tx_policy: Optional[str] = None
+
+
+class TriggerRuleModel(BaseModel):
+    id: str
+    type: str
+    port: str = "all"
+    pattern: str = ""
+    regex: bool = False
+    alert_pattern: str = ""
+    end: str = ""
+    response: str = ""
+    reset_after: float = 5.0
+    cooldown: float = 0.0
+    enabled: bool = True
+    count: int = 0
+    series: str = ""
+
+
+class TriggerRulesRequest(BaseModel):
+    rules: list[TriggerRuleModel]
+
+
+class TriggerResetRequest(BaseModel):
+    id: Optional[str] = None
+
+
+class SeriesClearRequest(BaseModel):
+    port: Optional[str] = None
+    series: Optional[str] = None
+
+
+# Largest scrollback range returned by a single request
+SCROLLBACK_READ_LIMIT = 4 * 1024 * 1024
 
 
 @router.get("/ports")
-async def list_ports():
-    """List available serial ports."""
-    ports = ConnectionManager.list_ports()
-    return {"ports": ports}
+async def list_ports(refresh: bool = False):
+    """List available serial ports from the shared inventory.
+
+    The port monitor keeps the inventory current; refresh=true forces a
+    rescan (off the event loop) for an explicit user request.
+    """
+    inventory = get_port_inventory()
+    if refresh:
+        await inventory.refresh()
+    return await inventory.snapshot()
 
 
 @router.post("/connect")
 async def connect(request: ConnectionRequest):
     """Connect to serial port or telnet host."""
+    line_settings = {
+        name: getattr(request, name)
+        for name in ('bytesize', 'parity', 'stopbits', 'xonxoff', 'rtscts')
+        if getattr(request, name) is not None
+    }
     success = await connection_manager.connect(
         port=request.port,
         baudrate=request.baudrate,
         connection_type=request.connection_type,
         log_file=request.log_file,
         log_mode=request.log_mode,
-        log_tx=request.log_tx
+        log_tx=request.log_tx,
+        history_size=request.history_size,
+        scrollback=request.scrollback,
+        log_max_bytes=request.log_max_bytes,
+        log_rotate_interval=request.log_rotate_interval,
+        telnet_mode=request.telnet_mode,
+        auto_reconnect=request.auto_reconnect,
+        **line_settings
     )
     if success:
         return {"status": "connected", "port": request.port}
@@ -61,29 +139,172 @@ async def disconnect(request: Optional[ConnectionRequest] = None):
     return {"status": "disconnected", "port": port}
 
 
+@router.post("/share")
+async def share_port(request: ShareRequest):
+    """Re-publish a connected port on a local TCP socket (raw or RFC 2217)."""
+    try:
+        share = await connection_manager.share(
+            request.port, request.listen_port, request.mode,
+            host=request.host, tx_policy=request.tx_policy
+        )
+    except (RuntimeError, ValueError, OSError) as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "shared", **share.stats()}
+
+
+@router.post("/unshare")
+async def unshare_port(request: ShareRequest):
+    """Stop re-publishing a port."""
+    await connection_manager.unshare(request.port)
+    return {"status": "unshared", "port": request.port}
+
+
+@router.get("/triggers")
+async def get_triggers():
+    """Server-side counter, slicer and auto-response rules with their state."""
+    triggers = connection_manager.triggers
+    return {"rules": triggers.snapshot(), "engines": triggers.stats()}
+
+
+@router.put("/triggers")
+async def set_triggers(request: TriggerRulesRequest):
+    """Replace the trigger rules; rules keeping their id keep their state."""
+    try:
+        connection_manager.triggers.set_rules([rule.model_dump() for rule in request.rules])
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "updated", "rules": connection_manager.triggers.snapshot()}
+
+
+@router.post("/triggers/reset")
+async def reset_triggers(request: TriggerResetRequest):
+    """Reset one rule's count and value, or all rules."""
+    connection_manager.triggers.reset(request.id)
+    return {"status": "reset", "id": request.id}
+
+
+@router.get("/series")
+async def list_series():
+    """Time series recorded by slice rules, with their sample count and time range."""
+    return {"series": connection_manager.triggers.series.list()}
+
+
+@router.get("/series/query")
+async def query_series(
+    port: str,
+    series: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    points: int = DEFAULT_POINTS,
+    mode: str = "lttb"
+):
+    """Samples of a series between start and end (unix time), downsampled to points."""
+    try:
+        return connection_manager.triggers.series.query(port, series, start, end, points, mode)
+    except KeyError as e:
+        return {"status": "error", "message": e.args[0]}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+
+@router.post("/series/clear")
+async def clear_series(request: SeriesClearRequest):
+    """Delete recorded series; without port or series, all of them."""
+    cleared = connection_manager.triggers.series.clear(request.port, request.series)
+    return {"status": "cleared", "series": cleared}
+
+
 @router.get("/status")
 async def get_status():
     """Get status of all active serial connections."""
     active_sessions = []
     for port, backend in connection_manager.backends.items():
-        if backend.is_connected():
+        if backend.is_connected() or backend.reconnecting:
             baudrate = getattr(backend, 'serial_port', None)
             baudrate = baudrate.baudrate if baudrate else getattr(backend, 'baudrate', None)
             
             # If still None (Telnet), maybe just skip or use default
             
-            active_sessions.append({
+            session = {
                 "port": port,
                 "baudrate": baudrate,
-                "connected": True
-            })
+                "connected": backend.is_connected()
+            }
+            if hasattr(backend, 'reconnect_stats'):
+                session["reconnect"] = backend.reconnect_stats()
+            tx_worker = getattr(backend, 'tx_worker', None)
+            if tx_worker:
+                session["tx"] = tx_worker.stats()
+            port_settings = getattr(backend, 'port_settings', None)
+            if port_settings:
+                session["line"] = port_settings
+            active_sessions.append(session)
+    
+    from app.api.websocket import get_terminal_client_stats
     
     return {
         "sessions": active_sessions,
-        "any_connected": len(active_sessions) > 0
+        "any_connected": len(active_sessions) > 0,
+        "clients": get_terminal_client_stats(),
+        "io": connection_manager.io_runtime.stats(),
+        "workers": connection_manager.worker_pool.stats() if connection_manager.worker_pool else [],
+        "shares": [share.stats() for share in connection_manager.shares.values()],
+        "logging": logging_stats()
     }
 
 
+@router.get("/scrollback/info")
+async def scrollback_info(port: str):
+    """Describe the disk-backed scrollback range of a connection."""
+    backend = connection_manager.get_backend(port)
+    if not backend or not backend.scrollback:
+        return {"status": "error", "message": "Scrollback not enabled for this connection"}
+    # The store's lock is shared with its writer thread, so stay off the loop
+    info = await asyncio.get_running_loop().run_in_executor(None, backend.scrollback.info)
+    return {"status": "ok", "port": port, **info}
+
+
+@router.get("/scrollback")
+async def read_scrollback(
+    port: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = SCROLLBACK_READ_LIMIT
+):
+    """Read raw scrollback bytes by absolute offset and/or unix time range.
+    
+    The actual range returned is reported in the X-Scrollback-Start and
+    X-Scrollback-End headers so clients can page through the history.
+    """
+    backend = connection_manager.get_backend(port)
+    if not backend or not backend.scrollback:
+        return {"status": "error", "message": "Scrollback not enabled for this connection"}
+    
+    store = backend.scrollback
+    
+    def read_range():
+        # Takes the store's lock and copies up to SCROLLBACK_READ_LIMIT bytes
+        # out of mmapped segments, so it runs in a thread
+        range_start, range_end = start, end
+        if since is not None:
+            range_start = max(range_start or 0, store.offset_at(since))
+        if until is not None:
+            range_end = min(range_end if range_end is not None else store.end, store.offset_at(until))
+        return store.read(range_start, range_end, min(limit, SCROLLBACK_READ_LIMIT))
+    
+    actual_start, data = await asyncio.get_running_loop().run_in_executor(None, read_range)
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={
+            "X-Scrollback-Start": str(actual_start),
+            "X-Scrollback-End": str(actual_start + len(data)),
+        }
+    )
+
+
 @router.get("/browse")
 async def browse_file():
     """Open a file save dialog via pywebview."""
@@ -110,7 +331,7 @@ async def browse_file():
         error_msg = str(e)
         if "window" in error_msg:
             error_msg = "Native file dialog is only available in the standalone application. Please enter the log path manually."
-        print(f"Browse error: {e}")
+        logger.error("Browse error: %s", e)
         return {"path": None, "error": error_msg}
         
     return {"path": None}
@@ -1,12 +1,169 @@
 """WebSocket endpoint for real-time serial communication."""
 import asyncio
+import codecs
+import logging
+import time
+from typing import Optional
 from fastapi import WebSocket, WebSocketDisconnect
 from app.api.routes import get_connection_manager
+from app.backends.transmit import TX_MERGE_LIMIT
+from app.config import get_settings
+from app.services import metrics
+from app.services.batching import BatchPolicy, FrameBatcher
+from app.services.compression import COMPRESS_SUBPROTOCOL, FrameCompressor
+
+logger = logging.getLogger(__name__)
+
+# Subprotocols a terminal client may offer. With "zfield.binary" terminal
+# data travels as raw bytes in binary frames and text frames only carry JSON
+# control messages; with "zfield.text" (or none) data is sent as UTF-8 text.
+# "zfield.deflate" is "zfield.binary" with compressed frames (see
+# app.services.compression); it is only accepted while
+# ZFIELD_WS_COMPRESSION_ENABLED is set.
+BINARY_SUBPROTOCOL = "zfield.binary"
+TEXT_SUBPROTOCOL = "zfield.text"
+
+# Client input allowed in flight to the backend before reading pauses
+TX_WINDOW_BYTES = TX_MERGE_LIMIT
+
+# Frame batchers of the terminal clients currently attached, for diagnostics
+_terminal_clients: dict[FrameBatcher, tuple[str, "TerminalSender"]] = {}
+# Counters of the clients that have left, per port, so totals never go back
+_departed_totals: dict[str, dict[str, int]] = {}
+TOTAL_KEYS = ("frames", "bytes", "dropped_bytes", "spilled_bytes",
+              # Only clients that opted into compression report these
+              "uncompressed_bytes", "compressed_bytes", "compression_cpu_ms")
+
+
+def _batch_policy(websocket: WebSocket) -> BatchPolicy:
+    """Build the session's batching policy from settings and query overrides.
+    
+    Query parameters: batch_latency (milliseconds) and batch_bytes.
+    """
+    settings = get_settings()
+    latency_ms = websocket.query_params.get('batch_latency', settings.ws_batch_max_latency_ms)
+    max_bytes = websocket.query_params.get('batch_bytes', settings.ws_batch_max_bytes)
+    return BatchPolicy(max_latency=float(latency_ms) / 1000, max_bytes=int(max_bytes))
+
+
+def frame_compressor(websocket: WebSocket, subprotocol: Optional[str]) -> Optional[FrameCompressor]:
+    """Build a compressor if the client opted into compression.
+    
+    Clients opt in with the "zfield.deflate" subprotocol or ?compress=deflate
+    while the server allows it; compress_threshold overrides the configured
+    size threshold.
+    """
+    settings = get_settings()
+    if not settings.ws_compression_enabled:
+        return None
+    if subprotocol != COMPRESS_SUBPROTOCOL and websocket.query_params.get('compress') != 'deflate':
+        return None
+    threshold = websocket.query_params.get('compress_threshold', settings.ws_compression_threshold)
+    return FrameCompressor(threshold=int(threshold), level=settings.ws_compression_level)
+
+
+def get_terminal_client_stats() -> list[dict]:
+    """Batching and compression statistics for every attached terminal client."""
+    return [
+        {
+            "port": port,
+            **sender.stats(),
+            **batcher.stats(),
+            **batcher.subscription.stats(),
+        }
+        for batcher, (port, sender) in _terminal_clients.items()
+    ]
+
+
+def get_terminal_port_stats() -> list[dict]:
+    """Terminal client counters summed per port, including departed clients."""
+    ports = {port: {"port": port, "clients": 0, "pending": 0, **totals}
+             for port, totals in _departed_totals.items()}
+    for client in get_terminal_client_stats():
+        port = client["port"]
+        if port not in ports:
+            ports[port] = {"port": port, "clients": 0, "pending": 0, **dict.fromkeys(TOTAL_KEYS, 0)}
+        totals = ports[port]
+        totals["clients"] += 1
+        totals["pending"] += client["pending"]
+        for key in TOTAL_KEYS:
+            totals[key] += client.get(key, 0)
+    for totals in ports.values():
+        compressed = totals["compressed_bytes"]
+        totals["compression_ratio"] = round(totals["uncompressed_bytes"] / compressed, 2) if compressed else None
+    return list(ports.values())
+
+
+def forget_terminal_port(port: str) -> None:
+    """Drop the departed-client totals of a port that has been disconnected."""
+    _departed_totals.pop(port, None)
+
+
+def _select_frame_mode(websocket: WebSocket) -> tuple[bool, Optional[str]]:
+    """Pick binary or text framing from the client's offer.
+    
+    Returns:
+        Tuple of (binary, subprotocol to accept)
+    """
+    compression = get_settings().ws_compression_enabled
+    for offered in websocket.scope.get('subprotocols') or []:
+        if offered == BINARY_SUBPROTOCOL or (compression and offered == COMPRESS_SUBPROTOCOL):
+            return True, offered
+        if offered == TEXT_SUBPROTOCOL:
+            return False, offered
+    # Clients that cannot set subprotocols may ask via the query string
+    compressed = compression and websocket.query_params.get('compress') == 'deflate'
+    return compressed or websocket.query_params.get('frames') == 'binary', None
+
+
+class TerminalSender:
+    """Sends terminal data as binary frames (optionally compressed) or incrementally decoded text."""
+    
+    def __init__(self, websocket: WebSocket, binary: bool, compressor: Optional[FrameCompressor] = None):
+        self.websocket = websocket
+        self.binary = binary
+        self.compressor = compressor
+        # Keeps a multibyte character split across batches intact
+        self._decoder = None if binary else codecs.getincrementaldecoder('utf-8')(errors='replace')
+    
+    async def send(self, data: bytes) -> None:
+        """Send a batch of terminal data."""
+        if self.compressor:
+            await self.websocket.send_bytes(self.compressor.encode(data))
+            return
+        if self.binary:
+            await self.websocket.send_bytes(data)
+            return
+        text = self._decoder.decode(data)
+        if text:
+            await self.websocket.send_text(text)
+    
+    def stats(self) -> dict:
+        """Framing counters for diagnostics."""
+        framing = "deflate" if self.compressor else "binary" if self.binary else "text"
+        return {"framing": framing, **(self.compressor.stats() if self.compressor else {})}
+
+
+async def _receive_bytes(websocket: WebSocket) -> bytes:
+    """Receive one client message as bytes, whether sent as text or binary."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return message["bytes"]
+    return (message.get("text") or "").encode('utf-8')
 
 
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for serial communication."""
-    await websocket.accept()
+    binary, subprotocol = _select_frame_mode(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    try:
+        sender = TerminalSender(websocket, binary, frame_compressor(websocket, subprotocol))
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close()
+        return
     
     # Get port from query params
     port = websocket.query_params.get('port')
@@ -31,85 +188,123 @@ async def websocket_endpoint(websocket: WebSocket):
         return
     
     # Log connection status
-    print(f"WebSocket connected for port: {port}")
+    logger.info("WebSocket connected for port: %s (%s frames)", port, sender.stats()['framing'])
+
+    # Subscribe with our own cursor; starting at the oldest buffered byte
+    # replays the history without racing against newly received data
+    settings = get_settings()
+    policy = websocket.query_params.get('overflow') or settings.ws_slow_consumer_policy
+    try:
+        batch_policy = _batch_policy(websocket)
+        budget = int(websocket.query_params.get('budget', settings.ws_queue_budget_bytes)) or None
+        subscription = backend.subscribe(name=f"ws:{port}", policy=policy, replay_history=True, max_lag=budget)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close()
+        return
 
-    # Replay history to new connection
-    history = backend.get_history()
+    history = subscription.read()
     if history:
-        await websocket.send_text(history.decode('utf-8', errors='replace'))
+        await sender.send(history)
     else:
         # If no history, send an initial enter to trigger the prompt
         await backend.send(b'\r')
     
-    # Queue for received data from serial port
-    data_queue = asyncio.Queue(maxsize=1000)
-    
-    def sync_callback(data: bytes):
-        """Callback for serial data - queues data for async processing."""
-        try:
-            try:
-                data_queue.put_nowait(data)
-            except asyncio.QueueFull:
-                print(f"WARNING: Data queue full for {port}, dropping data")
-        except Exception as e:
-            print(f"Error in callback for {port}: {e}")
-    
-    # Set the callback for THIS SPECIFIC backend instance
-    backend.set_data_callback(sync_callback)
-    
-    # Task to process queued data and send to WebSocket
+    # Task to read from our subscription and send to WebSocket
     async def send_data_task():
-        """Task to send queued serial data to WebSocket."""
+        """Task to send batched serial data to WebSocket."""
         while True:
             try:
-                # Get first item (blocking)
-                data = await data_queue.get()
-                
-                # Try to get more items if available immediately (up to 50 items or ~32KB to avoid latency)
-                # This creates a "batch" of data to send in one frame
-                batch_buffer = [data]
-                curr_size = len(data)
-                
-                try:
-                    # Collect pending items without blocking
-                    while not data_queue.empty() and len(batch_buffer) < 50 and curr_size < 32768:
-                        next_data = data_queue.get_nowait()
-                        batch_buffer.append(next_data)
-                        curr_size += len(next_data)
-                except asyncio.QueueEmpty:
-                    pass
-                
-                # Combine all chunks
-                combined_data = b''.join(batch_buffer)
+                combined_data = await batcher.next_frame()
                 
                 try:
-                    text_data = combined_data.decode('utf-8', errors='replace')
-                    await websocket.send_text(text_data)
+                    if combined_data:
+                        started = time.perf_counter()
+                        await sender.send(combined_data)
+                        if metrics.enabled:
+                            metrics.FRAME_BYTES.observe(len(combined_data), port)
+                            metrics.SEND_SECONDS.observe(time.perf_counter() - started, port)
                 except Exception as e:
-                    print(f"ERROR: Failed to send to WebSocket ({port}): {e}")
+                    logger.error("Failed to send to WebSocket (%s): %s", port, e)
+                    break
+                
+                if subscription.closed:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": subscription.close_reason or "Subscription closed"
+                    })
+                    await websocket.close()
                     break
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"ERROR in send_data_task ({port}): {e}")
+                logger.error("Error in send_data_task (%s): %s", port, e)
                 break
     
+    # Name used for TX arbitration when the port is also shared over TCP
+    writer_name = f"ws:{id(websocket):x}"
+    
+    async def write_to_backend(data: bytes):
+        """Write client input to the port, reporting failures to the client."""
+        if not connection_manager.claim_tx(port, writer_name):
+            await websocket.send_json({
+                "type": "error",
+                "message": f"Port {port} is in use by another writer; input dropped"
+            })
+            return
+        try:
+            await backend.send(data)
+        except Exception as e:
+            await websocket.send_json({
+                "type": "error",
+                "message": f"Error sending to serial port {port}: {str(e)}"
+            })
+    
+    # Writes and status messages still running; cancelled when the client goes
+    tasks: set[asyncio.Task] = set()
+    
+    def task_done(task: asyncio.Task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.debug("WebSocket task for %s failed: %s", port, task.exception())
+    
+    def spawn(coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(task_done)
+        return task
+    
+    def on_state(state: str):
+        """Tell the client when the port is lost and reopened."""
+        spawn(websocket.send_json({"type": "status", "state": state, "port": port}))
+    
+    backend.add_state_listener(on_state)
+    batcher = FrameBatcher(subscription, batch_policy)
+    _terminal_clients[batcher] = (port, sender)
     send_task = asyncio.create_task(send_data_task())
+    # Writes still in flight and their sizes. Not waiting for each one lets
+    # a paste coalesce in the backend's transmit queue; reading from the
+    # client pauses while a full window is outstanding.
+    writes: dict[asyncio.Task, int] = {}
     
     try:
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
+            # Receive message from client; binary frames are sent untouched
+            data = await _receive_bytes(websocket)
             
             # Send to THIS SPECIFIC serial port
             if backend.is_connected():
-                try:
-                    await backend.send(data.encode('utf-8'))
-                except Exception as e:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": f"Error sending to serial port {port}: {str(e)}"
-                    })
+                while sum(writes.values()) >= TX_WINDOW_BYTES:
+                    await asyncio.wait(writes, return_when=asyncio.FIRST_COMPLETED)
+                write = spawn(write_to_backend(data))
+                writes[write] = len(data)
+                write.add_done_callback(writes.pop)
+            elif backend.reconnecting:
+                # Stay attached; output resumes once the port is back
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"Serial port {port} is reconnecting; input dropped"
+                })
             else:
                 await websocket.send_json({
                     "type": "error",
@@ -118,9 +313,9 @@ async def websocket_endpoint(websocket: WebSocket):
                 break
     
     except WebSocketDisconnect:
-        print(f"WebSocket client disconnected for port: {port}")
+        logger.info("WebSocket client disconnected for port: %s", port)
     except Exception as e:
-        print(f"WebSocket error for port {port}: {e}")
+        logger.error("WebSocket error for port %s: %s", port, e)
     finally:
         # Clean up
         send_task.cancel()
@@ -129,6 +324,17 @@ async def websocket_endpoint(websocket: WebSocket):
         except asyncio.CancelledError:
             pass
         
-        # Only clear callback if this backend still exists and it's our callback
-        if backend and backend.data_callback == sync_callback:
-            backend.set_data_callback(None)
+        backend.remove_state_listener(on_state)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        subscription.close()
+        connection_manager.release_tx(port, writer_name)
+        _terminal_clients.pop(batcher, None)
+        # Totals of a port that was disconnected meanwhile are not kept
+        if connection_manager.get_backend(port) is backend:
+            final = {**sender.stats(), **batcher.stats(), **subscription.stats()}
+            totals = _departed_totals.setdefault(port, dict.fromkeys(TOTAL_KEYS, 0))
+            for key in TOTAL_KEYS:
+                totals[key] += final.get(key, 0)
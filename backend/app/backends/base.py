@@ -1,10 +1,37 @@
 """Base backend interface for communication backends."""
+import asyncio
+import logging
 from abc import ABC, abstractmethod
 from typing import Optional, Callable
+from .ring_buffer import RingBuffer, DEFAULT_HISTORY_SIZE
+from .data_hub import DataHub, Subscription
+from .session_log import SessionLog
+
+logger = logging.getLogger(__name__)
 
 
 class BaseBackend(ABC):
-    """Abstract base class for all communication backends."""
+    """Abstract base class for all communication backends.
+    
+    Received data flows through a DataHub whose ring buffer doubles as the
+    connection history, so any number of consumers can observe one port.
+    """
+    
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE):
+        self.history_buffer = RingBuffer(history_size)
+        self.hub = DataHub(self.history_buffer)
+        self.data_callback: Optional[Callable[[bytes], None]] = None
+        self.scrollback = None
+        self.log_file: Optional[str] = None
+        self.session_log: Optional[SessionLog] = None
+        self.log_mode = "printable"
+        self.log_tx = True
+        # True while a lost connection is being re-established
+        self.reconnecting = False
+        # Bytes and send() calls written to the device, kept across reconnects
+        self.tx_bytes = 0
+        self.tx_writes = 0
+        self._state_listeners: list[Callable[[str], None]] = []
     
     @abstractmethod
     async def connect(self, **kwargs) -> bool:
@@ -38,36 +65,99 @@ class BaseBackend(ABC):
         """
         pass
     
-    @abstractmethod
-    def set_data_callback(self, callback: Callable[[bytes], None]) -> None:
-        """Set callback function for received data.
+    def set_data_callback(self, callback: Optional[Callable[[bytes], None]]) -> None:
+        """Set the primary callback function for received data.
+        
+        Replaces the callback set by a previous call; other hub subscribers
+        are not affected.
         
         Args:
-            callback: Function to call when data is received
+            callback: Function to call when data is received, or None to clear
         """
-        pass
+        if self.data_callback:
+            self.hub.remove_callback(self.data_callback)
+        self.data_callback = callback
+        if callback:
+            self.hub.add_callback(callback)
+    
+    def add_state_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback for connection state changes.
+        
+        The callback receives "reconnecting", "connected" (after a successful
+        reconnect) or "disconnected" (reconnecting gave up).
+        """
+        self._state_listeners.append(listener)
+    
+    def remove_state_listener(self, listener: Callable[[str], None]) -> None:
+        """Remove a state change callback."""
+        if listener in self._state_listeners:
+            self._state_listeners.remove(listener)
+    
+    def _notify_state(self, state: str) -> None:
+        for listener in list(self._state_listeners):
+            try:
+                listener(state)
+            except Exception as e:
+                logger.error("Error in state listener: %s", e)
+    
+    def subscribe(self, name: str = "", policy: str = "skip", replay_history: bool = False,
+                  max_lag: Optional[int] = None) -> Subscription:
+        """Subscribe to received data with an independent cursor.
+        
+        Args:
+            name: Label used in diagnostics
+            policy: Slow consumer policy ("skip", "disconnect", "spill" or "backpressure")
+            replay_history: Start reading at the oldest buffered byte
+            max_lag: Byte budget of unread data (defaults to the history size)
+            
+        Returns:
+            Subscription to wait on and read from
+        """
+        start = self.history_buffer.start if replay_history else None
+        return self.hub.subscribe(name=name, policy=policy, max_lag=max_lag, start=start)
         
-    @abstractmethod
     def get_history(self) -> bytes:
         """Get the current history buffer content.
         
         Returns:
             The raw bytes currently stored in the history buffer.
         """
-        pass
+        return self.history_buffer.getvalue()
 
-    @abstractmethod
-    def set_log_file(self, path: str, log_mode: str = "printable", log_tx: bool = True) -> None:
+    def set_scrollback(self, store) -> None:
+        """Attach a disk-backed scrollback store that receives all RX data.
+        
+        Args:
+            store: ScrollbackStore instance, or None to detach
+        """
+        self.scrollback = store
+
+    def set_log_file(self, path: str, log_mode: str = "printable", log_tx: bool = True, **log_options) -> None:
         """Set the path and mode for session logging.
         
         Args:
             path: Path to the log file
             log_mode: "printable" or "raw"
             log_tx: Whether to log transmitted data
+            **log_options: SessionLog writer options (flush_interval, fsync, queue_size)
         """
-        pass
+        self.log_file = path
+        self.log_mode = log_mode
+        self.log_tx = log_tx
+        previous = self.session_log
+        try:
+            self.session_log = SessionLog(path, log_mode, **log_options)
+            logger.info("Logging to %s (%s mode, log_tx=%s)", path, log_mode, log_tx)
+        except Exception as e:
+            logger.error("Failed to open log file %s: %s", path, e)
+            self.session_log = None
+        if previous:
+            # Closing joins the writer thread; keep that off the event loop
+            try:
+                asyncio.get_running_loop().run_in_executor(None, previous.close)
+            except RuntimeError:
+                previous.close()
 
-    @abstractmethod
     def update_log_settings(self, log_mode: str, log_tx: bool) -> None:
         """Update logging settings for the current session.
         
@@ -75,5 +165,29 @@ class BaseBackend(ABC):
             log_mode: "printable" or "raw"
             log_tx: Whether to log transmitted data
         """
-        pass
+        self.log_mode = log_mode
+        self.log_tx = log_tx
+        if self.session_log:
+            self.session_log.log_mode = log_mode
+        logger.info("Logging settings updated for %s: (%s mode, log_tx=%s)", self.log_file, log_mode, log_tx)
+
+    def _count_tx(self, data: bytes) -> None:
+        """Account for data a send() call has written."""
+        self.tx_bytes += len(data)
+        self.tx_writes += 1
+
+    def _write_to_log(self, data: bytes, tx: bool = False) -> None:
+        """Queue data for the session log writer, if logging is enabled.
+        
+        Args:
+            data: Received or transmitted bytes
+            tx: True for transmitted data
+        """
+        if self.session_log:
+            self.session_log.write(data, tx)
 
+    async def _close_log(self) -> None:
+        """Flush and close the session log without blocking the event loop."""
+        if self.session_log:
+            session_log, self.session_log = self.session_log, None
+            await asyncio.get_running_loop().run_in_executor(None, session_log.close)
@@ -0,0 +1,369 @@
+"""Publish/subscribe fan-out of received data.
+
+Every backend owns one DataHub. Received chunks are appended once to the
+hub's ring buffer (which doubles as the connection history); subscribers
+only keep a cursor into that buffer, so adding observers does not multiply
+memory. Two kinds of subscribers are supported:
+
+- cursor subscribers (WebSocket clients) wait for data and read everything
+  between their cursor and the end of the buffer;
+- callback subscribers (loggers, trigger engines) are called inline with
+  each chunk. The chunk may be a memoryview of the backend's receive buffer
+  that is reused for the next read; callbacks that keep it must copy it.
+
+Each cursor subscriber has a byte budget (``max_lag``). What happens when a
+reader exceeds it is its slow-consumer policy:
+
+- "skip": the oldest unread bytes are dropped;
+- "disconnect": the subscription is closed;
+- "spill": the overflow is written to a temporary file and delivered later.
+  Writes happen on a background thread; until a chunk is on disk it is kept
+  in memory (and read from there if the reader catches up first), so a slow
+  disk never stalls publish();
+- "backpressure": the hub asks the backend reader to pause once the reader
+  is 3/4 of its budget behind, and resumes it below 1/4. Data that still
+  overflows (the device kept talking) is dropped as with "skip".
+"""
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from .ring_buffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+# What happens to a cursor subscriber that falls too far behind
+SLOW_CONSUMER_POLICIES = ("skip", "disconnect", "spill", "backpressure")
+
+# Backpressure watermarks as fractions of the byte budget
+PAUSE_WATERMARK = 0.75
+RESUME_WATERMARK = 0.25
+
+# Writes the spill files of all subscriptions, off the event loop
+_spill_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zfield-spill")
+
+
+class Subscription:
+    """A reader holding its own cursor into a DataHub buffer."""
+
+    def __init__(self, hub: "DataHub", name: str, policy: str, max_lag: int, start: Optional[int]):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Slow consumer policy must be one of {SLOW_CONSUMER_POLICIES}, got {policy}")
+        self.hub = hub
+        self.name = name
+        self.policy = policy
+        self.max_lag = max_lag
+        self.cursor = hub.buffer.end if start is None else max(start, hub.buffer.start)
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.dropped_bytes = 0
+        self.spilled_bytes = 0
+        self.late_bytes = 0
+        # Spill positions count bytes since the subscription was created; the
+        # file holds [_spill_base, _spill_flushed) and _spill_chunks the rest
+        self._spill = None
+        self._spill_base = 0
+        self._spill_read = 0
+        self._spill_flushed = 0
+        self._spill_write = 0
+        self._spill_chunks: deque[bytes] = deque()
+        self._spill_writing = False
+        # Guards the positions and chunks; the file has its own lock so
+        # publish() never waits for a write in progress
+        self._spill_lock = threading.Lock()
+        self._spill_file_lock = threading.Lock()
+        self._event = asyncio.Event()
+
+    def pending(self) -> int:
+        """Number of bytes available to read."""
+        return self._spill_write - self._spill_read + self.hub.buffer.end - self.cursor
+
+    async def wait(self, min_bytes: int = 1) -> None:
+        """Wait until at least min_bytes are pending or the subscription is closed."""
+        while not self.closed and self.pending() < min_bytes:
+            self._event.clear()
+            await self._event.wait()
+
+    def read(self, max_bytes: Optional[int] = None) -> bytes:
+        """Read pending data and advance the cursor.
+
+        Spilled data is older than anything in the buffer and is returned
+        first.
+
+        Args:
+            max_bytes: Upper bound on the returned size (None for everything)
+        """
+        data = b''
+        if self._spill_read < self._spill_write:
+            data = self._read_spill(max_bytes)
+            if self._spill_read < self._spill_write:
+                return data
+            if max_bytes is not None:
+                max_bytes -= len(data)
+                if max_bytes <= 0:
+                    return data
+
+        end = self.hub.buffer.end
+        if max_bytes is not None:
+            end = min(end, self.cursor + max_bytes)
+        data += self.hub.buffer.read(self.cursor, end)
+        self.cursor = end
+
+        if self.policy == "backpressure" and self.pending() <= self.max_lag * RESUME_WATERMARK:
+            self.hub._release(self)
+        return data
+
+    def close(self, reason: Optional[str] = None) -> None:
+        """Detach from the hub and wake any waiter."""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self.hub.unsubscribe(self)
+        if self.spilled_bytes:
+            with self._spill_lock:
+                self._spill_chunks.clear()
+            # Queued behind any write in progress
+            _spill_writer.submit(self._close_spill)
+        self._event.set()
+
+    def stats(self) -> dict:
+        """Delivery counters for diagnostics."""
+        return {
+            "policy": self.policy,
+            "pending": self.pending(),
+            "dropped_bytes": self.dropped_bytes,
+            "spilled_bytes": self.spilled_bytes,
+            # Spilled but not on disk yet
+            "spill_unwritten_bytes": self._spill_write - self._spill_flushed,
+            "late_bytes": self.late_bytes,
+        }
+
+    def _before_publish(self, data: bytes) -> None:
+        """Apply the slow-consumer policy before a chunk is appended.
+
+        Runs before the append so that bytes about to be overwritten in the
+        ring can still be spilled.
+        """
+        buffer = self.hub.buffer
+        keep_from = buffer.end + len(data) - self.max_lag
+        if self.cursor >= keep_from:
+            return
+
+        if self.policy == "disconnect":
+            self.close(f"Subscriber {self.name} fell {self.pending() + len(data)} bytes behind")
+            return
+        if self.policy == "spill":
+            # Overflow comes from the ring first, then from the new chunk
+            self._write_spill(buffer.read(self.cursor, keep_from))
+            head = keep_from - buffer.end
+            if head > 0:
+                self._write_spill(memoryview(data)[:head])
+        else:
+            self.dropped_bytes += keep_from - self.cursor
+        self.cursor = keep_from
+
+    def _on_publish(self) -> None:
+        if self.policy == "backpressure" and self.pending() >= self.max_lag * PAUSE_WATERMARK:
+            self.hub._hold(self)
+        self._event.set()
+
+    def _write_spill(self, data) -> None:
+        if not len(data):
+            return
+        with self._spill_lock:
+            self._spill_chunks.append(bytes(data))
+            self._spill_write += len(data)
+        self.spilled_bytes += len(data)
+        self._schedule_spill()
+
+    def _schedule_spill(self) -> None:
+        with self._spill_lock:
+            if self._spill_writing:
+                return
+            self._spill_writing = True
+        _spill_writer.submit(self._flush_spill)
+
+    def _read_spill(self, max_bytes: Optional[int]) -> bytes:
+        with self._spill_lock:
+            size = self._spill_flushed - self._spill_read
+            if max_bytes is not None:
+                size = min(size, max_bytes)
+            if size <= 0:
+                # Nothing older on disk: take the chunks straight from memory
+                data = self._take_spill_chunks(max_bytes)
+            position = self._spill_read - self._spill_base
+        if size > 0:
+            with self._spill_file_lock:
+                self._spill.seek(position)
+                data = self._spill.read(size)
+        with self._spill_lock:
+            self._spill_read += len(data)
+            self._spill_flushed = max(self._spill_flushed, self._spill_read)
+            drained = self._spill_read == self._spill_write
+        self.late_bytes += len(data)
+
+        if drained:
+            # Lets the writer truncate the file for reuse
+            self._schedule_spill()
+        return data
+
+    def _take_spill_chunks(self, max_bytes: Optional[int]) -> bytes:
+        """Remove up to max_bytes from the unwritten chunks (spill lock held)."""
+        parts = []
+        size = 0
+        while self._spill_chunks and (max_bytes is None or size < max_bytes):
+            chunk = self._spill_chunks.popleft()
+            if max_bytes is not None and size + len(chunk) > max_bytes:
+                self._spill_chunks.appendleft(chunk[max_bytes - size:])
+                chunk = chunk[:max_bytes - size]
+            parts.append(chunk)
+            size += len(chunk)
+        return b''.join(parts)
+
+    def _flush_spill(self) -> None:
+        """Write the unwritten chunks to the spill file (spill writer thread)."""
+        while True:
+            with self._spill_lock:
+                if self.closed or not self._spill_chunks:
+                    self._spill_writing = False
+                    drained = not self.closed and self._spill_read == self._spill_write
+                    break
+                chunk = self._spill_chunks[0]
+                position = self._spill_flushed
+            try:
+                with self._spill_file_lock:
+                    if self._spill is None:
+                        self._spill = tempfile.TemporaryFile(prefix="zfield-spill-")
+                    self._spill.seek(position - self._spill_base)
+                    self._spill.write(chunk)
+                    self._spill.flush()
+            except OSError as e:
+                # The chunks stay in memory and are still delivered from there
+                logger.error("Spill write for subscriber %s failed: %s", self.name, e)
+                with self._spill_lock:
+                    self._spill_writing = False
+                return
+            with self._spill_lock:
+                # Unless the reader took the chunk from memory meanwhile
+                if self._spill_chunks and self._spill_chunks[0] is chunk and self._spill_flushed == position:
+                    self._spill_chunks.popleft()
+                    self._spill_flushed += len(chunk)
+
+        if drained and self._spill is not None:
+            with self._spill_lock:
+                drained = self._spill_read == self._spill_write and not self._spill_chunks
+                if drained:
+                    self._spill_base = self._spill_write
+            if drained:
+                # Fully delivered: reuse the file from the start
+                with self._spill_file_lock:
+                    self._spill.seek(0)
+                    self._spill.truncate()
+
+    def _close_spill(self) -> None:
+        with self._spill_file_lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+class DataHub:
+    """Fan-out point between a backend reader and its consumers."""
+
+    def __init__(self, buffer: RingBuffer):
+        self.buffer = buffer
+        self._subscriptions: list[Subscription] = []
+        self._callbacks: list[Callable[[bytes], None]] = []
+        # Chunks published so far (bytes are counted by the buffer)
+        self.chunks = 0
+        # Backpressure subscribers currently asking the reader to pause
+        self._holding: set[Subscription] = set()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    def subscribe(self, name: str = "", policy: str = "skip", max_lag: Optional[int] = None,
+                  start: Optional[int] = None) -> Subscription:
+        """Register a cursor subscriber.
+
+        Args:
+            name: Label used in diagnostics
+            policy: Slow-consumer policy, one of SLOW_CONSUMER_POLICIES
+            max_lag: Byte budget of unread data (defaults to the buffer
+                capacity; only "spill" may exceed it)
+            start: Absolute position to start reading from (defaults to now);
+                pass ``buffer.start`` to replay the history first
+
+        Returns:
+            The new subscription
+        """
+        if max_lag is None or (max_lag > self.buffer.capacity and policy != "spill"):
+            max_lag = self.buffer.capacity
+        if policy == "spill":
+            # Whatever does not fit in the ring goes to the spill file
+            max_lag = min(max_lag, self.buffer.capacity)
+        subscription = Subscription(self, name, policy, max_lag, start)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a cursor subscriber."""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        self._release(subscription)
+
+    def add_callback(self, callback: Callable[[bytes], None]) -> None:
+        """Register a callback invoked inline with every published chunk."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[bytes], None]) -> None:
+        """Remove a previously registered callback."""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions) + len(self._callbacks)
+
+    @property
+    def subscriptions(self) -> list[Subscription]:
+        return list(self._subscriptions)
+
+    @property
+    def paused(self) -> bool:
+        """True while a backpressure subscriber wants the reader to stop."""
+        return bool(self._holding)
+
+    async def writable(self) -> None:
+        """Wait until no subscriber is applying backpressure."""
+        await self._writable.wait()
+
+    def publish(self, data: bytes) -> None:
+        """Append a received chunk and notify all subscribers."""
+        for subscription in list(self._subscriptions):
+            subscription._before_publish(data)
+
+        self.buffer.append(data)
+        self.chunks += 1
+
+        for callback in list(self._callbacks):
+            try:
+                callback(data)
+            except Exception as e:
+                logger.error("Error in data subscriber callback: %s", e)
+
+        for subscription in list(self._subscriptions):
+            subscription._on_publish()
+
+    def _hold(self, subscription: Subscription) -> None:
+        self._holding.add(subscription)
+        self._writable.clear()
+
+    def _release(self, subscription: Subscription) -> None:
+        self._holding.discard(subscription)
+        if not self._holding:
+            self._writable.set()
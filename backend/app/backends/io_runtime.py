@@ -0,0 +1,109 @@
+"""Managed threads for blocking device I/O.
+
+Blocking calls (pyserial reads in executor mode) must not share the event
+loop's default executor: its size follows the CPU count, so with dozens of
+adapters it saturates and one slow port delays all others. Instead each
+connection opens an IOChannel, a dedicated single-thread executor, so a port
+only ever waits for itself. The runtime caps the number of channels and
+reports how busy each thread is.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+DEFAULT_MAX_THREADS = 128
+
+
+class IOChannel:
+    """A dedicated I/O thread for one connection."""
+
+    def __init__(self, runtime: "IORuntime", name: str):
+        self.runtime = runtime
+        self.name = name
+        self.calls = 0
+        self.busy_time = 0.0
+        self._opened = time.monotonic()
+        self._active_since: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"io:{name}")
+
+    async def run(self, func: Callable, *args):
+        """Run a blocking call on this channel's thread and return its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, func, args)
+
+    def _call(self, func: Callable, args: tuple):
+        started = time.monotonic()
+        self._active_since = started
+        try:
+            return func(*args)
+        finally:
+            self._active_since = None
+            self.busy_time += time.monotonic() - started
+            self.calls += 1
+
+    def utilization(self) -> float:
+        """Fraction of the channel's lifetime spent inside calls."""
+        now = time.monotonic()
+        active_since = self._active_since
+        busy = self.busy_time + (now - active_since if active_since else 0.0)
+        elapsed = now - self._opened
+        return min(busy / elapsed, 1.0) if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "busy_seconds": round(self.busy_time, 3),
+            "utilization": round(self.utilization(), 3),
+        }
+
+    def close(self) -> None:
+        """Release the thread once the call in progress (if any) returns."""
+        self._executor.shutdown(wait=False)
+        self.runtime._release(self)
+
+
+class IORuntime:
+    """Hands out dedicated I/O threads, up to max_threads at a time.
+
+    Args:
+        max_threads: Largest number of simultaneously open channels
+    """
+
+    def __init__(self, max_threads: int = DEFAULT_MAX_THREADS):
+        if max_threads <= 0:
+            raise ValueError(f"max_threads must be positive, got {max_threads}")
+        self.max_threads = max_threads
+        self._channels: list[IOChannel] = []
+        self._lock = threading.Lock()
+
+    def open_channel(self, name: str) -> IOChannel:
+        """Reserve a thread for a connection.
+
+        Raises:
+            RuntimeError: If all max_threads threads are in use
+        """
+        with self._lock:
+            if len(self._channels) >= self.max_threads:
+                raise RuntimeError(f"All {self.max_threads} I/O threads are in use")
+            channel = IOChannel(self, name)
+            self._channels.append(channel)
+            return channel
+
+    def _release(self, channel: IOChannel) -> None:
+        with self._lock:
+            if channel in self._channels:
+                self._channels.remove(channel)
+
+    def stats(self) -> dict:
+        """Pool size and per-thread utilization for diagnostics."""
+        with self._lock:
+            channels = [channel.stats() for channel in self._channels]
+        return {
+            "max_threads": self.max_threads,
+            "threads": len(channels),
+            "utilization": round(len(channels) / self.max_threads, 3),
+            "channels": channels,
+        }
@@ -0,0 +1,79 @@
+"""Streaming filters producing "printable" session logs.
+
+EscapeFilter removes ANSI/VT escape sequences; PrintableFilter additionally
+drops every byte that is not printable ASCII or common whitespace. Escape
+sequences may be split across reads, so the filters keep an unterminated
+sequence from the end of one chunk and complete it with the next.
+"""
+import re
+
+# Complete escape sequences: CSI (ESC [ ... final), OSC (ESC ] ... BEL or ESC \),
+# nF (ESC intermediates final, e.g. charset selection) and two-byte Fe/Fp/Fs
+_SEQUENCE = re.compile(
+    rb'\x1b(?:\[[0-?]*[ -/]*[@-~]'
+    rb'|\][^\x07\x1b]*(?:\x07|\x1b\\)'
+    rb'|[ -/]+[0-~]'
+    rb'|[0-~])'
+)
+# Prefixes of the sequences above that run to the end of a chunk
+_PARTIAL = re.compile(rb'\x1b(?:\[[0-?]*[ -/]*|[ -/]*)')
+_PARTIAL_OSC = re.compile(rb'\x1b\][^\x07\x1b]*\x1b?')
+
+# Printable ASCII (32-126) plus tab, newline and carriage return survive
+_KEEP = set(range(32, 127)) | {9, 10, 13}
+_DELETE = bytes(b for b in range(256) if b not in _KEEP)
+
+# Longest unterminated sequence carried between chunks before giving up on it
+MAX_PENDING = 1024
+
+
+class EscapeFilter:
+    """Stateful escape sequence filter; use one instance per byte stream."""
+
+    def __init__(self):
+        self._pending = b''
+
+    def feed(self, data: bytes) -> bytes:
+        """Filter the next chunk of the stream.
+
+        Returns:
+            Bytes without escape sequences that are final; an incomplete
+            escape sequence at the end of the chunk is held back until the
+            next call.
+        """
+        buf = self._pending + data if self._pending else bytes(data)
+        cut = self._partial_start(buf)
+        self._pending = buf[cut:] if len(buf) - cut <= MAX_PENDING else b''
+        body = buf[:cut]
+
+        if b'\x1b' in body:
+            body = _SEQUENCE.sub(b'', body)
+        return body
+
+    def reset(self) -> None:
+        """Discard any partial escape sequence."""
+        self._pending = b''
+
+    @staticmethod
+    def _partial_start(buf: bytes) -> int:
+        """Index where an unterminated escape sequence starts, or len(buf)."""
+        osc = buf.rfind(b'\x1b]')
+        if osc >= 0 and _PARTIAL_OSC.fullmatch(buf, osc):
+            return osc
+        esc = buf.rfind(b'\x1b')
+        if esc >= 0 and _PARTIAL.fullmatch(buf, esc):
+            return esc
+        return len(buf)
+
+
+class PrintableFilter(EscapeFilter):
+    """Stateful printable filter; use one instance per byte stream."""
+
+    def feed(self, data: bytes) -> bytes:
+        """Filter the next chunk of the stream.
+
+        Returns:
+            Printable bytes that are final; an incomplete escape sequence at
+            the end of the chunk is held back until the next call.
+        """
+        return super().feed(data).translate(None, _DELETE)
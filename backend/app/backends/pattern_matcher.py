@@ -0,0 +1,120 @@
+"""Single-pass multi-pattern search over a byte stream.
+
+All literal patterns are merged into one trie, and the trie is compiled into
+a single regular expression whose alternatives branch byte by byte. The
+regex engine therefore walks the stream in C, following one trie path per
+position whatever the number of patterns, and only stops where a pattern
+occurs; the trie is then walked in Python from there to report every
+pattern ending at that position. Scan cost grows with the stream and the
+number of matches, not with the number of rules.
+
+Patterns may straddle chunk boundaries: the last ``longest - 1`` bytes of a
+chunk are carried over and searched again with the next one.
+"""
+import re
+from typing import Sequence
+
+# Key of the list of pattern indices ending at a trie node
+_END = -1
+
+
+def _build_trie(patterns: Sequence[bytes]) -> dict:
+    root: dict = {}
+    for index, pattern in enumerate(patterns):
+        node = root
+        for byte in pattern:
+            node = node.setdefault(byte, {})
+        node.setdefault(_END, []).append(index)
+    return root
+
+
+def _trie_pattern(node: dict) -> bytes:
+    """Regex source matching any non-empty path through the trie below node."""
+    literal = b''
+    # Collapse chains without branches into one literal
+    while len(node) == 1 and _END not in node:
+        byte, node = next(iter(node.items()))
+        literal += re.escape(bytes([byte]))
+    branches = [re.escape(bytes([byte])) + _trie_pattern(child)
+                for byte, child in node.items() if byte != _END]
+    if not branches:
+        return literal
+    alternation = b'(?:' + b'|'.join(branches) + b')'
+    # Where a pattern ends, the longer ones are optional
+    return literal + (alternation + b'?' if _END in node else alternation)
+
+
+class MultiPatternMatcher:
+    """Reports occurrences of literal byte patterns in a stream.
+
+    Occurrences of one pattern do not overlap (like counting with
+    ``str.split``); occurrences of different patterns may.
+
+    Args:
+        patterns: Non-empty byte strings; results refer to them by index
+    """
+
+    def __init__(self, patterns: Sequence[bytes]):
+        self.patterns = [bytes(p) for p in patterns]
+        if not all(self.patterns):
+            raise ValueError("Patterns must not be empty")
+        self._trie = _build_trie(self.patterns)
+        self._scanner = re.compile(_trie_pattern(self._trie)) if self.patterns else None
+        self._carry = max((len(p) for p in self.patterns), default=1) - 1
+        self._tail = b''
+        # Stream offset of the first byte of _tail
+        self._offset = 0
+        # Stream offset where each pattern may match again
+        self._next_start = [0] * len(self.patterns)
+
+    @property
+    def position(self) -> int:
+        """Number of stream bytes fed so far."""
+        return self._offset + len(self._tail)
+
+    def feed(self, data: bytes) -> list[tuple[int, int]]:
+        """Search the next chunk of the stream.
+
+        Returns:
+            (pattern index, stream offset just past the match) for every
+            occurrence completed in this chunk, in order of position
+        """
+        if not self._scanner:
+            self._offset += len(data)
+            return []
+        buf = self._tail + data if self._tail else data
+        fresh = len(self._tail)
+        matches = []
+        search = self._scanner.search
+        # Resume one byte after each match start so overlapping patterns are found
+        match = search(buf)
+        while match:
+            start = match.start()
+            self._collect(buf, start, fresh, matches)
+            match = search(buf, start + 1)
+
+        keep = min(self._carry, len(buf))
+        self._offset += len(buf) - keep
+        self._tail = bytes(buf[len(buf) - keep:]) if keep else b''
+        return sorted(matches, key=lambda m: m[1]) if len(matches) > 1 else matches
+
+    def reset(self) -> None:
+        """Forget the carried-over bytes (e.g. after a reconnect)."""
+        self._offset += len(self._tail)
+        self._tail = b''
+
+    def _collect(self, buf, start: int, fresh: int, matches: list) -> None:
+        """Report every pattern that starts at buf[start] and ends in new data."""
+        node = self._trie
+        position = start
+        while position < len(buf):
+            node = node.get(buf[position])
+            if node is None:
+                return
+            position += 1
+            if _END not in node or position <= fresh:
+                continue
+            for index in node[_END]:
+                if self._offset + start >= self._next_start[index]:
+                    self._next_start[index] = self._offset + position
+                    matches.append((index, self._offset + position))
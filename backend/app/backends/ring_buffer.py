@@ -0,0 +1,87 @@
+"""Fixed-size byte ring buffer used for connection history."""
+from typing import Optional, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Default history kept per connection (100KB)
+DEFAULT_HISTORY_SIZE = 1024 * 100
+
+
+class RingBuffer:
+    """Byte ring buffer backed by a single preallocated bytearray.
+
+    Positions are absolute: ``end`` counts every byte ever appended, so a
+    reader can remember a position and later ask for everything after it.
+    Only the last ``capacity`` bytes are retained; ``start`` is the oldest
+    position still available.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_SIZE):
+        if capacity <= 0:
+            raise ValueError(f"Ring buffer capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._end = 0
+
+    def __len__(self) -> int:
+        return min(self._end, self.capacity)
+
+    @property
+    def start(self) -> int:
+        """Oldest absolute position still held in the buffer."""
+        return self._end - len(self)
+
+    @property
+    def end(self) -> int:
+        """Absolute position one past the newest byte."""
+        return self._end
+
+    def append(self, data: BytesLike) -> None:
+        """Append a chunk, overwriting the oldest bytes when full."""
+        size = len(data)
+        if not size:
+            return
+
+        src = memoryview(data).cast('B')
+        if size > self.capacity:
+            # Only the tail can survive; keep positions consistent
+            src = src[size - self.capacity:]
+
+        self._write_at((self._end + size - len(src)) % self.capacity, src)
+        self._end += size
+
+    def _write_at(self, offset: int, src: memoryview) -> None:
+        first = min(len(src), self.capacity - offset)
+        self._view[offset:offset + first] = src[:first]
+        if first < len(src):
+            self._view[:len(src) - first] = src[first:]
+
+    def views(self, start: Optional[int] = None, end: Optional[int] = None) -> list[memoryview]:
+        """Return zero-copy views covering the absolute range [start, end).
+
+        The range is clamped to what is still buffered. At most two views are
+        returned (the range may wrap around). Views alias the internal storage
+        and are only valid until the next append.
+        """
+        start = self.start if start is None else max(start, self.start)
+        end = self._end if end is None else min(end, self._end)
+        if start >= end:
+            return []
+
+        offset = start % self.capacity
+        size = end - start
+        first = min(size, self.capacity - offset)
+        views = [self._view[offset:offset + first]]
+        if first < size:
+            views.append(self._view[:size - first])
+        return views
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        """Copy the absolute range [start, end) out of the buffer."""
+        return b''.join(self.views(start, end))
+
+    def getvalue(self) -> bytes:
+        """Return all buffered bytes, oldest first."""
+        return self.read()
+
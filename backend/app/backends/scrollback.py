@@ -0,0 +1,341 @@
+"""Disk-backed scrollback store for long-running sessions.
+
+Received bytes are appended to fixed-size segment files. Each segment has a
+small index file of (absolute offset, timestamp) records so any byte range or
+time range can be located without scanning the data. Reads go through mmap,
+so RAM usage stays constant no matter how much history is on disk.
+
+The event loop only enqueues chunks; a writer thread appends them to the
+segment files, as for the session log.
+"""
+import logging
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from bisect import bisect_right
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# One index record: absolute byte offset, unix timestamp
+INDEX_RECORD = struct.Struct('<Qd')
+# Write an index record at least every INDEX_INTERVAL bytes or INDEX_PERIOD seconds
+INDEX_INTERVAL = 4096
+INDEX_PERIOD = 0.1
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_QUEUE_SIZE = 10000
+
+# Files a store creates; nothing else in its directory is ever deleted
+SEGMENT_FILE = re.compile(r'^[0-9a-f]{16}\.(seg|idx)$')
+
+# Marker telling the writer to finish
+_STOP = object()
+
+
+class _Segment:
+    """One data file plus its offset/time index."""
+
+    def __init__(self, directory: str, base: int, first_time: float):
+        self.base = base
+        self.first_time = first_time
+        self.size = 0
+        self.data_path = os.path.join(directory, f"{base:016x}.seg")
+        self.index_path = os.path.join(directory, f"{base:016x}.idx")
+        self.data_file = open(self.data_path, 'wb')
+        self.index_file = open(self.index_path, 'wb')
+        self.last_indexed = -INDEX_INTERVAL
+        self.last_indexed_time = 0.0
+
+    @property
+    def end(self) -> int:
+        return self.base + self.size
+
+    def append(self, data, now: float) -> None:
+        offset = self.base + self.size
+        if offset - self.last_indexed >= INDEX_INTERVAL or now - self.last_indexed_time >= INDEX_PERIOD:
+            self.index_file.write(INDEX_RECORD.pack(offset, now))
+            self.last_indexed = offset
+            self.last_indexed_time = now
+        self.data_file.write(data)
+        self.size += len(data)
+
+    def flush(self) -> None:
+        if self.data_file:
+            self.data_file.flush()
+            self.index_file.flush()
+
+    def seal(self) -> None:
+        """Close the write handles; the files stay readable."""
+        if self.data_file:
+            self.data_file.close()
+            self.index_file.close()
+            self.data_file = None
+            self.index_file = None
+
+    def remove(self) -> None:
+        self.seal()
+        for path in (self.data_path, self.index_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def read(self, start: int, end: int) -> bytes:
+        """Read the absolute range [start, end) that lies inside this segment."""
+        self.flush()
+        with open(self.data_path, 'rb') as f, _map(f) as view:
+            return view[start - self.base:end - self.base]
+
+    def offset_at(self, timestamp: float) -> Optional[int]:
+        """First indexed offset recorded at or after timestamp, if any."""
+        self.flush()
+        with open(self.index_path, 'rb') as f, _map(f) as view:
+            count = len(view) // INDEX_RECORD.size
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if INDEX_RECORD.unpack_from(view, mid * INDEX_RECORD.size)[1] < timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == count:
+                return None
+            return INDEX_RECORD.unpack_from(view, lo * INDEX_RECORD.size)[0]
+
+    def last_time(self) -> float:
+        self.flush()
+        with open(self.index_path, 'rb') as f, _map(f) as view:
+            if len(view) < INDEX_RECORD.size:
+                return self.first_time
+            return INDEX_RECORD.unpack_from(view, len(view) - INDEX_RECORD.size)[1]
+
+
+class _EmptyMap:
+    """Stand-in for mmap of an empty file (mmap refuses zero-length maps)."""
+
+    def __len__(self) -> int:
+        return 0
+
+    def __getitem__(self, item) -> bytes:
+        return b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def _map(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        return _EmptyMap()
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ScrollbackStore:
+    """Append-only, size-bounded scrollback kept in segment files on disk.
+
+    Offsets are absolute byte positions since the store was opened. Attached
+    to a backend before it connects, they match the positions used by the
+    backend's in-memory history ring buffer. When the total
+    size exceeds ``max_bytes`` the oldest segments are deleted. Chunks that
+    do not fit in the writer queue are dropped and leave a gap in the
+    offsets; reads stop at a gap.
+    """
+
+    def __init__(self, directory: str, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_bytes: int = DEFAULT_MAX_BYTES, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.dropped_bytes = 0
+        self._segments: list[_Segment] = []
+        self._first_times: list[float] = []
+        # Offset after the last queued chunk (event loop side)
+        self._queued_end = 0
+        # Offset after the last written chunk (writer side)
+        self._written_end = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # Guards the segments; notified whenever a batch has been written
+        self._written = threading.Condition()
+
+        # Scrollback is per session: drop segments a previous run left behind
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if SEGMENT_FILE.match(name):
+                os.remove(os.path.join(directory, name))
+
+        self._thread = threading.Thread(target=self._run, name=f"scrollback:{directory}", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_connection(cls, root: str, port: str, **kwargs) -> "ScrollbackStore":
+        """Create a store in a directory named after the connection."""
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', port).strip('._') or 'port'
+        return cls(os.path.join(root, name), **kwargs)
+
+    @property
+    def start(self) -> int:
+        """Oldest absolute offset still on disk."""
+        with self._written:
+            return self._segments[0].base if self._segments else 0
+
+    @property
+    def end(self) -> int:
+        """Absolute offset one past the newest byte on disk."""
+        with self._written:
+            return self._segments[-1].end if self._segments else 0
+
+    def append(self, data) -> None:
+        """Queue received bytes for the writer; never blocks the caller."""
+        if not data:
+            return
+        try:
+            self._queue.put_nowait((self._queued_end, bytes(data), time.time()))
+        except queue.Full:
+            self.dropped_bytes += len(data)
+        self._queued_end += len(data)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is on disk.
+
+        Blocks, so call it from a thread when running inside the event loop.
+
+        Returns:
+            False if the timeout expired first
+        """
+        target = self._queued_end - self.dropped_bytes
+        with self._written:
+            return self._written.wait_for(lambda: self._written_end >= target or not self._thread.is_alive(),
+                                          timeout)
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                batch.pop()
+                running = False
+            with self._written:
+                for offset, data, now in batch:
+                    try:
+                        self._write(offset, data, now)
+                    except (OSError, ValueError) as e:
+                        logger.error("Scrollback write error in %s: %s", self.directory, e)
+                    self._written_end += len(data)
+                self._written.notify_all()
+
+    def _write(self, offset: int, data: bytes, now: float) -> None:
+        current = self._segments[-1] if self._segments else None
+        if (current is None or current.end != offset
+                or (current.size and current.size + len(data) > self.segment_size)):
+            current = self._roll(offset, now)
+        current.append(data, now)
+
+    def _roll(self, base: int, now: float) -> _Segment:
+        if self._segments:
+            self._segments[-1].seal()
+        segment = _Segment(self.directory, base, now)
+        self._segments.append(segment)
+        self._first_times.append(now)
+
+        # Enforce retention, always keeping the active segment
+        total = sum(s.size for s in self._segments)
+        while len(self._segments) > 1 and total > self.max_bytes:
+            oldest = self._segments.pop(0)
+            self._first_times.pop(0)
+            total -= oldest.size
+            oldest.remove()
+        return segment
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None,
+             limit: Optional[int] = None) -> tuple[int, bytes]:
+        """Read an absolute byte range.
+
+        Args:
+            start: First offset (defaults to the oldest available)
+            end: Offset one past the last byte (defaults to the newest)
+            limit: Maximum number of bytes to return
+
+        Returns:
+            Tuple of (actual start offset, data)
+        """
+        with self._written:
+            start = self.start if start is None else max(start, self.start)
+            end = self.end if end is None else min(end, self.end)
+            parts = []
+            position = start
+            for segment in self._segments:
+                if segment.end <= position or segment.base >= end:
+                    continue
+                if segment.base > position:
+                    # A gap left by dropped chunks ends the read
+                    if parts:
+                        break
+                    start = position = segment.base
+                stop = min(end, segment.end)
+                if limit is not None:
+                    stop = min(stop, start + limit)
+                if stop <= position:
+                    break
+                parts.append(segment.read(position, stop))
+                position = stop
+        return start, b''.join(parts)
+
+    def offset_at(self, timestamp: float) -> int:
+        """Return the first indexed offset received at or after timestamp."""
+        with self._written:
+            i = max(bisect_right(self._first_times, timestamp) - 1, 0)
+            for segment in self._segments[i:]:
+                offset = segment.offset_at(timestamp)
+                if offset is not None:
+                    return offset
+            return self.end
+
+    def info(self) -> dict:
+        """Describe the stored range."""
+        with self._written:
+            return {
+                "start": self.start,
+                "end": self.end,
+                "segments": len(self._segments),
+                "first_time": self._first_times[0] if self._first_times else None,
+                "last_time": self._segments[-1].last_time() if self._segments else None,
+                "queued": self._queue.qsize(),
+                "dropped_bytes": self.dropped_bytes,
+            }
+
+    def close(self, remove: bool = True, timeout: float = 5.0) -> None:
+        """Write out everything queued and close the store.
+
+        Deletes the store's segment files (and its directory once empty)
+        unless remove is False. Blocks until the writer finishes, so call it
+        from a thread when running inside the event loop.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        with self._written:
+            for segment in self._segments:
+                if remove:
+                    segment.remove()
+                else:
+                    segment.seal()
+            self._segments.clear()
+            self._first_times.clear()
+        if remove:
+            try:
+                os.rmdir(self.directory)
+            except OSError:
+                pass
@@ -1,29 +1,76 @@
 """Serial port backend implementation."""
 import asyncio
-import re
+import functools
 import serial
 import serial.tools.list_ports
 import os
+import sys
 import glob
+import logging
 from typing import Optional, Callable
 from .base import BaseBackend
+from .ring_buffer import DEFAULT_HISTORY_SIZE
+from .transmit import TransmitWorker
+from .io_runtime import IOChannel, IORuntime
+from app.services import metrics
 import select
-from collections import deque
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Largest chunk taken from the tty in one readiness callback
+EVENT_READ_SIZE = 4096
+
+# How often a lost device node is checked for (a cheap stat, no open)
+RECONNECT_POLL_INTERVAL = 0.01
+# Upper bound of the doubling reconnect window
+RECONNECT_MAX_DELAY = 30.0
+
+
+def _close_opened(attempt: asyncio.Future) -> None:
+    """Close a port whose reconnect attempt finished after it was abandoned."""
+    if not attempt.cancelled() and attempt.exception() is None:
+        attempt.result().close()
 
 
 class SerialBackend(BaseBackend):
-    """Serial port communication backend."""
+    """Serial port communication backend.
+
+    Two read modes are supported:
+    - "executor": a blocking pyserial read runs on a dedicated I/O thread
+      taken from the IORuntime.
+    - "event": the tty file descriptor is registered with the asyncio loop and
+      read only when the kernel reports data (POSIX only, no threads or sleeps).
+    "auto" selects "event" on Linux and "executor" everywhere else.
+
+    With reconnect_attempts > 0 a lost device (unplugged, or a board whose
+    USB CDC-ACM interface re-enumerates after a reset) is reopened with the
+    same settings as soon as it comes back. History, hub subscribers and the
+    session log are kept, so the boot output lands in the same session.
+    """
     
-    def __init__(self):
+    def __init__(self, read_mode: str = "auto", history_size: int = DEFAULT_HISTORY_SIZE,
+                 io_runtime: Optional[IORuntime] = None, reconnect_attempts: int = 0,
+                 reconnect_delay: float = 1.0):
+        super().__init__(history_size)
+        self.read_mode = read_mode
+        self.io_runtime = io_runtime or IORuntime()
+        self.io_channel: Optional[IOChannel] = None
         self.serial_port: Optional[serial.Serial] = None
-        self.data_callback: Optional[Callable[[bytes], None]] = None
         self.read_task: Optional[asyncio.Task] = None
+        self.tx_worker: Optional[TransmitWorker] = None
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.reconnects = 0
+        self.failed_reconnects = 0
+        self.last_reconnect_latency: Optional[float] = None
+        self.max_reconnect_latency = 0.0
+        self._serial_params: dict = {}
+        self._event_reads = False
+        self._stopping = False
+        self._read_wakeup: Optional[asyncio.Future] = None
         self._connected = False
-        self.history_buffer = deque(maxlen=1024 * 100)  # Store last 100KB
-        self.log_file: Optional[str] = None
-        self.log_handle = None
-        self.log_mode = "printable"
-        self.log_tx = True
     
     async def connect(self, port: str, baudrate: int = 115200, **kwargs) -> bool:
         """Connect to serial port.
@@ -49,25 +96,71 @@ class SerialBackend(BaseBackend):
                 'write_timeout': 1,
             }
             serial_params.update(kwargs)
+            self._serial_params = serial_params
+            self._stopping = False
             
-            self.serial_port = serial.Serial(**serial_params)
-            print(f"Connected to {port} at {baudrate} baud.")
-
-            self._connected = True
+            self._open()
+            logger.info("Connected to %s at %s baud.", port, baudrate)
             
             # Start reading task
-            self.read_task = asyncio.create_task(self._read_loop())
+            self.read_task = asyncio.create_task(self._run())
             
             return True
         except Exception as e:
-            print(f"Error connecting to serial port: {e}")
-            import traceback
-            traceback.print_exc()
-            self._connected = False
+            logger.exception("Error connecting to serial port: %s", e)
             return False
     
+    def _open(self, serial_port: Optional[serial.Serial] = None) -> None:
+        """Open the port with the saved settings, plus the threads serving it.
+        
+        Args:
+            serial_port: Port already opened with the saved settings (by a
+                reconnect attempt off the event loop)
+        
+        On failure everything opened so far is closed again.
+        """
+        try:
+            self.serial_port = serial_port or serial.Serial(**self._serial_params)
+            self._event_reads = self._use_event_reads()
+            if not self._event_reads:
+                # Blocking reads get a thread of their own (fails when none is left)
+                self.io_channel = self.io_runtime.open_channel(self.serial_port.port)
+        except Exception:
+            self._close_port()
+            raise
+        
+        self._connected = True
+        # Writes go through one ordered worker thread per port
+        self.tx_worker = TransmitWorker(self.serial_port.write, self.serial_port.flush,
+                                        name=self.serial_port.port)
+        if self._event_reads:
+            # Never block inside pyserial; the loop tells us when to read
+            self.serial_port.timeout = 0
+    
+    def _close_port(self) -> None:
+        """Close the I/O thread and the port (the transmit worker is closed separately)."""
+        self._connected = False
+        if self.io_channel:
+            self.io_channel.close()
+            self.io_channel = None
+        if self.serial_port and self.serial_port.is_open:
+            try:
+                self.serial_port.close()
+            except (serial.SerialException, OSError) as e:
+                # The device may already be gone
+                logger.error("Error closing serial port: %s", e)
+        self.serial_port = None
+    
+    async def _release_port(self) -> None:
+        """Stop transmitting, then close the port."""
+        if self.tx_worker:
+            await self.tx_worker.close()
+            self.tx_worker = None
+        self._close_port()
+    
     async def disconnect(self) -> None:
         """Close serial port connection."""
+        self._stopping = True
         self._connected = False
         
         if self.read_task:
@@ -78,17 +171,121 @@ class SerialBackend(BaseBackend):
                 pass
             self.read_task = None
         
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        await self._release_port()
         
-        self.serial_port = None
+        await self._close_log()
+    
+    async def _run(self) -> None:
+        """Read until disconnected, reopening the port whenever the device is lost."""
+        while True:
+            if self._event_reads:
+                await self._read_loop_event()
+            else:
+                await self._read_loop()
+            if self._stopping or not self.reconnect_attempts:
+                return
+            if not await self._reconnect():
+                return
+    
+    async def _reconnect(self) -> bool:
+        """Wait for the lost device to come back and reopen it.
         
-        if self.log_handle:
-            try:
-                self.log_handle.close()
-            except:
-                pass
-            self.log_handle = None
+        Each attempt watches for the device for reconnect_delay seconds (doubling
+        after every failed attempt) and reopens it as soon as it can be opened.
+        Opens run on an I/O thread, since opening a half-enumerated USB device
+        can block.
+        
+        Returns:
+            True once the port is open again, False after the last attempt
+        """
+        lost_at = time.monotonic()
+        port = self._serial_params['port']
+        logger.warning("Lost %s, reconnecting...", port)
+        self.reconnecting = True
+        self._notify_state("reconnecting")
+        await self._release_port()
+        
+        delay = self.reconnect_delay
+        try:
+            channel = self.io_runtime.open_channel(f"{port} (reconnect)")
+        except RuntimeError as e:
+            logger.error("Cannot reconnect to %s: %s", port, e)
+            channel = None
+        try:
+            for _ in range(self.reconnect_attempts if channel else 0):
+                if await self._reopen_within(channel, delay):
+                    self._record_reconnect(time.monotonic() - lost_at)
+                    return True
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        finally:
+            self.reconnecting = False
+            if channel:
+                channel.close()
+        
+        self.failed_reconnects += 1
+        logger.warning("Gave up reconnecting to %s", port)
+        self._notify_state("disconnected")
+        return False
+    
+    async def _reopen_within(self, channel: IOChannel, timeout: float) -> bool:
+        """Wait for the device node and try to open it until timeout.
+        
+        The node is polled every RECONNECT_POLL_INTERVAL; after a failed open
+        the next one waits reconnect_delay.
+        """
+        port = self._serial_params['port']
+        deadline = time.monotonic() + timeout
+        while True:
+            # Device paths can be checked cheaply; other names need an open attempt
+            if not os.path.isabs(port) or os.path.exists(port):
+                if await self._try_open(channel):
+                    return True
+                pause = self.reconnect_delay
+            else:
+                pause = RECONNECT_POLL_INTERVAL
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(pause, remaining))
+    
+    async def _try_open(self, channel: IOChannel) -> bool:
+        """One open attempt on the channel's thread."""
+        attempt = asyncio.ensure_future(channel.run(functools.partial(serial.Serial, **self._serial_params)))
+        try:
+            serial_port = await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            # Disconnected meanwhile: close the port if the open still succeeds
+            attempt.add_done_callback(_close_opened)
+            raise
+        except (serial.SerialException, OSError) as e:
+            # Typically the node exists but udev has not finished setting it up
+            logger.debug("Reopening %s failed: %s", self._serial_params['port'], e)
+            return False
+        try:
+            self._open(serial_port)
+        except (serial.SerialException, OSError, RuntimeError) as e:
+            logger.debug("Reopening %s failed: %s", self._serial_params['port'], e)
+            return False
+        return True
+    
+    def _record_reconnect(self, latency: float) -> None:
+        self.reconnects += 1
+        self.last_reconnect_latency = latency
+        self.max_reconnect_latency = max(self.max_reconnect_latency, latency)
+        logger.info("Reconnected to %s after %.0f ms", self._serial_params['port'], latency * 1000)
+        self._notify_state("connected")
+    
+    def reconnect_stats(self) -> dict:
+        """Reconnect counters and latency (device lost until reopened) for diagnostics."""
+        last = self.last_reconnect_latency
+        return {
+            "enabled": self.reconnect_attempts > 0,
+            "reconnecting": self.reconnecting,
+            "reconnects": self.reconnects,
+            "failed": self.failed_reconnects,
+            "last_latency_ms": round(last * 1000, 1) if last is not None else None,
+            "max_latency_ms": round(self.max_reconnect_latency * 1000, 1),
+        }
     
     async def send(self, data: bytes) -> None:
         """Send data to serial port.
@@ -96,16 +293,15 @@ class SerialBackend(BaseBackend):
         Args:
             data: Data to send
         """
-        if not self.serial_port or not self.serial_port.is_open:
+        if not self.serial_port or not self.serial_port.is_open or not self.tx_worker:
             raise RuntimeError("Serial port not connected")
         
-        # Run blocking write in executor
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.serial_port.write, data)
-        await loop.run_in_executor(None, self.serial_port.flush)
+        # Queued behind earlier sends; concurrent sends are merged, never interleaved
+        await self.tx_worker.submit(data)
+        self._count_tx(data)
         
         if self.log_tx:
-            self._write_to_log(data)
+            self._write_to_log(data, tx=True)
     
     def is_connected(self) -> bool:
         """Check if serial port is connected.
@@ -115,78 +311,28 @@ class SerialBackend(BaseBackend):
         """
         return self._connected and self.serial_port is not None and self.serial_port.is_open
     
-    def set_data_callback(self, callback: Callable[[bytes], None]) -> None:
-        """Set callback function for received data.
-        
-        Args:
-            callback: Function to call when data is received
-        """
-        self.data_callback = callback
-
-    def get_history(self) -> bytes:
-        """Get the current history buffer content.
-        
-        Returns:
-            The raw bytes currently stored in the history buffer.
-        """
-        return bytes(self.history_buffer)
-    
-    def set_log_file(self, path: str, log_mode: str = "printable", log_tx: bool = True) -> None:
-        """Set the path and mode for session logging."""
-        self.log_file = path
-        self.log_mode = log_mode
-        self.log_tx = log_tx
+    def _use_event_reads(self) -> bool:
+        """Check whether the event-driven read mode applies to the open port."""
+        if self.read_mode == "executor":
+            return False
+        if self.read_mode == "auto" and not sys.platform.startswith("linux"):
+            return False
         try:
-            # Ensure directory exists
-            import os
-            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-            self.log_handle = open(path, 'ab')
-            print(f"Logging to {path} ({log_mode} mode, log_tx={log_tx})")
-        except Exception as e:
-            print(f"Failed to open log file {path}: {e}")
-
-    def update_log_settings(self, log_mode: str, log_tx: bool) -> None:
-        """Update logging settings for the current session."""
-        self.log_mode = log_mode
-        self.log_tx = log_tx
-        print(f"Logging settings updated for {self.serial_port.port if self.serial_port else 'None'}: ({log_mode} mode, log_tx={log_tx})")
+            self.serial_port.fileno()
+        except (AttributeError, ValueError, OSError, serial.SerialException):
+            return False
+        return True
 
-    def _write_to_log(self, data: bytes) -> None:
-        """Write data to log file according to current log mode."""
-        if not self.log_handle:
-            return
-            
-        try:
-            if self.log_mode == "printable":
-                # 1. Remove ANSI escape sequences
-                # Heuristic: Find \x1b (27) followed by '[' (91) up to 'm', 'G', 'K', 'H', 'f', 'J', 'A', 'B', 'C', 'D'
-                # We work with bytes, so we need a byte regex or decode/encode
-                # Decoding as latin-1 is safe for byte manipulation
-                text = data.decode('latin-1')
-                # Comprehensive ANSI escape sequence regex
-                ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-                text = ansi_escape.sub('', text)
-                
-                # 2. Only keep bytes that are printable ASCII (32-126) or common whitespace (9=\t, 10=\n, 13=\r)
-                filtered_data = bytes([b for b in text.encode('latin-1') if 32 <= b <= 126 or b in (9, 10, 13)])
-                if filtered_data:
-                    self.log_handle.write(filtered_data)
-            else:
-                self.log_handle.write(data)
-            
-            self.log_handle.flush()
-        except Exception as e:
-            print(f"Log write error: {e}")
-    
     async def _read_loop(self) -> None:
         """Background task to read data from serial port."""
-        print(f"Read loop started for: {self.serial_port.port if self.serial_port else 'None'}")
-        loop = asyncio.get_event_loop()
+        logger.debug("Read loop started for: %s", self.serial_port.port if self.serial_port else 'None')
         
         while self._connected:
             try:
+                # Hold off while a subscriber applies backpressure
+                await self.hub.writable()
                 if not self.serial_port or not self.serial_port.is_open:
-                    print("Serial port closed, exiting read loop.")
+                    logger.debug("Serial port closed, exiting read loop.")
                     break
                 
                 def blocking_read():
@@ -206,33 +352,85 @@ class SerialBackend(BaseBackend):
                         return first_byte
                     except (serial.SerialException, OSError) as e:
                         # This can happen if the device is disconnected.
-                        print(f"Read error, disconnecting: {e}")
+                        logger.warning("Read error, disconnecting: %s", e)
                         self._connected = False
                         return b''
                 
-                data = await loop.run_in_executor(None, blocking_read)
+                started = time.perf_counter()
+                data = await self.io_channel.run(blocking_read)
                 
                 if data:
-                    # Append to history
-                    self.history_buffer.extend(data)
-                    
-                    if self.data_callback:
-                        self.data_callback(data)
-                        
-                    self._write_to_log(data)
+                    if metrics.enabled:
+                        self._observe_read(time.perf_counter() - started, data)
+                    self._handle_data(data)
                 else:
                     # No data received, small sleep to prevent busy loop
                     await asyncio.sleep(0.01)
                         
             except asyncio.CancelledError:
-                print("Read loop cancelled")
+                logger.debug("Read loop cancelled")
                 break
             except Exception as e:
-                print(f"Error in read loop: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error in read loop: %s", e)
                 await asyncio.sleep(0.1)  # Don't exit immediately, wait and retry
     
+    async def _read_loop_event(self) -> None:
+        """Background task that reads the tty only when the loop reports it readable."""
+        logger.debug("Event read loop started for: %s", self.serial_port.port if self.serial_port else 'None')
+        loop = asyncio.get_running_loop()
+        fd = self.serial_port.fileno()
+        try:
+            while self._connected:
+                self._read_wakeup = loop.create_future()
+                loop.add_reader(fd, self._on_readable, fd)
+                try:
+                    await self._read_wakeup
+                finally:
+                    loop.remove_reader(fd)
+                # Stopped reading for backpressure: wait for subscribers to drain
+                await self.hub.writable()
+        except asyncio.CancelledError:
+            logger.debug("Read loop cancelled")
+        finally:
+            self._read_wakeup = None
+
+    def _on_readable(self, fd: int) -> None:
+        """Reader callback: drain whatever the kernel has buffered for the tty."""
+        started = time.perf_counter()
+        try:
+            data = os.read(fd, EVENT_READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logger.warning("Read error, disconnecting: %s", e)
+            data = b''
+        
+        if data:
+            if metrics.enabled:
+                self._observe_read(time.perf_counter() - started, data)
+            self._handle_data(data)
+        else:
+            # Readable but empty means the device went away (hangup)
+            self._connected = False
+        
+        if (not self._connected or self.hub.paused) and not self._read_wakeup.done():
+            self._read_wakeup.set_result(None)
+
+    def _observe_read(self, elapsed: float, data: bytes) -> None:
+        port = self._serial_params['port']
+        metrics.READ_SECONDS.observe(elapsed, port)
+        metrics.READ_BYTES.observe(len(data), port)
+    
+    def _handle_data(self, data: bytes) -> None:
+        """Dispatch received data to scrollback, subscribers and log."""
+        if self.scrollback:
+            self.scrollback.append(data)
+        
+        # Append to history and notify subscribers
+        self.hub.publish(data)
+            
+        self._write_to_log(data)
+    
     @staticmethod
     def list_ports() -> list[dict]:
         """List available serial ports.
@@ -0,0 +1,314 @@
+"""Session log file written by a background thread.
+
+The event loop only enqueues chunks; a dedicated worker thread drains the
+queue, filters and writes whole batches, and flushes/fsyncs on an interval
+instead of after every chunk. Logs can be rotated by size and/or time;
+rotated segments are compressed on a separate thread so the writer never
+waits for them.
+"""
+import datetime
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Optional
+
+from .log_filter import PrintableFilter
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("never", "interval", "always")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+# Marker telling the worker to finish
+_STOP = object()
+
+# Shared single worker compressing rotated segments for all sessions
+_compressor: Optional[ThreadPoolExecutor] = None
+_compressor_lock = threading.Lock()
+
+
+def _get_compressor() -> ThreadPoolExecutor:
+    global _compressor
+    with _compressor_lock:
+        if _compressor is None:
+            _compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compress")
+        return _compressor
+
+
+def compress_file(path: str, compression: str) -> str:
+    """Compress a file next to itself and remove the original.
+
+    Args:
+        path: File to compress
+        compression: "none", "gzip" or "zstd" (falls back to gzip when the
+            zstandard package is not installed)
+
+    Returns:
+        Path of the resulting file
+    """
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            logger.warning("zstandard not installed, compressing rotated log with gzip")
+            compression = "gzip"
+
+    if compression == "gzip":
+        target = path + ".gz"
+        with open(path, 'rb') as src, gzip.open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    elif compression == "zstd":
+        target = path + ".zst"
+        with open(path, 'rb') as src, open(target, 'wb') as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    else:
+        return path
+
+    os.remove(path)
+    return target
+
+
+class SessionLog:
+    """Asynchronous, batched writer for one session log file."""
+
+    def __init__(self, path: str, log_mode: str = "printable", flush_interval: float = 0.2,
+                 fsync: str = "never", queue_size: int = 10000, max_bytes: int = 0,
+                 rotate_interval: float = 0, backup_count: int = 0, compression: str = "gzip",
+                 path_factory: Optional[Callable[[], str]] = None):
+        """Open the log file and start the writer thread.
+
+        Args:
+            path: Path to the log file (opened in append mode)
+            log_mode: "printable" or "raw"
+            flush_interval: Maximum seconds between flushes of buffered data
+            fsync: "never", "interval" (with each flush) or "always" (every batch)
+            queue_size: Maximum number of queued chunks before new ones are dropped
+            max_bytes: Rotate once the file reaches this size (0 disables)
+            rotate_interval: Rotate after this many seconds (0 disables)
+            backup_count: Rotated segments to keep (0 keeps all)
+            compression: "none", "gzip" or "zstd" for rotated segments
+            path_factory: Called at each rotation to get the next path, so
+                date/time placeholders are re-evaluated
+
+        Raises:
+            OSError: If the file cannot be opened
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}, got {fsync}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compression must be one of {COMPRESSIONS}, got {compression}")
+        self.path = path
+        self.log_mode = log_mode
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compression = compression
+        self.path_factory = path_factory
+        self.overflow_count = 0
+        self.bytes_written = 0
+        self.rotations = 0
+        self._rotated: list[str] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._last_enqueue = 0.0
+        self._last_write = 0.0
+        # RX and TX are separate streams; an escape sequence split across RX
+        # reads must not swallow a keystroke logged in between
+        self._filters = {False: PrintableFilter(), True: PrintableFilter()}
+
+        self._handle = self._open(path)
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{path}", daemon=True)
+        self._thread.start()
+
+    def write(self, data: bytes, tx: bool = False) -> None:
+        """Queue a chunk for writing; never blocks the caller.
+
+        Args:
+            data: Received or transmitted bytes
+            tx: True for transmitted data
+        """
+        try:
+            self._queue.put_nowait((bytes(data), tx))
+            self._last_enqueue = time.monotonic()
+        except queue.Full:
+            self.overflow_count += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out everything queued, then close the file.
+
+        Blocks until the worker finishes (up to timeout), so call it from a
+        thread when running inside the event loop.
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Writer counters for diagnostics."""
+        return {
+            "queued": self._queue.qsize(),
+            "overflow": self.overflow_count,
+            "bytes_written": self.bytes_written,
+            "rotations": self.rotations,
+            "lag": max(self._last_enqueue - self._last_write, 0.0),
+        }
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        dirty = False
+        running = True
+        while running:
+            # Sleep indefinitely while everything is flushed
+            batch = self._next_batch(self.flush_interval if dirty else None)
+            if batch and batch[-1] is _STOP:
+                batch.pop()
+                running = False
+
+            # Rotate lazily, when there is something to put in the new file
+            if batch and self._rotation_due():
+                self._rotate()
+                dirty = False
+
+            if batch:
+                self._write_batch(batch)
+                dirty = True
+
+            now = time.monotonic()
+            flush_due = not running or self.fsync == "always" or now - last_flush >= self.flush_interval
+            if dirty and flush_due:
+                self._flush()
+                dirty = False
+                last_flush = now
+
+        try:
+            self._handle.close()
+        except OSError as e:
+            logger.error("Log close error: %s", e)
+
+    def _next_batch(self, timeout: Optional[float]) -> list:
+        """Wait for one chunk, then take everything else already queued."""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: list) -> None:
+        if not batch:
+            return
+        if self.log_mode == "printable":
+            # Filter runs of same-direction chunks in one pass
+            data = b''.join(
+                self._filters[tx].feed(b''.join(chunk for chunk, _ in run))
+                for tx, run in groupby(batch, key=itemgetter(1))
+            )
+        else:
+            data = b''.join(chunk for chunk, _ in batch)
+        try:
+            if data:
+                self._handle.write(data)
+                self.bytes_written += len(data)
+                self._size += len(data)
+            self._last_write = time.monotonic()
+        except (OSError, ValueError) as e:
+            logger.error("Log write error: %s", e)
+
+    def _flush(self) -> None:
+        try:
+            self._handle.flush()
+            if self.fsync != "never":
+                os.fsync(self._handle.fileno())
+        except (OSError, ValueError) as e:
+            logger.error("Log flush error: %s", e)
+
+    def _open(self, path: str):
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handle = open(path, 'ab')
+        self._size = handle.tell()
+        self._opened_at = time.monotonic()
+        return handle
+
+    def _reopen(self) -> None:
+        """Best-effort reopen of the current path after a failed rotation."""
+        try:
+            self._handle = self._open(self.path)
+        except OSError as e:
+            # Handle stays closed; later writes report the error
+            logger.error("Failed to reopen log file %s: %s", self.path, e)
+
+    def _rotation_due(self) -> bool:
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.monotonic() - self._opened_at >= self.rotate_interval
+
+    def _next_path(self) -> str:
+        if not self.path_factory:
+            return self.path
+        try:
+            return self.path_factory()
+        except Exception as e:
+            logger.error("Log path template error, keeping %s: %s", self.path, e)
+            return self.path
+
+    def _rotate(self) -> None:
+        """Close the current segment, open the next one and compress the old."""
+        self._flush()
+        closed_path = self.path
+        next_path = self._next_path()
+        try:
+            self._handle.close()
+            if next_path == closed_path:
+                # Same name again: move the finished segment out of the way
+                closed_path = self._rotated_name(closed_path)
+                os.replace(self.path, closed_path)
+            self._handle = self._open(next_path)
+        except OSError as e:
+            logger.error("Log rotation error: %s", e)
+            self._reopen()
+            return
+
+        self.path = next_path
+        self.rotations += 1
+        _get_compressor().submit(self._finish_rotation, closed_path)
+
+    @staticmethod
+    def _rotated_name(path: str) -> str:
+        base, ext = os.path.splitext(path)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        candidate = f"{base}.{stamp}{ext}"
+        n = 1
+        # Earlier segments from the same second may already be compressed
+        while any(os.path.exists(candidate + suffix) for suffix in ('', '.gz', '.zst')):
+            candidate = f"{base}.{stamp}-{n}{ext}"
+            n += 1
+        return candidate
+
+    def _finish_rotation(self, path: str) -> None:
+        """Runs on the compressor thread: compress and prune old segments."""
+        try:
+            self._rotated.append(compress_file(path, self.compression))
+        except OSError as e:
+            logger.error("Log compression error for %s: %s", path, e)
+            self._rotated.append(path)
+
+        while self.backup_count and len(self._rotated) > self.backup_count:
+            try:
+                os.remove(self._rotated.pop(0))
+            except OSError as e:
+                logger.error("Failed to remove old log segment: %s", e)
@@ -0,0 +1,396 @@
+"""Serial backends hosted in worker processes.
+
+With ZFIELD_BACKEND_WORKERS > 0, serial ports are spread over that many
+worker processes. Each worker runs ordinary SerialBackends on its own event
+loop (reads, transmit worker and session log), so the per-byte work of many
+busy ports is spread over several cores instead of one GIL. Received data
+comes back through one SharedRing per port; the API process only drains the
+rings into ShardedBackend proxies, which own the history, subscribers and
+scrollback and fan data out to clients as usual. Commands and transmitted
+data travel over a multiprocessing pipe.
+
+Workers read as fast as their devices send: if the API process falls a whole
+ring behind, the oldest bytes are lost and counted, and the "backpressure"
+slow-consumer policy cannot pause a device hosted in a worker.
+"""
+import asyncio
+import functools
+import itertools
+import logging
+import multiprocessing
+from typing import Optional
+
+from .base import BaseBackend
+from .ring_buffer import DEFAULT_HISTORY_SIZE
+from .serial_backend import SerialBackend
+from .shm_ring import SharedRing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RING_SIZE = 4 * 1024 * 1024
+
+# History kept by the worker-side backend; the proxy keeps the real history
+_WORKER_HISTORY_SIZE = 64 * 1024
+# Seconds between checks for ports that went away inside a worker
+_WATCH_INTERVAL = 0.5
+
+
+def _worker_main(conn, read_mode: str) -> None:
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(_WorkerHost(conn, read_mode).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+class _WorkerHost:
+    """Worker process side: runs the backends and executes commands."""
+
+    def __init__(self, conn, read_mode: str):
+        self.conn = conn
+        self.read_mode = read_mode
+        self.backends: dict[str, SerialBackend] = {}
+        self.rings: dict[str, SharedRing] = {}
+        self._inbox: Optional[asyncio.Queue] = None
+        # Running commands and the watcher, referenced until they finish
+        self._tasks: set[asyncio.Task] = set()
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._inbox = asyncio.Queue()
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+        self._spawn(self._watch())
+        while True:
+            message = await self._inbox.get()
+            if message is None:
+                break
+            # Commands start in arrival order, so sends to a port stay ordered
+            self._spawn(self._execute(*message))
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        loop.remove_reader(self.conn.fileno())
+        for port in list(self.backends):
+            await self._cmd_disconnect(port)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _on_readable(self) -> None:
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                self._inbox.put_nowait(None if message[1] == "stop" else message)
+        except (EOFError, OSError):
+            # The API process is gone
+            self._inbox.put_nowait(None)
+
+    async def _execute(self, request_id: Optional[int], command: str, args: tuple) -> None:
+        try:
+            result = await getattr(self, f"_cmd_{command}")(*args)
+        except Exception as e:
+            # Exceptions are not always picklable; send the message instead
+            self._reply(request_id, False, f"{type(e).__name__}: {e}")
+            return
+        self._reply(request_id, True, result)
+
+    def _reply(self, request_id: Optional[int], ok: bool, value) -> None:
+        if request_id is None:
+            if not ok:
+                logger.error("Backend worker command failed: %s", value)
+            return
+        self.conn.send(("reply", request_id, ok, value))
+
+    def _publish(self, port: str, ring: SharedRing, data: bytes) -> None:
+        ring.append(data)
+        if ring.take_doorbell():
+            self.conn.send(("data", port))
+
+    async def _watch(self) -> None:
+        """Report ports whose device went away (unplugged, hangup)."""
+        while True:
+            await asyncio.sleep(_WATCH_INTERVAL)
+            for port, backend in list(self.backends.items()):
+                if backend.is_connected() or backend.reconnecting:
+                    continue
+                try:
+                    await self._cmd_disconnect(port)
+                except Exception as e:
+                    logger.error("Closing lost port %s failed: %s", port, e)
+                self.conn.send(("closed", port))
+
+    async def _cmd_connect(self, port: str, baudrate: int, kwargs: dict, ring_name: str, ring_size: int,
+                           reconnect: tuple[int, float]) -> bool:
+        ring = SharedRing.attach(ring_name, ring_size)
+        attempts, delay = reconnect
+        backend = SerialBackend(read_mode=self.read_mode, history_size=_WORKER_HISTORY_SIZE,
+                                reconnect_attempts=attempts, reconnect_delay=delay)
+        if not await backend.connect(port=port, baudrate=baudrate, **kwargs):
+            ring.close()
+            return False
+        self.backends[port] = backend
+        self.rings[port] = ring
+        backend.set_data_callback(functools.partial(self._publish, port, ring))
+        return True
+
+    async def _cmd_disconnect(self, port: str) -> None:
+        backend = self.backends.pop(port, None)
+        ring = self.rings.pop(port, None)
+        if backend:
+            await backend.disconnect()
+        if ring is not None:
+            ring.close()
+
+    async def _cmd_send(self, port: str, data: bytes) -> None:
+        if port not in self.backends:
+            raise RuntimeError("Serial port not connected")
+        await self.backends[port].send(data)
+
+    async def _cmd_set_log(self, port: str, path: str, log_mode: str, log_tx: bool, log_options: dict) -> None:
+        self.backends[port].set_log_file(path, log_mode, log_tx, **log_options)
+
+    async def _cmd_update_log(self, port: str, log_mode: str, log_tx: bool) -> None:
+        self.backends[port].update_log_settings(log_mode, log_tx)
+
+
+class _Worker:
+    """API process side handle of one worker process."""
+
+    def __init__(self, context, index: int, read_mode: str):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, read_mode),
+                                       name=f"zfield-backend-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        self.alive = True
+        self.proxies: dict[str, "ShardedBackend"] = {}
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.conn.fileno(), self._on_readable)
+
+    async def request(self, command: str, *args):
+        """Run a command in the worker and return its result.
+
+        Raises:
+            RuntimeError: If the command failed or the worker exited
+        """
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        self._send(request_id, command, args)
+        return await future
+
+    def notify(self, command: str, *args) -> None:
+        """Run a command in the worker without waiting for it."""
+        self._send(None, command, args)
+
+    def _send(self, request_id: Optional[int], command: str, args: tuple) -> None:
+        if not self.alive:
+            raise RuntimeError("Backend worker process exited")
+        try:
+            self.conn.send((request_id, command, args))
+        except OSError as e:
+            self._on_exit()
+            raise RuntimeError(f"Backend worker process exited: {e}")
+
+    def _on_readable(self) -> None:
+        try:
+            while self.conn.poll():
+                self._dispatch(self.conn.recv())
+        except (EOFError, OSError):
+            self._on_exit()
+
+    def _dispatch(self, message: tuple) -> None:
+        kind, *rest = message
+        if kind == "reply":
+            request_id, ok, value = rest
+            future = self._pending.pop(request_id, None)
+            if not future or future.done():
+                return
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+        elif kind == "data" and rest[0] in self.proxies:
+            self.proxies[rest[0]]._drain()
+        elif kind == "closed" and rest[0] in self.proxies:
+            self.proxies[rest[0]]._on_closed()
+
+    def _on_exit(self) -> None:
+        if not self.alive:
+            return
+        self.alive = False
+        self._loop.remove_reader(self.conn.fileno())
+        logger.warning("Backend worker %s exited", self.process.name)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Backend worker process exited"))
+        self._pending.clear()
+        for proxy in list(self.proxies.values()):
+            proxy._on_closed()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        if self.alive:
+            self.notify("stop")
+        await self._loop.run_in_executor(None, self.process.join, timeout)
+        self._on_exit()
+
+    def stats(self) -> dict:
+        return {
+            "pid": self.process.pid,
+            "alive": self.alive,
+            "ports": {port: proxy.stats() for port, proxy in self.proxies.items()},
+        }
+
+
+class BackendWorkerPool:
+    """Worker processes hosting serial backends, started on first use.
+
+    Args:
+        workers: Number of worker processes
+        read_mode: Serial read mode used inside the workers
+        ring_size: Shared ring size per port, in bytes
+    """
+
+    def __init__(self, workers: int, read_mode: str = "auto", ring_size: int = DEFAULT_RING_SIZE):
+        if workers <= 0:
+            raise ValueError(f"workers must be positive, got {workers}")
+        self.workers = workers
+        self.read_mode = read_mode
+        self.ring_size = ring_size
+        self._workers: list[_Worker] = []
+
+    def assign(self) -> _Worker:
+        """Pick the worker hosting the fewest ports, restarting dead ones."""
+        # Spawned workers do not inherit the API process's loop and threads
+        context = multiprocessing.get_context("spawn")
+        if not self._workers:
+            self._workers = [_Worker(context, i, self.read_mode) for i in range(self.workers)]
+        for i, worker in enumerate(self._workers):
+            if not worker.alive:
+                self._workers[i] = _Worker(context, i, self.read_mode)
+        return min(self._workers, key=lambda worker: len(worker.proxies))
+
+    async def close(self) -> None:
+        """Stop all worker processes."""
+        for worker in self._workers:
+            await worker.close()
+        self._workers = []
+
+    def stats(self) -> list[dict]:
+        return [worker.stats() for worker in self._workers]
+
+
+class ShardedBackend(BaseBackend):
+    """Proxy for a serial port hosted in a worker process.
+
+    History, subscribers and scrollback live in this process as with any
+    backend; reading, writing and the session log happen in the worker.
+    Reconnecting after a device loss also happens in the worker; the proxy
+    stays connected meanwhile and only closes if the worker gives up.
+    """
+
+    def __init__(self, pool: BackendWorkerPool, history_size: int = DEFAULT_HISTORY_SIZE,
+                 reconnect_attempts: int = 0, reconnect_delay: float = 1.0):
+        super().__init__(history_size)
+        self.pool = pool
+        self.reconnect = (reconnect_attempts, reconnect_delay)
+        self.worker: Optional[_Worker] = None
+        self.ring: Optional[SharedRing] = None
+        self.port: Optional[str] = None
+        self.baudrate: Optional[int] = None
+        self.lost_bytes = 0
+        self._cursor = 0
+        self._connected = False
+
+    async def connect(self, port: str, baudrate: int = 115200, **kwargs) -> bool:
+        """Open the port inside the least busy worker process.
+
+        Returns:
+            True if connection successful, False otherwise
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.worker = self.pool.assign()
+        self.ring = SharedRing.create(self.pool.ring_size)
+        self.worker.proxies[port] = self
+        try:
+            success = await self.worker.request("connect", port, baudrate, kwargs, self.ring.name, self.ring.capacity,
+                                                self.reconnect)
+        except RuntimeError as e:
+            logger.error("Error connecting to serial port: %s", e)
+            success = False
+
+        if not success:
+            self._release()
+            return False
+        self._connected = True
+        self._drain()
+        logger.info("Connected to %s at %s baud in %s.", port, baudrate, self.worker.process.name)
+        return True
+
+    async def disconnect(self) -> None:
+        """Close the port in its worker."""
+        self._connected = False
+        if self.worker and self.worker.alive:
+            try:
+                await self.worker.request("disconnect", self.port)
+            except RuntimeError as e:
+                logger.error("Error disconnecting %s: %s", self.port, e)
+        self._release()
+
+    async def send(self, data: bytes) -> None:
+        """Send data through the worker; completes once it was written."""
+        if not self._connected:
+            raise RuntimeError("Serial port not connected")
+        await self.worker.request("send", self.port, bytes(data))
+        self._count_tx(data)
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def set_log_file(self, path: str, log_mode: str = "printable", log_tx: bool = True, **log_options) -> None:
+        """Open the session log inside the worker, next to the data it reads."""
+        self.log_file = path
+        self.log_mode = log_mode
+        self.log_tx = log_tx
+        self.worker.notify("set_log", self.port, path, log_mode, log_tx, log_options)
+
+    def update_log_settings(self, log_mode: str, log_tx: bool) -> None:
+        self.log_mode = log_mode
+        self.log_tx = log_tx
+        self.worker.notify("update_log", self.port, log_mode, log_tx)
+
+    def stats(self) -> dict:
+        return {"lost_bytes": self.lost_bytes}
+
+    def _drain(self) -> None:
+        """Move newly received data from the shared ring into the hub."""
+        while self.ring is not None:
+            self._cursor, data, lost = self.ring.read_since(self._cursor)
+            self.lost_bytes += lost
+            if data:
+                if self.scrollback:
+                    self.scrollback.append(data)
+                self.hub.publish(data)
+            self.ring.arm()
+            # Data appended before the doorbell was armed rang no bell
+            if self.ring.end == self._cursor:
+                break
+
+    def _on_closed(self) -> None:
+        """The device went away or the worker exited."""
+        self._drain()
+        self._connected = False
+        self._release()
+
+    def _release(self) -> None:
+        if self.worker:
+            self.worker.proxies.pop(self.port, None)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
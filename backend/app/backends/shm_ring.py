@@ -0,0 +1,93 @@
+"""RingBuffer living in shared memory, for handing data between processes.
+
+One process (the producer) appends; another reads by absolute position, as
+with the in-process RingBuffer. The segment starts with a small header:
+
+- the write position (end), updated after the data is in place;
+- a doorbell flag the consumer sets before it goes idle. The producer clears
+  it on its next append and tells the consumer, over some other channel,
+  that data is waiting, so a busy consumer costs no notifications at all.
+"""
+import struct
+from multiprocessing import shared_memory
+
+from .ring_buffer import RingBuffer
+
+_END = struct.Struct('<Q')
+_DOORBELL_OFFSET = 8
+HEADER_SIZE = 16
+
+
+class SharedRing(RingBuffer):
+    """Single-producer, single-consumer byte ring in a shared memory segment."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, capacity: int, owner: bool):
+        # Storage and position come from the segment; nothing to allocate here
+        self._shm = shm
+        self._owner = owner
+        self.capacity = capacity
+        self._view = shm.buf[HEADER_SIZE:HEADER_SIZE + capacity]
+
+    @classmethod
+    def create(cls, capacity: int) -> "SharedRing":
+        """Allocate a new segment; the creator unlinks it on close."""
+        if capacity <= 0:
+            raise ValueError(f"Ring buffer capacity must be positive, got {capacity}")
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        return cls(shm, capacity, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> "SharedRing":
+        """Open a segment created by another process."""
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def _end(self) -> int:
+        return _END.unpack_from(self._shm.buf, 0)[0]
+
+    @_end.setter
+    def _end(self, value: int) -> None:
+        _END.pack_into(self._shm.buf, 0, value)
+
+    def arm(self) -> None:
+        """Consumer side: ask to be notified of the next append."""
+        self._shm.buf[_DOORBELL_OFFSET] = 1
+
+    def take_doorbell(self) -> bool:
+        """Producer side: True (once) if the consumer asked to be notified."""
+        if not self._shm.buf[_DOORBELL_OFFSET]:
+            return False
+        self._shm.buf[_DOORBELL_OFFSET] = 0
+        return True
+
+    def read_since(self, position: int) -> tuple[int, bytes, int]:
+        """Consumer side: copy everything appended after position.
+
+        Returns:
+            Tuple of (new position, data, bytes lost because the producer
+            overwrote them before they were read)
+        """
+        end = self._end
+        start = max(position, end - self.capacity)
+        # Copy by offset: views() would re-clamp against the moving end
+        offset = start % self.capacity
+        first = min(end - start, self.capacity - offset)
+        data = bytes(self._view[offset:offset + first]) + bytes(self._view[:end - start - first])
+        # The producer may have lapped the copy; drop the overwritten prefix
+        overwritten = self._end - self.capacity - start
+        if overwritten > 0:
+            data = data[overwritten:]
+            start += overwritten
+        return end, data, start - position
+
+    def close(self) -> None:
+        """Detach from the segment (and remove it if this process created it)."""
+        self._view.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -1,197 +1,378 @@
-"""Telnet/TCP backend implementation."""
+"""Telnet/TCP backend implementation.
+
+Data is received with a BufferedProtocol straight into one preallocated
+buffer per connection. Chunks without Telnet commands are handed to the
+history, scrollback, log and hub callbacks as memoryviews of that buffer,
+so the receive path allocates nothing per read; the history ring copies the
+bytes once into its own storage.
+"""
 import asyncio
-import re
+import logging
+import socket
 from typing import Optional, Callable
-from collections import deque
 from .base import BaseBackend
+from .ring_buffer import DEFAULT_HISTORY_SIZE
+from . import telnet_protocol as tp
+
+logger = logging.getLogger(__name__)
+
+# How long to wait for an RFC 2217 server to acknowledge a setting
+RFC2217_ACK_TIMEOUT = 2.0
+
+# Receive buffer allocated once per connection
+DEFAULT_READ_SIZE = 65536
+
+# Keepalive probing (where the platform supports tuning it): first probe
+# after 30 s idle, then every 10 s, give up after 3 unanswered probes
+KEEPALIVE_TUNING = (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+
+# How long disconnect waits for unsent data before dropping the connection
+CLOSE_TIMEOUT = 2.0
+
+
+class _ReceiveProtocol(asyncio.BufferedProtocol):
+    """Reads into one reusable buffer and passes each read to the backend."""
+
+    def __init__(self, backend: "TelnetBackend", read_size: int):
+        self.backend = backend
+        self.buffer = bytearray(read_size)
+        self._view = memoryview(self.buffer)
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed = asyncio.get_running_loop().create_future()
+        self._write_paused = False
+        self._drain_waiters: list[asyncio.Future] = []
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self._view
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.backend._on_receive(self.buffer, nbytes)
+
+    def eof_received(self) -> bool:
+        # Close our side too
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._wake_writers(ConnectionResetError("Connection lost"))
+        if not self.closed.done():
+            self.closed.set_result(None)
+        self.backend._on_connection_lost(exc)
+
+    def pause_writing(self) -> None:
+        self._write_paused = True
+
+    def resume_writing(self) -> None:
+        self._write_paused = False
+        self._wake_writers(None)
+
+    async def drain(self) -> None:
+        """Wait until the transport's write buffer is below its high-water mark."""
+        if self.transport.is_closing():
+            raise ConnectionResetError("Connection lost")
+        if not self._write_paused:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    def _wake_writers(self, error: Optional[Exception]) -> None:
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(None)
 
 
 class TelnetBackend(BaseBackend):
-    """Telnet (Raw TCP) communication backend."""
-    
-    def __init__(self):
-        self.reader: Optional[asyncio.StreamReader] = None
-        self.writer: Optional[asyncio.StreamWriter] = None
-        self.data_callback: Optional[Callable[[bytes], None]] = None
-        self.read_task: Optional[asyncio.Task] = None
+    """Telnet / TCP communication backend.
+
+    Modes:
+        raw: Plain TCP, bytes are passed through untouched
+        telnet: Answers option negotiation and strips IAC sequences; never
+            starts negotiation itself, so raw TCP servers are unaffected
+        rfc2217: Telnet plus the COM-PORT-OPTION, for remote serial ports
+            (ser2net, Moxa, ...) whose line settings are set from here
+    """
+
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE, mode: str = "raw",
+                 read_size: int = DEFAULT_READ_SIZE, nodelay: bool = True, keepalive: bool = True,
+                 rcvbuf: int = 0):
+        """
+        Args:
+            history_size: History buffer size in bytes
+            mode: "raw", "telnet" or "rfc2217"
+            read_size: Size of the preallocated receive buffer
+            nodelay: Disable Nagle's algorithm (send keystrokes immediately)
+            keepalive: Enable TCP keepalive probes to detect dead peers
+            rcvbuf: Kernel receive buffer size (SO_RCVBUF, 0 keeps the OS default)
+        """
+        super().__init__(history_size)
+        if mode not in tp.TELNET_MODES:
+            raise ValueError(f"Telnet mode must be one of {list(tp.TELNET_MODES)}, got {mode}")
+        if read_size <= 0:
+            raise ValueError(f"Read size must be positive, got {read_size}")
+        self.mode = mode
+        self.read_size = read_size
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+        self.rcvbuf = rcvbuf
+        self.transport: Optional[asyncio.Transport] = None
+        self.protocol: Optional[_ReceiveProtocol] = None
+        self.codec: Optional[tp.TelnetCodec] = None
+        self.baudrate: Optional[int] = None
+        self.port_settings: dict = {}
+        self._acks: dict[int, asyncio.Future] = {}
+        self._resume_task: Optional[asyncio.Task] = None
         self._connected = False
-        self.history_buffer = deque(maxlen=1024 * 100)  # Store last 100KB
-        self.log_file: Optional[str] = None
-        self.log_handle = None
-        self.log_mode = "printable"
-        self.log_tx = True
-    
-    async def connect(self, host: str, port: int, **kwargs) -> bool:
+
+    async def connect(self, host: str, port: int, baudrate: Optional[int] = None, **kwargs) -> bool:
         """Connect to TCP server.
-        
+
         Args:
             host: Hostname or IP address
             port: Port number
-            **kwargs: Additional parameters (ignored)
-            
+            baudrate: Baud rate to request (rfc2217 mode only)
+            **kwargs: Line settings for rfc2217 mode (bytesize, parity,
+                stopbits, xonxoff, rtscts); ignored otherwise
+
         Returns:
             True if connection successful, False otherwise
         """
         try:
             if self._connected:
                 await self.disconnect()
-            
-            print(f"Connecting to {host}:{port}...")
-            self.reader, self.writer = await asyncio.open_connection(host, port)
-            
+
+            if self.mode != "raw":
+                self.codec = self._create_codec()
+
+            logger.debug("Connecting to %s:%s...", host, port)
+            loop = asyncio.get_running_loop()
+            self.transport, self.protocol = await loop.create_connection(
+                lambda: _ReceiveProtocol(self, self.read_size), host, port)
+            self._configure_socket(self.transport.get_extra_info('socket'))
+
             self._connected = True
-            print(f"Connected to {host}:{port}")
-            
-            # Start reading task
-            self.read_task = asyncio.create_task(self._read_loop())
-            
+            logger.info("Connected to %s:%s", host, port)
+
+            if self.codec:
+                # Our own option requests (rfc2217 mode only)
+                self._send_replies()
+
+            if self.mode == "rfc2217":
+                await self.configure_port(baudrate, **kwargs)
+
             return True
         except Exception as e:
-            print(f"Error connecting to {host}:{port}: {e}")
-            self._connected = False
+            logger.error("Error connecting to %s:%s: %s", host, port, e)
+            await self.disconnect()
             return False
-    
+
+    def _configure_socket(self, sock) -> None:
+        """Apply TCP_NODELAY, keepalive and receive buffer options."""
+        if sock is None:
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.nodelay))
+        if self.keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for name, value in KEEPALIVE_TUNING:
+                if hasattr(socket, name):
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), value)
+        if self.rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+
+    def _create_codec(self) -> tp.TelnetCodec:
+        if self.mode != "rfc2217":
+            return tp.TelnetCodec()
+        codec = tp.TelnetCodec(accept_local=frozenset({tp.BINARY, tp.SGA, tp.COM_PORT_OPTION}))
+        codec.on_subnegotiation = self._on_subnegotiation
+        # Binary transparency both ways, then announce com port control
+        for option in (tp.BINARY, tp.SGA):
+            codec.request_do(option)
+        for option in (tp.BINARY, tp.COM_PORT_OPTION):
+            codec.request_will(option)
+        return codec
+
+    async def configure_port(self, baudrate: Optional[int] = None, bytesize: Optional[int] = None,
+                             parity: Optional[str] = None, stopbits: Optional[float] = None,
+                             xonxoff: Optional[bool] = None, rtscts: Optional[bool] = None) -> dict:
+        """Apply serial line settings on the remote port (rfc2217 mode).
+
+        Settings left as None are not changed. A server that does not
+        acknowledge a setting leaves the connection usable; the setting is
+        just not recorded.
+
+        Returns:
+            Settings acknowledged by the server
+        """
+        if self.mode != "rfc2217" or not self.transport:
+            raise RuntimeError("Line settings require an rfc2217 connection")
+
+        commands = []
+        if baudrate is not None:
+            commands.append(("baudrate", tp.SET_BAUDRATE, tp.baudrate_value(baudrate)))
+        if bytesize is not None:
+            commands.append(("bytesize", tp.SET_DATASIZE, bytes([bytesize])))
+        if parity is not None:
+            commands.append(("parity", tp.SET_PARITY, bytes([tp.PARITY_CODES[parity.upper()]])))
+        if stopbits is not None:
+            commands.append(("stopbits", tp.SET_STOPSIZE, bytes([tp.STOPBITS_CODES[stopbits]])))
+        if xonxoff is not None or rtscts is not None:
+            commands.append(("flow_control", tp.SET_CONTROL, bytes([self._flow_code(xonxoff, rtscts)])))
+
+        acked = {}
+        for name, command, value in commands:
+            reply = await self._com_port_request(command, value)
+            if reply is None:
+                logger.warning("RFC 2217 server did not acknowledge %s", name)
+                continue
+            acked[name] = self._decode_setting(name, reply)
+
+        self.port_settings.update(acked)
+        if "baudrate" in acked:
+            self.baudrate = acked["baudrate"]
+        return acked
+
+    @staticmethod
+    def _flow_code(xonxoff: Optional[bool], rtscts: Optional[bool]) -> int:
+        if rtscts:
+            return tp.FLOW_HARDWARE
+        if xonxoff:
+            return tp.FLOW_XONXOFF
+        return tp.FLOW_NONE
+
+    @staticmethod
+    def _decode_setting(name: str, value: bytes):
+        """Turn a server acknowledgement back into a pyserial-style value."""
+        if name == "baudrate":
+            return int.from_bytes(value[:4], "big")
+        code = value[0] if value else 0
+        tables = {
+            "parity": {v: k for k, v in tp.PARITY_CODES.items()},
+            "stopbits": {v: k for k, v in tp.STOPBITS_CODES.items()},
+            "flow_control": {tp.FLOW_NONE: "none", tp.FLOW_XONXOFF: "xonxoff", tp.FLOW_HARDWARE: "rtscts"},
+        }
+        if name in tables:
+            return tables[name].get(code, code)
+        return code
+
+    async def _com_port_request(self, command: int, value: bytes) -> Optional[bytes]:
+        """Send one COM-PORT-OPTION command and wait for the server's answer."""
+        reply_code = command + tp.SERVER_OFFSET
+        future = asyncio.get_running_loop().create_future()
+        self._acks[reply_code] = future
+        try:
+            self.transport.write(tp.com_port_command(command, value))
+            await self.protocol.drain()
+            return await asyncio.wait_for(future, RFC2217_ACK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._acks.pop(reply_code, None)
+
+    def _on_subnegotiation(self, option: int, payload: bytes) -> None:
+        if option != tp.COM_PORT_OPTION or not payload:
+            return
+        future = self._acks.get(payload[0])
+        if future and not future.done():
+            future.set_result(payload[1:])
+
     async def disconnect(self) -> None:
         """Close TCP connection."""
         self._connected = False
-        
-        if self.read_task:
-            self.read_task.cancel()
-            try:
-                await self.read_task
-            except asyncio.CancelledError:
-                pass
-            self.read_task = None
-        
-        if self.writer:
-            try:
-                self.writer.close()
-                await self.writer.wait_closed()
-            except Exception as e:
-                print(f"Error closing writer: {e}")
-        
-        self.reader = None
-        self.writer = None
-        
-        if self.log_handle:
+
+        if self._resume_task:
+            self._resume_task.cancel()
+            self._resume_task = None
+
+        if self.transport:
+            self.transport.close()
             try:
-                self.log_handle.close()
-            except:
-                pass
-            self.log_handle = None
-    
+                # Let unsent data go out, but do not wait on a stuck peer
+                await asyncio.wait_for(asyncio.shield(self.protocol.closed), CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.transport.abort()
+
+        self.transport = None
+        self.protocol = None
+        self.codec = None
+
+        await self._close_log()
+
     async def send(self, data: bytes) -> None:
         """Send data to TCP connection.
-        
+
         Args:
             data: Data to send
         """
-        if not self.writer or not self._connected:
+        if not self.transport or not self._connected:
             raise RuntimeError("Not connected")
-        
-        self.writer.write(data)
-        await self.writer.drain()
-        
+
+        self.transport.write(self.codec.encode(data) if self.codec else data)
+        await self.protocol.drain()
+        self._count_tx(data)
+
         if self.log_tx:
-            self._write_to_log(data)
-    
+            self._write_to_log(data, tx=True)
+
     def is_connected(self) -> bool:
         """Check if backend is connected.
-        
+
         Returns:
             True if connected, False otherwise
         """
-        return self._connected and self.writer is not None and not self.writer.is_closing()
-    
-    def set_data_callback(self, callback: Callable[[bytes], None]) -> None:
-        """Set callback function for received data.
-        
-        Args:
-            callback: Function to call when data is received
-        """
-        self.data_callback = callback
-        
-    def get_history(self) -> bytes:
-        """Get the current history buffer content.
-        
-        Returns:
-            The raw bytes currently stored in the history buffer.
-        """
-        return bytes(self.history_buffer)
-        
-    def set_log_file(self, path: str, log_mode: str = "printable", log_tx: bool = True) -> None:
-        """Set the path and mode for session logging."""
-        self.log_file = path
-        self.log_mode = log_mode
-        self.log_tx = log_tx
+        return self._connected and self.transport is not None and not self.transport.is_closing()
+
+    def _on_receive(self, buffer: bytearray, size: int) -> None:
+        """Handle one read; data is a view of the receive buffer unless decoded."""
         try:
-            # Ensure directory exists
-            import os
-            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-            self.log_handle = open(path, 'ab')
-            print(f"Logging to {path} ({log_mode} mode, log_tx={log_tx})")
+            if self.codec:
+                data = self.codec.feed_buffer(buffer, size)
+                self._send_replies()
+            else:
+                data = memoryview(buffer)[:size]
+            if data:
+                self._publish(data)
         except Exception as e:
-            print(f"Failed to open log file {path}: {e}")
+            logger.error("Error handling received data: %s", e)
+
+        if self.hub.paused:
+            self._pause_reading()
 
-    def update_log_settings(self, log_mode: str, log_tx: bool) -> None:
-        """Update logging settings for the current session."""
-        self.log_mode = log_mode
-        self.log_tx = log_tx
-        print(f"Logging settings updated for Telnet: ({log_mode} mode, log_tx={log_tx})")
+    def _publish(self, data) -> None:
+        if self.scrollback:
+            self.scrollback.append(data)
 
-    def _write_to_log(self, data: bytes) -> None:
-        """Write data to log file according to current log mode."""
-        if not self.log_handle:
+        # Append to history and notify subscribers
+        self.hub.publish(data)
+
+        self._write_to_log(data)
+
+    def _pause_reading(self) -> None:
+        """Stop reading from the socket while a subscriber applies backpressure."""
+        if self._resume_task or not self.transport:
             return
-            
-        try:
-            if self.log_mode == "printable":
-                # 1. Remove ANSI escape sequences
-                # Decoding as latin-1 is safe for byte manipulation
-                text = data.decode('latin-1')
-                # Comprehensive ANSI escape sequence regex
-                ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-                text = ansi_escape.sub('', text)
-                
-                # 2. Only keep bytes that are printable ASCII (32-126) or common whitespace (9=\t, 10=\n, 13=\r)
-                filtered_data = bytes([b for b in text.encode('latin-1') if 32 <= b <= 126 or b in (9, 10, 13)])
-                if filtered_data:
-                    self.log_handle.write(filtered_data)
-            else:
-                self.log_handle.write(data)
-            
-            self.log_handle.flush()
-        except Exception as e:
-            print(f"Log write error: {e}")
-        
-    async def _read_loop(self) -> None:
-        """Background task to read data from connection."""
-        print("Read loop started")
-        
-        while self._connected:
-            try:
-                if not self.reader:
-                    break
-                    
-                data = await self.reader.read(4096)
-                
-                if not data:
-                    print("Connection closed by server")
-                    self._connected = False
-                    break
-                    
-                # Append to history
-                self.history_buffer.extend(data)
-                
-                if self.data_callback:
-                    self.data_callback(data)
-                    
-                self._write_to_log(data)
-                        
-            except asyncio.CancelledError:
-                print("Read loop cancelled")
-                break
-            except Exception as e:
-                print(f"Error in read loop: {e}")
-                self._connected = False
-                break
+        self.transport.pause_reading()
+        self._resume_task = asyncio.get_running_loop().create_task(self._resume_when_writable())
+
+    async def _resume_when_writable(self) -> None:
+        await self.hub.writable()
+        self._resume_task = None
+        if self.transport and not self.transport.is_closing():
+            self.transport.resume_reading()
+
+    def _on_connection_lost(self, exc: Optional[Exception]) -> None:
+        if self._connected:
+            logger.warning("Connection closed by server: %s", exc or "end of stream")
+        self._connected = False
+
+    def _send_replies(self) -> None:
+        """Send pending Telnet negotiation answers."""
+        replies = self.codec.take_replies()
+        if replies:
+            self.transport.write(replies)
@@ -0,0 +1,202 @@
+"""Telnet option negotiation (RFC 854/855) and RFC 2217 com port control.
+
+TelnetCodec strips IAC command sequences out of the received stream, answers
+option negotiation and escapes 0xFF in transmitted data. Chunks without a
+single 0xFF byte - almost all terminal output - are returned untouched after
+one ``find``; only chunks containing IAC go through the state machine.
+"""
+import struct
+from typing import Callable, Optional
+
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+# Options
+BINARY = 0
+ECHO = 1
+SGA = 3
+COM_PORT_OPTION = 44
+
+# RFC 2217 client commands; the server answers with the code + SERVER_OFFSET
+SET_BAUDRATE = 1
+SET_DATASIZE = 2
+SET_PARITY = 3
+SET_STOPSIZE = 4
+SET_CONTROL = 5
+PURGE_DATA = 12
+SERVER_OFFSET = 100
+
+# RFC 2217 values for pyserial-style settings
+PARITY_CODES = {'N': 1, 'O': 2, 'E': 3, 'M': 4, 'S': 5}
+STOPBITS_CODES = {1: 1, 2: 2, 1.5: 3}
+FLOW_NONE = 1
+FLOW_XONXOFF = 2
+FLOW_HARDWARE = 3
+
+TELNET_MODES = ("raw", "telnet", "rfc2217")
+
+_IAC_BYTE = bytes([IAC])
+_IAC_ESCAPED = bytes([IAC, IAC])
+
+# Longest subnegotiation kept before the rest is discarded
+MAX_SUBNEGOTIATION = 4096
+
+# Parser states
+_DATA, _IAC_SEEN, _OPTION, _SB, _SB_IAC = range(5)
+
+
+def subnegotiation(option: int, payload: bytes) -> bytes:
+    """Encode IAC SB option payload IAC SE, escaping 0xFF in the payload."""
+    return bytes([IAC, SB, option]) + payload.replace(_IAC_BYTE, _IAC_ESCAPED) + bytes([IAC, SE])
+
+
+def com_port_command(command: int, value: bytes) -> bytes:
+    """Encode an RFC 2217 COM-PORT-OPTION command."""
+    return subnegotiation(COM_PORT_OPTION, bytes([command]) + value)
+
+
+def baudrate_value(baudrate: int) -> bytes:
+    return struct.pack('>I', baudrate)
+
+
+class TelnetCodec:
+    """Stateful Telnet stream decoder and negotiator; one per connection.
+
+    Args:
+        accept_remote: Options the server may enable on its side (WILL)
+        accept_local: Options we agree to enable on our side (DO)
+    """
+
+    def __init__(self, accept_remote: frozenset = frozenset({BINARY, ECHO, SGA}),
+                 accept_local: frozenset = frozenset({BINARY, SGA})):
+        self.accept_remote = accept_remote
+        self.accept_local = accept_local
+        self.remote: set[int] = set()
+        self.local: set[int] = set()
+        self.on_subnegotiation: Optional[Callable[[int, bytes], None]] = None
+        self._requested: set[tuple[int, int]] = set()
+        self._replies: list[bytes] = []
+        self._state = _DATA
+        self._command = 0
+        self._sb = bytearray()
+
+    def feed(self, data: bytes) -> bytes:
+        """Decode a received chunk and return the payload bytes in it."""
+        if self._state == _DATA and data.find(_IAC_BYTE) < 0:
+            return data
+        out = bytearray()
+        i = 0
+        while i < len(data):
+            if self._state == _DATA:
+                i = self._copy_data(data, i, out)
+            else:
+                self._step(data[i], out)
+                i += 1
+        return bytes(out)
+
+    def feed_buffer(self, buffer: bytearray, size: int):
+        """Decode the first size bytes of a reusable receive buffer.
+
+        Without commands the result is a memoryview of the buffer itself
+        (valid until the buffer is refilled); otherwise it is new bytes.
+        """
+        if self._state == _DATA and buffer.find(_IAC_BYTE, 0, size) < 0:
+            return memoryview(buffer)[:size]
+        return self.feed(bytes(buffer[:size]))
+
+    def encode(self, data: bytes) -> bytes:
+        """Escape transmitted data (0xFF becomes IAC IAC)."""
+        if data.find(_IAC_BYTE) < 0:
+            return data
+        return data.replace(_IAC_BYTE, _IAC_ESCAPED)
+
+    def request_will(self, option: int) -> None:
+        """Offer to enable an option on our side."""
+        self._requested.add((WILL, option))
+        self._replies.append(bytes([IAC, WILL, option]))
+
+    def request_do(self, option: int) -> None:
+        """Ask the server to enable an option on its side."""
+        self._requested.add((DO, option))
+        self._replies.append(bytes([IAC, DO, option]))
+
+    def take_replies(self) -> bytes:
+        """Negotiation bytes that must be sent to the server."""
+        replies = b''.join(self._replies)
+        self._replies.clear()
+        return replies
+
+    def _copy_data(self, data: bytes, i: int, out: bytearray) -> int:
+        """Copy the run of plain data starting at i; return where it stopped."""
+        j = data.find(_IAC_BYTE, i)
+        if j < 0:
+            out += data[i:]
+            return len(data)
+        out += data[i:j]
+        self._state = _IAC_SEEN
+        return j + 1
+
+    def _step(self, byte: int, out: bytearray) -> None:
+        if self._state == _IAC_SEEN:
+            self._after_iac(byte, out)
+        elif self._state == _OPTION:
+            self._negotiate(self._command, byte)
+            self._state = _DATA
+        elif self._state == _SB:
+            if byte == IAC:
+                self._state = _SB_IAC
+            elif len(self._sb) < MAX_SUBNEGOTIATION:
+                self._sb.append(byte)
+        else:
+            self._after_sb_iac(byte)
+
+    def _after_iac(self, byte: int, out: bytearray) -> None:
+        if byte == IAC:
+            # Escaped 0xFF data byte
+            out.append(IAC)
+            self._state = _DATA
+        elif byte in (WILL, WONT, DO, DONT):
+            self._command = byte
+            self._state = _OPTION
+        elif byte == SB:
+            self._sb.clear()
+            self._state = _SB
+        else:
+            # NOP, GA, AYT, ... carry no data
+            self._state = _DATA
+
+    def _after_sb_iac(self, byte: int) -> None:
+        if byte == IAC:
+            self._sb.append(IAC)
+            self._state = _SB
+            return
+        # IAC SE (or a malformed end) closes the subnegotiation
+        self._state = _DATA
+        if self._sb and self.on_subnegotiation:
+            self.on_subnegotiation(self._sb[0], bytes(self._sb[1:]))
+
+    def _negotiate(self, command: int, option: int) -> None:
+        """Answer WILL/WONT/DO/DONT, replying only when our state changes."""
+        if command in (WILL, WONT):
+            self._update(option, command == WILL, self.remote, self.accept_remote, DO, (DO, DONT))
+        else:
+            self._update(option, command == DO, self.local, self.accept_local, WILL, (WILL, WONT))
+
+    def _update(self, option: int, enable: bool, enabled: set, acceptable: frozenset,
+                request: int, answers: tuple[int, int]) -> None:
+        requested = (request, option) in self._requested
+        self._requested.discard((request, option))
+        if enable and option in acceptable:
+            if option not in enabled:
+                enabled.add(option)
+                if not requested:
+                    self._replies.append(bytes([IAC, answers[0], option]))
+            return
+        if option in enabled or enable:
+            enabled.discard(option)
+            self._replies.append(bytes([IAC, answers[1], option]))
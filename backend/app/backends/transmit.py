@@ -0,0 +1,127 @@
+"""Ordered, coalescing transmit worker for blocking device writes.
+
+Each connection gets one worker thread. Writes are queued in order; when the
+thread picks up work it joins everything already queued into one write and
+one flush, so a paste or a script costs a few syscalls instead of a thread
+pool round trip per chunk. Every submitted write gets its own future that
+completes once its bytes have been written and flushed.
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+# Largest amount of queued data merged into one write
+TX_MERGE_LIMIT = 64 * 1024
+
+
+class TransmitWorker:
+    """Dedicated writer thread for one connection.
+
+    Args:
+        write: Blocking write function (e.g. ``serial.Serial.write``)
+        flush: Blocking flush run after each merged write, or None
+        name: Thread name suffix used in diagnostics
+        merge_limit: Upper bound on bytes merged into one write
+    """
+
+    def __init__(self, write: Callable[[bytes], object], flush: Optional[Callable[[], None]] = None,
+                 name: str = "", merge_limit: int = TX_MERGE_LIMIT):
+        self._write = write
+        self._flush = flush
+        self.merge_limit = merge_limit
+        self.writes = 0
+        self.syscalls = 0
+        self.bytes_written = 0
+        self.max_merged = 0
+        self._queue: deque[tuple[bytes, asyncio.Future]] = deque()
+        self._queued_bytes = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._run, name=f"tx:{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes) -> asyncio.Future:
+        """Queue data for writing; must be called from the event loop.
+
+        Returns:
+            Future resolved when the data was written, or failed with the
+            write error
+        """
+        future = self._loop.create_future()
+        if self._closed:
+            future.set_exception(RuntimeError("Transmit worker closed"))
+            return future
+        with self._cond:
+            self._queue.append((bytes(data), future))
+            self._queued_bytes += len(data)
+            self._cond.notify()
+        return future
+
+    async def close(self, timeout: float = 2.0) -> None:
+        """Finish queued writes, then stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        await self._loop.run_in_executor(None, self._thread.join, timeout)
+
+    def stats(self) -> dict:
+        """Transmit counters for diagnostics."""
+        return {
+            "queued_bytes": self._queued_bytes,
+            "writes": self.writes,
+            "syscalls": self.syscalls,
+            "bytes_written": self.bytes_written,
+            "max_merged": self.max_merged,
+        }
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            error = None
+            data = b''.join(chunk for chunk, _ in batch)
+            try:
+                self._write(data)
+                if self._flush:
+                    self._flush()
+            except Exception as e:
+                error = e
+            else:
+                self.writes += len(batch)
+                self.syscalls += 1
+                self.bytes_written += len(data)
+                self.max_merged = max(self.max_merged, len(batch))
+            # One loop wakeup completes the whole batch, in submission order
+            try:
+                self._loop.call_soon_threadsafe(self._complete, batch, error)
+            except RuntimeError:
+                # Event loop already closed; nobody is waiting any more
+                return
+
+    def _next_batch(self) -> list:
+        """Wait for queued writes and take as many as the merge limit allows."""
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            batch = []
+            size = 0
+            while self._queue and (not batch or size + len(self._queue[0][0]) <= self.merge_limit):
+                chunk, future = self._queue.popleft()
+                size += len(chunk)
+                batch.append((chunk, future))
+            self._queued_bytes -= size
+            return batch
+
+    @staticmethod
+    def _complete(batch: list, error: Optional[Exception]) -> None:
+        for _, future in batch:
+            if future.done():
+                # The sender stopped waiting (e.g. its WebSocket went away)
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
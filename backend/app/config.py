@@ -8,6 +8,8 @@ from pydantic import field_validator, ValidationError
 from typing import Optional
 import logging
 
+logger = logging.getLogger(__name__)
+
 
 class Settings(BaseSettings):
     """Application settings with environment variable support.
@@ -25,8 +27,24 @@ class Settings(BaseSettings):
     # Serial configuration
     default_baudrate: int = 115200
     serial_timeout: float = 0.1
-    max_reconnect_attempts: int = 3
-    reconnect_delay: float = 1.0
+    serial_read_mode: str = "auto"  # auto, event (Linux fd readiness) or executor
+    io_max_threads: int = 128  # Dedicated blocking-read threads (one per executor-mode port)
+    backend_workers: int = 0  # Host serial backends in N worker processes (0 = in-process)
+    backend_ring_size: int = 4194304  # Shared memory ring per port when using workers (4MB)
+    telnet_mode: str = "raw"  # raw (plain TCP), telnet (option negotiation) or rfc2217 (remote serial ports)
+    tcp_read_size: int = 65536  # Preallocated receive buffer per TCP connection
+    tcp_nodelay: bool = True  # Send keystrokes immediately (disable Nagle)
+    tcp_keepalive: bool = True  # Probe idle TCP connections to detect dead peers
+    tcp_rcvbuf: int = 0  # Kernel receive buffer (SO_RCVBUF, 0 = OS default)
+    port_share_host: str = "127.0.0.1"  # Interface shared ports listen on
+    port_share_tx_policy: str = "lease"  # shared (all writers) or lease (one writer at a time)
+    port_share_tx_lease: float = 0.5  # Idle seconds before another writer may take over
+    auto_reconnect_default: bool = False  # Reopen lost serial ports unless a connect request says otherwise
+    max_reconnect_attempts: int = 3  # Reopen a lost serial port this many times (0 disables)
+    reconnect_delay: float = 1.0  # First reconnect window in seconds, doubled per attempt
+    port_monitor_mode: str = "auto"  # auto, udev, inotify or polling (hotplug detection)
+    port_monitor_debounce_ms: float = 50.0  # Quiet time after hotplug events before rescanning
+    port_monitor_poll_interval: float = 1.0  # Seconds between scans when polling
     
     # WebSocket configuration
     ws_heartbeat_interval: int = 30
@@ -35,6 +53,14 @@ class Settings(BaseSettings):
     ws_reconnect_interval: int = 1000
     ws_max_reconnect_interval: int = 30000
     ws_reconnect_decay: float = 1.5
+    ws_slow_consumer_policy: str = "skip"  # skip, disconnect, spill or backpressure
+    ws_queue_budget_bytes: int = 0  # Unread bytes allowed per client (0 = history size)
+    ws_batch_max_latency_ms: float = 5.0  # Longest hold-back while coalescing frames
+    ws_batch_max_bytes: int = 32768  # Frame size that is sent without waiting
+    ws_compression_enabled: bool = False  # Let clients opt into compressed frames (zfield.deflate)
+    ws_compression_threshold: int = 256  # Frames below this size are never compressed
+    ws_compression_level: int = 6  # zlib level for clients that opt into compression
+    ws_ports_send_timeout: float = 2.0  # Port list clients slower than this are disconnected
     
     # Logging configuration
     log_level: str = "INFO"
@@ -42,8 +68,20 @@ class Settings(BaseSettings):
     log_file: str = "logs/zfield.log"
     log_max_bytes: int = 10485760  # 10MB
     log_backup_count: int = 5
+    log_queue_size: int = 10000  # Records waiting for the log writer thread before dropping
+    log_rate_limit_burst: int = 10  # Records per call site and interval (0 disables the limit)
+    log_rate_limit_interval: float = 10.0  # Rate limit window in seconds
     log_serial_data: bool = False
     
+    # Session log writer configuration
+    session_log_flush_interval: float = 0.2  # Seconds between flushes
+    session_log_fsync: str = "never"  # never, interval or always
+    session_log_queue_size: int = 10000  # Chunks queued before dropping
+    session_log_max_bytes: int = 0  # Rotate at this size (0 disables)
+    session_log_rotate_interval: float = 0  # Rotate every N seconds (0 disables)
+    session_log_backup_count: int = 0  # Rotated segments kept (0 keeps all)
+    session_log_compression: str = "gzip"  # none, gzip or zstd
+    
     # Security configuration
     enable_auth: bool = False
     api_rate_limit: str = "100/minute"
@@ -52,8 +90,18 @@ class Settings(BaseSettings):
     # Performance configuration
     buffer_size: int = 8192
     max_buffer_size: int = 1048576  # 1MB
+    history_size: int = 102400  # Per-connection scrollback replayed to new clients
+    
+    # Disk-backed scrollback configuration
+    scrollback_enabled: bool = False
+    scrollback_dir: str = "scrollback"
+    scrollback_segment_size: int = 67108864  # 64MB
+    scrollback_max_bytes: int = 1073741824  # 1GB per connection
     terminal_max_lines: int = 10000
     
+    # Time series of values extracted by slice rules
+    timeseries_max_points: int = 1000000  # Samples kept per port and series (16 bytes each)
+    
     # Feature flags
     enable_command_discovery: bool = True
     enable_metrics: bool = False
@@ -105,7 +153,97 @@ class Settings(BaseSettings):
             raise ValueError(f"Log format must be one of {valid_formats}, got {v}")
         return v_lower
     
-    @field_validator('serial_timeout', 'reconnect_delay')
+    @field_validator('serial_read_mode')
+    @classmethod
+    def validate_serial_read_mode(cls, v: str) -> str:
+        """Validate serial read mode is valid."""
+        valid_modes = ['auto', 'event', 'executor']
+        v_lower = v.lower()
+        if v_lower not in valid_modes:
+            raise ValueError(f"Serial read mode must be one of {valid_modes}, got {v}")
+        return v_lower
+    
+    @field_validator('telnet_mode')
+    @classmethod
+    def validate_telnet_mode(cls, v: str) -> str:
+        """Validate telnet mode is valid."""
+        valid_modes = ['raw', 'telnet', 'rfc2217']
+        v_lower = v.lower()
+        if v_lower not in valid_modes:
+            raise ValueError(f"Telnet mode must be one of {valid_modes}, got {v}")
+        return v_lower
+    
+    @field_validator('port_share_tx_policy')
+    @classmethod
+    def validate_port_share_tx_policy(cls, v: str) -> str:
+        """Validate shared port TX policy is valid."""
+        valid_policies = ['shared', 'lease']
+        v_lower = v.lower()
+        if v_lower not in valid_policies:
+            raise ValueError(f"Port share TX policy must be one of {valid_policies}, got {v}")
+        return v_lower
+    
+    @field_validator('port_monitor_mode')
+    @classmethod
+    def validate_port_monitor_mode(cls, v: str) -> str:
+        """Validate port monitor mode is valid."""
+        valid_modes = ['auto', 'udev', 'inotify', 'polling']
+        v_lower = v.lower()
+        if v_lower not in valid_modes:
+            raise ValueError(f"Port monitor mode must be one of {valid_modes}, got {v}")
+        return v_lower
+    
+    @field_validator('ws_slow_consumer_policy')
+    @classmethod
+    def validate_slow_consumer_policy(cls, v: str) -> str:
+        """Validate slow consumer policy is valid."""
+        valid_policies = ['skip', 'disconnect', 'spill', 'backpressure']
+        v_lower = v.lower()
+        if v_lower not in valid_policies:
+            raise ValueError(f"Slow consumer policy must be one of {valid_policies}, got {v}")
+        return v_lower
+    
+    @field_validator('session_log_fsync')
+    @classmethod
+    def validate_session_log_fsync(cls, v: str) -> str:
+        """Validate session log fsync policy is valid."""
+        valid_policies = ['never', 'interval', 'always']
+        v_lower = v.lower()
+        if v_lower not in valid_policies:
+            raise ValueError(f"Session log fsync policy must be one of {valid_policies}, got {v}")
+        return v_lower
+    
+    @field_validator('session_log_compression')
+    @classmethod
+    def validate_session_log_compression(cls, v: str) -> str:
+        """Validate rotated session log compression is valid."""
+        valid_compressions = ['none', 'gzip', 'zstd']
+        v_lower = v.lower()
+        if v_lower not in valid_compressions:
+            raise ValueError(f"Session log compression must be one of {valid_compressions}, got {v}")
+        return v_lower
+    
+    @field_validator('session_log_max_bytes', 'session_log_rotate_interval', 'session_log_backup_count',
+                     'ws_batch_max_latency_ms', 'ws_queue_budget_bytes', 'ws_compression_threshold',
+                     'backend_workers', 'tcp_rcvbuf', 'max_reconnect_attempts', 'port_monitor_debounce_ms',
+                     'log_rate_limit_burst', 'log_rate_limit_interval')
+    @classmethod
+    def validate_non_negative(cls, v):
+        """Validate values are zero (disabled) or positive."""
+        if v < 0:
+            raise ValueError(f"Value must not be negative, got {v}")
+        return v
+    
+    @field_validator('ws_compression_level')
+    @classmethod
+    def validate_compression_level(cls, v: int) -> int:
+        """Validate zlib compression level is in range."""
+        if not 1 <= v <= 9:
+            raise ValueError(f"Compression level must be between 1 and 9, got {v}")
+        return v
+    
+    @field_validator('serial_timeout', 'reconnect_delay', 'session_log_flush_interval', 'port_share_tx_lease',
+                     'port_monitor_poll_interval', 'ws_ports_send_timeout')
     @classmethod
     def validate_positive_float(cls, v: float) -> float:
         """Validate float values are positive."""
@@ -113,10 +251,14 @@ class Settings(BaseSettings):
             raise ValueError(f"Value must be positive, got {v}")
         return v
     
-    @field_validator('max_reconnect_attempts', 'ws_max_reconnect_attempts', 
+    @field_validator('ws_max_reconnect_attempts', 
                      'ws_heartbeat_interval', 'ws_message_queue_size',
                      'log_max_bytes', 'log_backup_count', 'buffer_size',
-                     'max_buffer_size', 'terminal_max_lines')
+                     'max_buffer_size', 'terminal_max_lines', 'history_size',
+                     'scrollback_segment_size', 'scrollback_max_bytes',
+                     'session_log_queue_size', 'ws_batch_max_bytes', 'io_max_threads',
+                     'backend_ring_size', 'tcp_read_size', 'timeseries_max_points',
+                     'log_queue_size')
     @classmethod
     def validate_positive_int(cls, v: int) -> int:
         """Validate integer values are positive."""
@@ -142,10 +284,9 @@ def get_settings() -> Settings:
     if _settings is None:
         try:
             _settings = Settings()
-            # Log successful configuration load (will be properly logged once logging is set up)
-            print(f"Configuration loaded successfully (log_level={_settings.log_level})")
+            logger.info("Configuration loaded successfully (log_level=%s)", _settings.log_level)
         except ValidationError as e:
-            print(f"Configuration validation failed: {e}")
+            logger.error("Configuration validation failed: %s", e)
             raise
     return _settings
 
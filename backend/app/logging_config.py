@@ -0,0 +1,176 @@
+"""Non-blocking logging for the server.
+
+Records are put on a bounded queue by the thread that logs them and
+formatted and written by a QueueListener thread, so a slow console, pipe or
+disk never blocks the event loop. When the queue is full records are
+dropped and counted instead of waiting.
+
+Repeated records from one call site (a per-chunk error, a client that keeps
+failing) are rate limited before they are queued: at most
+``log_rate_limit_burst`` per ``log_rate_limit_interval`` seconds, after
+which the next record that gets through says how many were suppressed.
+
+Configured from Settings: log_level, log_format ("json" or "standard"),
+log_file with log_max_bytes / log_backup_count rotation, log_queue_size.
+Application modules log to ``logging.getLogger(__name__)`` below "app".
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config import Settings
+
+# Parent of all application loggers (app.backends..., app.services...)
+LOGGER_NAME = "app"
+
+STANDARD_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any ``extra`` fields of the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most burst records per call site every interval seconds.
+
+    Args:
+        burst: Records allowed per interval (0 disables the limit)
+        interval: Window length in seconds
+    """
+
+    def __init__(self, burst: int = 10, interval: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.suppressed_total = 0
+        # Call site -> [window start, records in window, suppressed in window]
+        self._sites: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.burst or not self.interval:
+            return True
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        site = self._sites.get(key)
+        if site is None or now - site[0] >= self.interval:
+            suppressed = site[2] if site else 0
+            self._sites[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+            return True
+        if site[1] < self.burst:
+            site[1] += 1
+            return True
+        site[2] += 1
+        self.suppressed_total += 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the listener."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same process: the listener formats the record, message args included
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_rate_limit: Optional[RateLimitFilter] = None
+
+
+def _formatter(settings: Settings) -> logging.Formatter:
+    if settings.log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(STANDARD_FORMAT)
+
+
+def _output_handlers(settings: Settings) -> list[logging.Handler]:
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if settings.log_file:
+        try:
+            Path(settings.log_file).parent.mkdir(parents=True, exist_ok=True)
+            handlers.append(logging.handlers.RotatingFileHandler(
+                settings.log_file, maxBytes=settings.log_max_bytes,
+                backupCount=settings.log_backup_count, encoding="utf-8"))
+        except OSError as e:
+            logging.getLogger(__name__).error("Cannot open log file %s: %s", settings.log_file, e)
+    formatter = _formatter(settings)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging(settings: Settings) -> None:
+    """Route the application loggers through the queue; replaces a previous setup."""
+    global _listener, _queue_handler, _rate_limit
+    shutdown_logging()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(settings.log_level)
+    _rate_limit = RateLimitFilter(settings.log_rate_limit_burst, settings.log_rate_limit_interval)
+    _queue_handler = DroppingQueueHandler(queue.Queue(settings.log_queue_size))
+    _queue_handler.addFilter(_rate_limit)
+    logger.addHandler(_queue_handler)
+    # Records stop here instead of also reaching the root logger's handlers
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_output_handlers(settings),
+                                               respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Write out the queued records and detach the handlers."""
+    global _listener, _queue_handler
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler:
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.removeHandler(_queue_handler)
+        logger.propagate = True
+        _queue_handler = None
+
+
+def logging_stats() -> dict:
+    """Queue and rate limiter counters for diagnostics."""
+    if not _queue_handler:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "suppressed": _rate_limit.suppressed_total,
+    }
@@ -1,5 +1,7 @@
 """FastAPI application entry point."""
-from fastapi import FastAPI, WebSocket
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, WebSocket
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
@@ -7,12 +9,44 @@ import os
 import sys
 
 from app.api import routes
-from app.api.websocket import websocket_endpoint
-from app.api.port_websocket import port_websocket_endpoint, stop_port_monitor
+from app.api.websocket import forget_terminal_port, get_terminal_port_stats, websocket_endpoint
+from app.api.port_websocket import (broadcast_trigger_updates, get_port_monitor, port_websocket_endpoint,
+                                    stop_port_monitor)
 
+from app.config import get_settings
+from app.logging_config import setup_logging, shutdown_logging
+from app.services import metrics
 from app.version import VERSION
 
-app = FastAPI(title="Zephyr Device Manager", version=VERSION)
+logger = logging.getLogger(__name__)
+
+# Event loop lag sampler, running while metrics are enabled
+loop_lag = metrics.LoopLagMonitor()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start logging, and watch ports from startup so /api/ports answers from a warm inventory."""
+    setup_logging(get_settings())
+    get_port_monitor()
+    connection_manager = routes.get_connection_manager()
+    triggers = connection_manager.triggers
+    triggers.add_listener(broadcast_trigger_updates)
+    connection_manager.add_disconnect_listener(forget_terminal_port)
+    metrics.enabled = get_settings().enable_metrics
+    if metrics.enabled:
+        loop_lag.start()
+    yield
+    # Worker processes and their shared memory must not outlive the server
+    await connection_manager.shutdown()
+    loop_lag.stop()
+    connection_manager.remove_disconnect_listener(forget_terminal_port)
+    triggers.remove_listener(broadcast_trigger_updates)
+    stop_port_monitor()
+    shutdown_logging()
+
+
+app = FastAPI(title="Zephyr Device Manager", version=VERSION, lifespan=lifespan)
 
 # Include API routes
 app.include_router(routes.router, prefix="/api")
@@ -29,21 +63,30 @@ async def port_websocket(websocket: WebSocket):
     """WebSocket endpoint for port change notifications."""
     await port_websocket_endpoint(websocket)
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics (ZFIELD_ENABLE_METRICS)."""
+    if not metrics.enabled:
+        return Response("Metrics are disabled (set ZFIELD_ENABLE_METRICS=true)\n", status_code=404,
+                        media_type="text/plain")
+    body = metrics.render(routes.get_connection_manager(), get_terminal_port_stats(), loop_lag)
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
 # Determine frontend path (handle PyInstaller bundled app)
 if getattr(sys, 'frozen', False):
     # Running as compiled executable
     base_path = Path(sys._MEIPASS)
     frontend_path = base_path / "frontend"
-    print(f"[DEBUG] Running as frozen executable, base_path: {base_path}")
-    print(f"[DEBUG] Frontend path: {frontend_path}")
-    print(f"[DEBUG] Frontend exists: {frontend_path.exists()}")
+    logger.debug("Running as frozen executable, base_path: %s", base_path)
+    logger.debug("Frontend path: %s", frontend_path)
+    logger.debug("Frontend exists: %s", frontend_path.exists())
     if frontend_path.exists():
-        print(f"[DEBUG] Frontend contents: {list(frontend_path.iterdir())}")
+        logger.debug("Frontend contents: %s", list(frontend_path.iterdir()))
 else:
     # Running as script
     frontend_path = Path(__file__).parent.parent.parent / "frontend"
-    print(f"[DEBUG] Running as script, frontend_path: {frontend_path}")
-    print(f"[DEBUG] Frontend exists: {frontend_path.exists()}")
+    logger.debug("Running as script, frontend_path: %s", frontend_path)
+    logger.debug("Frontend exists: %s", frontend_path.exists())
 
 if frontend_path.exists():
     @app.get("/favicon.ico")
@@ -58,8 +101,8 @@ if frontend_path.exists():
     async def read_root():
         """Serve frontend index page."""
         index_path = frontend_path / "index.html"
-        print(f"[DEBUG] Serving index.html from: {index_path}")
-        print(f"[DEBUG] Index exists: {index_path.exists()}")
+        logger.debug("Serving index.html from: %s", index_path)
+        logger.debug("Index exists: %s", index_path.exists())
         if index_path.exists():
             response = FileResponse(index_path)
             response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
@@ -67,20 +110,18 @@ if frontend_path.exists():
             response.headers["Expires"] = "0"
             return response
         error_msg = f"Frontend not found at {index_path}"
-        print(f"[ERROR] {error_msg}")
+        logger.error(error_msg)
         return {"error": error_msg, "frontend_path": str(frontend_path), "exists": frontend_path.exists()}
 
     # Serve the entire frontend directory (js, css, logo.png, etc.)
     # Mount this last so it doesn't shadow the API or explicit routes
     try:
         app.mount("/", StaticFiles(directory=str(frontend_path)), name="frontend")
-        print(f"[DEBUG] Mounted static files from: {frontend_path}")
+        logger.debug("Mounted static files from: %s", frontend_path)
     except Exception as e:
-        print(f"[ERROR] Failed to mount static files: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Failed to mount static files: %s", e)
 else:
-    print(f"[ERROR] Frontend directory does not exist: {frontend_path}")
+    logger.error("Frontend directory does not exist: %s", frontend_path)
 
 @app.get("/health")
 async def health():
@@ -89,5 +130,5 @@ async def health():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=not get_settings().ws_compression_enabled)
 
@@ -0,0 +1,84 @@
+"""Latency-bounded coalescing of terminal data into WebSocket frames."""
+import asyncio
+import time
+from typing import Callable, Optional
+
+from app.backends.data_hub import Subscription
+
+
+class BatchPolicy:
+    """Limits applied when coalescing data into one frame.
+    
+    Args:
+        max_latency: Longest time (seconds) data may be held back to join a frame
+        max_bytes: Largest frame; reaching it sends immediately
+    """
+    
+    def __init__(self, max_latency: float = 0.005, max_bytes: int = 32768):
+        if max_latency < 0:
+            raise ValueError(f"max_latency must not be negative, got {max_latency}")
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+        self.max_latency = max_latency
+        self.max_bytes = max_bytes
+
+
+class FrameBatcher:
+    """Produces frames from a subscription under a BatchPolicy.
+    
+    Adaptive: data arriving after the line has been quiet for at least
+    max_latency is sent immediately, so interactive echo is not delayed.
+    While data keeps streaming, frames are held until max_latency has passed
+    since the previous frame or max_bytes are pending, which caps the frame
+    rate at roughly 1 / max_latency.
+    
+    Args:
+        subscription: Source of the data
+        policy: Coalescing limits (defaults to BatchPolicy())
+        clock: Monotonic time source in seconds; tests pass a fake one
+    """
+    
+    def __init__(self, subscription: Subscription, policy: Optional[BatchPolicy] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.subscription = subscription
+        self.policy = policy or BatchPolicy()
+        self.frames = 0
+        self.bytes = 0
+        self._clock = clock
+        self._started = clock()
+        self._last_frame = 0.0
+    
+    async def next_frame(self) -> bytes:
+        """Wait for the next frame.
+        
+        Returns:
+            Frame payload, or b'' once the subscription is closed
+        """
+        sub = self.subscription
+        await sub.wait()
+        
+        hold = self._last_frame + self.policy.max_latency - self._clock()
+        if hold > 0 and sub.pending() < self.policy.max_bytes:
+            try:
+                await asyncio.wait_for(sub.wait(self.policy.max_bytes), hold)
+            except asyncio.TimeoutError:
+                pass
+        
+        data = sub.read(self.policy.max_bytes)
+        if data:
+            self.frames += 1
+            self.bytes += len(data)
+            self._last_frame = self._clock()
+        return data
+    
+    def stats(self) -> dict:
+        """Frame statistics since the batcher was created."""
+        elapsed = max(self._clock() - self._started, 1e-9)
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "frames_per_sec": round(self.frames / elapsed, 2),
+            "bytes_per_frame": round(self.bytes / self.frames, 1) if self.frames else 0.0,
+            "max_latency_ms": self.policy.max_latency * 1000,
+            "max_bytes": self.policy.max_bytes,
+        }
@@ -0,0 +1,82 @@
+"""Opt-in deflate compression for WebSocket clients.
+
+Clients that negotiate COMPRESS_SUBPROTOCOL (allowed with
+``ZFIELD_WS_COMPRESSION_ENABLED``) receive binary frames whose first byte
+tells how the rest is encoded:
+
+- RAW_FRAME: the payload as is;
+- DEFLATE_FRAME: the payload's length (4 bytes, big endian), then the next
+  piece of one raw DEFLATE stream per connection, ended with a sync flush.
+  Browsers feed these pieces to a single ``DecompressionStream('deflate-raw')``
+  and read back ``length`` bytes.
+
+Keeping one stream per connection lets each frame refer back to everything
+sent before it, which is what makes repetitive log output compress well.
+Frames below the threshold (keystroke echoes, prompts) are sent raw and cost
+no compression time. uvicorn's own permessage-deflate is turned off while
+this is enabled so frames are not compressed twice.
+"""
+import struct
+import time
+import zlib
+
+COMPRESS_SUBPROTOCOL = "zfield.deflate"
+
+RAW_FRAME = b'\x00'
+DEFLATE_FRAME = b'\x01'
+LENGTH = struct.Struct('>I')
+
+DEFAULT_THRESHOLD = 256
+DEFAULT_LEVEL = 6
+
+
+class FrameCompressor:
+    """Encodes outgoing frames of one connection and tracks ratio and CPU cost.
+
+    Args:
+        threshold: Frames smaller than this many bytes are sent uncompressed
+        level: zlib compression level (1 fastest - 9 smallest)
+    """
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, level: int = DEFAULT_LEVEL):
+        if threshold < 0:
+            raise ValueError(f"Compression threshold must not be negative, got {threshold}")
+        if not 1 <= level <= 9:
+            raise ValueError(f"Compression level must be between 1 and 9, got {level}")
+        self.threshold = threshold
+        self.level = level
+        self.frames = 0
+        self.compressed_frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_time = 0.0
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def encode(self, data: bytes) -> bytes:
+        """Return the wire frame for one payload."""
+        self.frames += 1
+        self.bytes_in += len(data)
+        if len(data) < self.threshold:
+            frame = RAW_FRAME + data
+        else:
+            started = time.thread_time()
+            # Once compressed the data is part of the stream and must be sent,
+            # even when it did not shrink
+            packed = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.cpu_time += time.thread_time() - started
+            frame = DEFLATE_FRAME + LENGTH.pack(len(data)) + packed
+            self.compressed_frames += 1
+        self.bytes_out += len(frame)
+        return frame
+
+    def stats(self) -> dict:
+        """Compression counters for diagnostics."""
+        return {
+            "compression_threshold": self.threshold,
+            "compressed_frames": self.compressed_frames,
+            "raw_frames": self.frames - self.compressed_frames,
+            "uncompressed_bytes": self.bytes_in,
+            "compressed_bytes": self.bytes_out,
+            "compression_ratio": round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else None,
+            "compression_cpu_ms": round(self.cpu_time * 1000, 3),
+        }
@@ -1,8 +1,20 @@
 """Serial port manager service."""
-from typing import Optional
+import asyncio
+import functools
+import logging
+from typing import Callable, Optional
 from app.backends.base import BaseBackend
 from app.backends.serial_backend import SerialBackend
 from app.backends.telnet_backend import TelnetBackend
+from app.backends.scrollback import ScrollbackStore
+from app.backends.io_runtime import IORuntime
+from app.backends.sharding import BackendWorkerPool, ShardedBackend
+from app.services.port_share import PortShare, TxArbiter
+from app.services.timeseries import SeriesStore
+from app.services.triggers import TriggerRegistry
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
@@ -11,46 +23,109 @@ class ConnectionManager:
     def __init__(self):
         # Map port names to Backend instances
         self.backends: dict[str, BaseBackend] = {}
+        # Ports re-published on local TCP sockets
+        self.shares: dict[str, PortShare] = {}
+        # Called with the port name after a port is disconnected
+        self._disconnect_listeners: list[Callable[[str], None]] = []
+        settings = get_settings()
+        # Counter, slicer and auto-response rules evaluated on received data,
+        # and the time series of the values they extract
+        self.triggers = TriggerRegistry(SeriesStore(settings.timeseries_max_points),
+                                        claim_tx=self.claim_tx, release_tx=self.release_tx)
+        # Dedicated threads for blocking reads, shared by all serial backends
+        self.io_runtime = IORuntime(settings.io_max_threads)
+        # Optional worker processes hosting the serial backends
+        self.worker_pool: Optional[BackendWorkerPool] = None
+        if settings.backend_workers:
+            self.worker_pool = BackendWorkerPool(settings.backend_workers, settings.serial_read_mode,
+                                                 settings.backend_ring_size)
     
-    async def connect(self, port: str, baudrate: int = 115200, connection_type: str = "serial", log_file: Optional[str] = None, log_mode: str = "printable", log_tx: bool = True, **kwargs) -> bool:
+    async def connect(self, port: str, baudrate: int = 115200, connection_type: str = "serial", log_file: Optional[str] = None, log_mode: str = "printable", log_tx: bool = True, history_size: Optional[int] = None, scrollback: Optional[bool] = None, log_max_bytes: Optional[int] = None, log_rotate_interval: Optional[float] = None, telnet_mode: Optional[str] = None, auto_reconnect: Optional[bool] = None, **kwargs) -> bool:
         """Connect to a specific serial port or telnet host.
         
         Args:
             port: Serial port name or "host:port" for telnet
-            baudrate: Baud rate (serial only)
+            baudrate: Baud rate (serial, and telnet in rfc2217 mode)
             connection_type: "serial" or "telnet"
             log_file: Optional path template for logging
-            **kwargs: Additional parameters
+            history_size: History buffer size in bytes (defaults to settings)
+            scrollback: Keep disk-backed scrollback (defaults to settings)
+            log_max_bytes: Rotate the session log at this size (defaults to settings)
+            log_rotate_interval: Rotate the session log every N seconds (defaults to settings)
+            telnet_mode: "raw", "telnet" or "rfc2217" (defaults to settings)
+            auto_reconnect: Reopen a lost serial port (defaults to settings)
+            **kwargs: Line settings (bytesize, parity, stopbits, xonxoff, rtscts)
             
         Returns:
             True if connection successful, False otherwise
         """
         if port in self.backends:
-            if self.backends[port].is_connected():
+            if self.backends[port].is_connected() or self.backends[port].reconnecting:
                 return True
             # If not connected but exists, clean up
-            await self.backends[port].disconnect()
+            await self._close_backend(self.backends[port])
+            
+        settings = get_settings()
+        if history_size is None:
+            history_size = settings.history_size
+        if history_size <= 0:
+            logger.warning("Invalid history size for %s: %d", port, history_size)
+            return False
+        if scrollback is None:
+            scrollback = settings.scrollback_enabled
+        if auto_reconnect is None:
+            auto_reconnect = settings.auto_reconnect_default
+        reconnect_attempts = settings.max_reconnect_attempts if auto_reconnect else 0
             
         if connection_type == "telnet":
-            backend = TelnetBackend()
             # Parse host:port
             try:
                 host, p = port.split(":")
-                success = await backend.connect(host=host, port=int(p))
-            except ValueError:
-                print(f"Invalid telnet address format: {port}")
+                target = {"host": host, "port": int(p)}
+                backend = TelnetBackend(history_size=history_size, mode=telnet_mode or settings.telnet_mode,
+                                        read_size=settings.tcp_read_size, nodelay=settings.tcp_nodelay,
+                                        keepalive=settings.tcp_keepalive, rcvbuf=settings.tcp_rcvbuf)
+            except ValueError as e:
+                logger.warning("Invalid telnet connection %s: %s", port, e)
                 return False
+        elif self.worker_pool:
+            target = {"port": port}
+            backend = ShardedBackend(self.worker_pool, history_size=history_size,
+                                     reconnect_attempts=reconnect_attempts, reconnect_delay=settings.reconnect_delay)
         else:
-            backend = SerialBackend()
-            success = await backend.connect(port=port, baudrate=baudrate, **kwargs)
+            target = {"port": port}
+            backend = SerialBackend(read_mode=settings.serial_read_mode, history_size=history_size,
+                                    io_runtime=self.io_runtime, reconnect_attempts=reconnect_attempts,
+                                    reconnect_delay=settings.reconnect_delay)
+        
+        # Attached before the read loop starts so scrollback offsets match
+        # the history ring from the first received byte
+        if scrollback:
+            backend.set_scrollback(self._open_scrollback(port))
+        success = await backend.connect(baudrate=baudrate, **target, **kwargs)
         
         if success:
             if log_file:
-                formatted_log_path = self._format_log_path(log_file, port, connection_type, baudrate)
-                backend.set_log_file(formatted_log_path, log_mode, log_tx)
+                # Placeholders are re-evaluated at every rotation
+                path_factory = functools.partial(self._format_log_path, log_file, port, connection_type, baudrate)
+                backend.set_log_file(
+                    path_factory(), log_mode, log_tx,
+                    flush_interval=settings.session_log_flush_interval,
+                    fsync=settings.session_log_fsync,
+                    queue_size=settings.session_log_queue_size,
+                    max_bytes=settings.session_log_max_bytes if log_max_bytes is None else log_max_bytes,
+                    rotate_interval=settings.session_log_rotate_interval if log_rotate_interval is None else log_rotate_interval,
+                    backup_count=settings.session_log_backup_count,
+                    compression=settings.session_log_compression,
+                    path_factory=path_factory
+                )
                 
             self.backends[port] = backend
+            self.triggers.attach(port, backend)
             return True
+        if backend.scrollback:
+            await asyncio.get_running_loop().run_in_executor(None, backend.scrollback.close)
+            backend.set_scrollback(None)
         return False
     
     async def disconnect(self, port: Optional[str] = None) -> None:
@@ -59,15 +134,108 @@ class ConnectionManager:
         Args:
             port: Specific port to disconnect, or None for all
         """
-        if port:
-            if port in self.backends:
-                await self.backends[port].disconnect()
-                del self.backends[port]
-        else:
-            # Disconnect all
-            for p in list(self.backends.keys()):
-                await self.backends[p].disconnect()
-            self.backends.clear()
+        ports = [port] if port else list(self.backends)
+        for p in ports:
+            if p in self.backends:
+                await self._close_backend(self.backends.pop(p))
+                self._notify_disconnect(p)
+    
+    def add_disconnect_listener(self, listener: Callable[[str], None]) -> None:
+        """Call listener with the port name whenever a port is disconnected."""
+        self._disconnect_listeners.append(listener)
+    
+    def remove_disconnect_listener(self, listener: Callable[[str], None]) -> None:
+        if listener in self._disconnect_listeners:
+            self._disconnect_listeners.remove(listener)
+    
+    def _notify_disconnect(self, port: str) -> None:
+        for listener in list(self._disconnect_listeners):
+            try:
+                listener(port)
+            except Exception as e:
+                logger.error("Error in disconnect listener: %s", e)
+    
+    async def shutdown(self) -> None:
+        """Disconnect every port and stop the backend worker processes."""
+        await self.disconnect()
+        if self.worker_pool:
+            await self.worker_pool.close()
+    
+    async def _close_backend(self, backend: BaseBackend) -> None:
+        """Disconnect a backend and release the resources attached to it."""
+        for port, share in list(self.shares.items()):
+            if share.backend is backend:
+                await self.unshare(port)
+        self.triggers.detach_backend(backend)
+        await backend.disconnect()
+        if backend.scrollback:
+            # Waits for the writer thread to finish
+            await asyncio.get_running_loop().run_in_executor(None, backend.scrollback.close)
+            backend.set_scrollback(None)
+    
+    def _open_scrollback(self, port: str) -> Optional[ScrollbackStore]:
+        """Create the disk-backed scrollback store for a connection."""
+        settings = get_settings()
+        try:
+            return ScrollbackStore.for_connection(
+                settings.scrollback_dir, port,
+                segment_size=settings.scrollback_segment_size,
+                max_bytes=settings.scrollback_max_bytes
+            )
+        except OSError as e:
+            logger.error("Failed to open scrollback for %s: %s", port, e)
+            return None
+    
+    async def share(self, port: str, listen_port: int = 0, mode: str = "raw", host: Optional[str] = None,
+                    tx_policy: Optional[str] = None) -> PortShare:
+        """Re-publish a connected port on a local TCP socket.
+        
+        Args:
+            port: Connected port to share
+            listen_port: TCP port to listen on (0 picks a free one)
+            mode: "raw" or "rfc2217"
+            host: Interface to listen on (defaults to settings)
+            tx_policy: "shared" or "lease" (defaults to settings)
+            
+        Returns:
+            The running share; its address holds the listening socket
+            
+        Raises:
+            RuntimeError: If the port is not connected or already shared
+            ValueError: For an unknown mode or TX policy
+            OSError: If the TCP port cannot be bound
+        """
+        if not self.is_connected(port):
+            raise RuntimeError(f"Connection {port} not connected")
+        if port in self.shares:
+            raise RuntimeError(f"Connection {port} is already shared on {self.shares[port].stats()['address']}")
+        
+        settings = get_settings()
+        arbiter = TxArbiter(tx_policy or settings.port_share_tx_policy, settings.port_share_tx_lease)
+        share = PortShare(port, self.backends[port], mode, arbiter)
+        await share.start(host or settings.port_share_host, listen_port)
+        self.shares[port] = share
+        return share
+    
+    async def unshare(self, port: str) -> None:
+        """Stop re-publishing a port; its TCP clients are disconnected."""
+        share = self.shares.pop(port, None)
+        if share:
+            await share.close()
+    
+    def claim_tx(self, port: str, owner: str) -> bool:
+        """Ask the TX arbiter of a shared port whether owner may write now.
+        
+        Ports that are not shared have no arbitration and always allow it.
+        """
+        share = self.shares.get(port)
+        return share.arbiter.claim(owner) if share else True
+    
+    def release_tx(self, port: str, owner: str) -> None:
+        """Give up a TX lease held on a shared port."""
+        share = self.shares.get(port)
+        if share:
+            share.arbiter.release(owner)
     
     async def send(self, port: str, data: bytes) -> None:
         """Send data to a specific serial port.
@@ -105,7 +273,8 @@ class ConnectionManager:
         """
         return self.backends.get(port)
     
-    def _format_log_path(self, path: str, port: str, connection_type: str, baudrate: int = 115200) -> str:
+    @staticmethod
+    def _format_log_path(path: str, port: str, connection_type: str, baudrate: int = 115200) -> str:
         """Format the log path by replacing placeholders.
         
         Placeholders:
@@ -0,0 +1,178 @@
+"""Event sources telling the port monitor that serial devices may have changed.
+
+Rather than enumerating ports every second, the monitor waits for one of
+these watchers to report activity and only then rescans:
+
+- UdevWatcher listens to kernel/udev "tty" events over netlink (requires the
+  optional pyudev package). Events arrive once udev has finished, so the
+  /dev/serial/by-id links already exist.
+- InotifyWatcher watches /dev and /dev/serial/by-id for device nodes being
+  created or removed (Linux, no dependencies).
+
+Watchers only signal that something happened; what changed is found out by
+rescanning. Both register a file descriptor with the event loop, so they
+cost nothing while no device is plugged or unplugged.
+"""
+import asyncio
+import ctypes
+import os
+import struct
+import sys
+from typing import Callable, Optional
+
+# Directories watched for device nodes
+DEV_DIR = "/dev"
+BY_ID_DIR = "/dev/serial/by-id"
+
+# Device node names that may be serial ports
+SERIAL_NAME_PREFIXES = ("tty", "rfcomm", "cu.")
+
+# inotify(7) constants
+_IN_ATTRIB = 0x00000004
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+# Attribute changes matter too: udev fixes permissions after creating a node
+_WATCH_MASK = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_ATTRIB
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Reports changes of serial device nodes using inotify.
+
+    Args:
+        on_change: Called (on the event loop) after relevant events
+        paths: Directories to watch; those missing now (/dev/serial/by-id
+            before the first USB serial device) are added once they appear
+    """
+
+    def __init__(self, on_change: Callable[[], None], paths: tuple[str, ...] = (DEV_DIR, BY_ID_DIR)):
+        self.on_change = on_change
+        self.paths = paths
+        self.events = 0
+        self._fd: Optional[int] = None
+        self._libc = None
+        self._watches: dict[int, str] = {}
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux")
+
+    def start(self) -> None:
+        """Open the inotify instance and register it with the running loop.
+
+        Raises:
+            OSError: If inotify cannot be used
+        """
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._add_watches()
+        if not self._watches:
+            self.stop()
+            raise OSError(f"None of {list(self.paths)} can be watched")
+        asyncio.get_running_loop().add_reader(fd, self._on_readable)
+
+    def stop(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._fd)
+        except RuntimeError:
+            pass
+        os.close(self._fd)
+        self._fd = None
+        self._watches.clear()
+
+    def _add_watches(self) -> None:
+        """Watch every configured directory (and the parents of missing ones)."""
+        watched = set(self._watches.values())
+        for path in self.paths:
+            target = path
+            # Until a directory exists, watch the closest existing parent
+            while not os.path.isdir(target) and target != os.path.dirname(target):
+                target = os.path.dirname(target)
+            if target in watched:
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, target.encode(), _WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = target
+                watched.add(target)
+
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._fd, 65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        relevant = False
+        new_dirs = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0').decode(errors='replace')
+            offset += _EVENT_HEADER.size + length
+            new_dirs = new_dirs or bool(mask & _IN_ISDIR)
+            relevant = relevant or self._is_relevant(self._watches.get(wd, ""), name)
+        if new_dirs:
+            self._add_watches()
+        if relevant:
+            self.events += 1
+            self.on_change()
+
+    @staticmethod
+    def _is_relevant(directory: str, name: str) -> bool:
+        if directory != DEV_DIR:
+            # /dev/serial/... or a configured directory: everything counts
+            return True
+        return name.startswith(SERIAL_NAME_PREFIXES) or name == "serial"
+
+
+class UdevWatcher:
+    """Reports tty add/remove/change events from udev (needs pyudev)."""
+
+    def __init__(self, on_change: Callable[[], None]):
+        self.on_change = on_change
+        self.events = 0
+        self._monitor = None
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            import pyudev  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def start(self) -> None:
+        import pyudev
+        monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+        monitor.filter_by(subsystem='tty')
+        monitor.start()
+        self._monitor = monitor
+        asyncio.get_running_loop().add_reader(monitor.fileno(), self._on_readable)
+
+    def stop(self) -> None:
+        if self._monitor is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._monitor.fileno())
+        except RuntimeError:
+            pass
+        self._monitor = None
+
+    def _on_readable(self) -> None:
+        # Drain everything queued; one rescan covers the whole burst
+        received = False
+        while self._monitor.poll(timeout=0) is not None:
+            received = True
+        if received:
+            self.events += 1
+            self.on_change()
@@ -0,0 +1,276 @@
+"""Prometheus-style metrics in the text exposition format.
+
+Most metrics are read at scrape time from counters the backends, hubs and
+clients already keep for GET /api/status, so they cost nothing between
+scrapes. Only the histograms below are observed on the data path, and only
+while ``enabled`` is set (``ZFIELD_ENABLE_METRICS``); callers check the
+flag first, so a disabled server pays one attribute lookup per chunk:
+
+    if metrics.enabled:
+        metrics.READ_SECONDS.observe(elapsed, port)
+
+Event-loop lag is sampled by LoopLagMonitor, started with the server when
+metrics are enabled.
+"""
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from app.logging_config import logging_stats
+
+# Set at startup from Settings.enable_metrics
+enabled = False
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket bounds (seconds, bytes)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536, 262144)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative histogram per label set.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        labelnames: Label names; observe() takes their values in order
+        buckets: Upper bounds, ascending (+Inf is implied)
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labelvalues, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricFamily:
+    """Counter or gauge samples gathered at scrape time."""
+
+    def __init__(self, name: str, kind: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.samples: list[tuple[tuple, float]] = []
+
+    def add(self, value: Optional[float], *labelvalues) -> None:
+        if value is not None:
+            self.samples.append((labelvalues, value))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+                     for labelvalues, value in self.samples)
+        return lines
+
+
+# Observed on the data path while enabled
+READ_SECONDS = Histogram("zfield_read_call_seconds",
+                         "Duration of device read calls that returned data", ("port",))
+READ_BYTES = Histogram("zfield_read_chunk_bytes", "Size of chunks read from devices", ("port",), SIZE_BUCKETS)
+FRAME_BYTES = Histogram("zfield_ws_frame_bytes", "Size of terminal WebSocket frames", ("port",), SIZE_BUCKETS)
+SEND_SECONDS = Histogram("zfield_ws_send_seconds", "Time to hand a terminal frame to the WebSocket", ("port",))
+LOOP_LAG = Histogram("zfield_event_loop_lag_seconds",
+                     "Delay of event loop wakeups past their scheduled time")
+
+HISTOGRAMS = (READ_SECONDS, READ_BYTES, FRAME_BYTES, SEND_SECONDS, LOOP_LAG)
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how late a sleep of ``interval`` wakes up.
+
+    Args:
+        interval: Seconds between samples
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, time.monotonic() - expected)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            LOOP_LAG.observe(self.last_lag)
+
+
+def _families(specs: Iterable[tuple]) -> dict[str, MetricFamily]:
+    return {spec[0]: MetricFamily(f"zfield_{spec[0]}", *spec[1:]) for spec in specs}
+
+
+def _port_families() -> dict[str, MetricFamily]:
+    port = ("port",)
+    return _families([
+        ("port_connected", "gauge", "1 while the port is connected, 0 while reconnecting", port),
+        ("rx_bytes_total", "counter", "Bytes received from the device", port),
+        ("rx_chunks_total", "counter", "Chunks received from the device", port),
+        ("tx_bytes_total", "counter", "Bytes written to the device", port),
+        ("tx_writes_total", "counter", "Write requests sent to the device", port),
+        ("tx_queued_bytes", "gauge", "Bytes waiting to be written to the device (serial ports)", port),
+        ("history_bytes", "gauge", "Bytes held in the in-memory history", port),
+        ("history_capacity_bytes", "gauge", "Size of the in-memory history", port),
+        ("subscribers", "gauge", "Clients and callbacks attached to the port", port),
+        ("reconnects_total", "counter", "Times the lost device was reopened", port),
+        ("reconnect_failures_total", "counter", "Reconnect attempts that gave up", port),
+        ("worker_lost_bytes_total", "counter", "Bytes lost between a worker process and the server", port),
+        ("log_queued_chunks", "gauge", "Chunks waiting for the session log writer", port),
+        ("log_dropped_chunks_total", "counter", "Chunks dropped because the log queue was full", port),
+        ("log_bytes_written_total", "counter", "Bytes written to the session log", port),
+        ("log_lag_seconds", "gauge", "Time the session log writer is behind the last queued chunk", port),
+        ("trigger_matches_total", "counter", "Trigger rule matches", port),
+    ])
+
+
+def _terminal_families() -> dict[str, MetricFamily]:
+    # Summed over the port's terminal clients, departed ones included, so the
+    # series stay bounded however often browsers reconnect
+    port = ("port",)
+    return _families([
+        ("ws_port_clients", "gauge", "Terminal clients attached to the port", port),
+        ("ws_frames_total", "counter", "Frames sent to the port's terminal clients", port),
+        ("ws_bytes_total", "counter", "Bytes sent to the port's terminal clients", port),
+        ("ws_queue_bytes", "gauge", "Bytes received but not yet sent to the port's terminal clients", port),
+        ("ws_dropped_bytes_total", "counter", "Bytes slow terminal clients of the port skipped", port),
+        ("ws_spilled_bytes_total", "counter", "Bytes buffered on disk for slow terminal clients of the port", port),
+        ("ws_compression_input_bytes_total", "counter", "Bytes offered to compression for the port's terminal clients", port),
+        ("ws_compression_output_bytes_total", "counter", "Bytes sent to the port's compressing terminal clients", port),
+        ("ws_compression_cpu_seconds_total", "counter", "CPU time spent compressing frames for the port", port),
+    ])
+
+
+def _collect_port(families: dict, port: str, backend) -> None:
+    add = {name: family.add for name, family in families.items()}
+    add["port_connected"](int(backend.is_connected()), port)
+    add["rx_bytes_total"](backend.hub.buffer.end, port)
+    add["rx_chunks_total"](backend.hub.chunks, port)
+    add["history_bytes"](len(backend.hub.buffer), port)
+    add["history_capacity_bytes"](backend.hub.buffer.capacity, port)
+    add["subscribers"](backend.hub.subscriber_count, port)
+    add["tx_bytes_total"](backend.tx_bytes, port)
+    add["tx_writes_total"](backend.tx_writes, port)
+    tx_worker = getattr(backend, 'tx_worker', None)
+    if tx_worker:
+        add["tx_queued_bytes"](tx_worker.stats()["queued_bytes"], port)
+    if hasattr(backend, 'reconnect_stats'):
+        reconnect = backend.reconnect_stats()
+        add["reconnects_total"](reconnect["reconnects"], port)
+        add["reconnect_failures_total"](reconnect["failed"], port)
+    add["worker_lost_bytes_total"](getattr(backend, 'lost_bytes', None), port)
+    if backend.session_log:
+        log = backend.session_log.stats()
+        add["log_queued_chunks"](log["queued"], port)
+        add["log_dropped_chunks_total"](log["overflow"], port)
+        add["log_bytes_written_total"](log["bytes_written"], port)
+        add["log_lag_seconds"](log["lag"], port)
+
+
+def render(connection_manager, terminal_ports: list[dict], loop_lag: Optional[LoopLagMonitor] = None) -> str:
+    """Current metrics in the Prometheus text format.
+
+    Args:
+        connection_manager: Source of the connected ports
+        terminal_ports: Terminal client totals per port (websocket.get_terminal_port_stats)
+        loop_lag: Running event-loop lag monitor, if any
+    """
+    ports = _port_families()
+    for port, backend in connection_manager.backends.items():
+        _collect_port(ports, port, backend)
+    for engine in connection_manager.triggers.stats():
+        ports["trigger_matches_total"].add(engine["matches"], engine["port"])
+
+    terminals = _terminal_families()
+    for totals in terminal_ports:
+        port = totals["port"]
+        terminals["ws_port_clients"].add(totals["clients"], port)
+        terminals["ws_frames_total"].add(totals["frames"], port)
+        terminals["ws_bytes_total"].add(totals["bytes"], port)
+        terminals["ws_queue_bytes"].add(totals["pending"], port)
+        terminals["ws_dropped_bytes_total"].add(totals["dropped_bytes"], port)
+        terminals["ws_spilled_bytes_total"].add(totals["spilled_bytes"], port)
+        if totals.get("compressed_bytes"):
+            terminals["ws_compression_input_bytes_total"].add(totals["uncompressed_bytes"], port)
+            terminals["ws_compression_output_bytes_total"].add(totals["compressed_bytes"], port)
+            terminals["ws_compression_cpu_seconds_total"].add(totals["compression_cpu_ms"] / 1000, port)
+
+    server = _families([
+        ("connections", "gauge", "Connected or reconnecting ports"),
+        ("ws_clients", "gauge", "Attached terminal clients"),
+        ("event_loop_lag_max_seconds", "gauge", "Largest event loop lag seen"),
+        ("log_records_dropped_total", "counter", "Server log records dropped because the log queue was full"),
+        ("log_records_suppressed_total", "counter", "Repeated server log records suppressed by the rate limit"),
+    ])
+    server["connections"].add(len(connection_manager.backends))
+    server["ws_clients"].add(sum(totals["clients"] for totals in terminal_ports))
+    if loop_lag:
+        server["event_loop_lag_max_seconds"].add(loop_lag.max_lag)
+    log = logging_stats()
+    server["log_records_dropped_total"].add(log.get("dropped"))
+    server["log_records_suppressed_total"].add(log.get("suppressed"))
+
+    lines = []
+    for family in (*server.values(), *ports.values(), *terminals.values()):
+        if family.samples:
+            lines.extend(family.render())
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
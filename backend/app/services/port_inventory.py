@@ -0,0 +1,160 @@
+"""Shared, cached inventory of serial ports.
+
+Enumerating ports walks sysfs (or the registry) and can take tens of
+milliseconds on hosts with many adapters, so it is never done on the event
+loop and never on behalf of a single request. One PortInventory holds the
+current snapshot; the PortMonitor refreshes it when devices change, and
+/api/ports and /ws/ports answer from the cache.
+
+Every change bumps ``generation`` so consumers can tell whether they
+already hold the latest snapshot, and is passed to the registered listeners
+whoever triggered the refresh.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Optional
+
+import serial.tools.list_ports
+
+BY_ID_DIR = "/dev/serial/by-id"
+
+
+def _by_id_links(directory: str = BY_ID_DIR) -> dict[str, str]:
+    """Map device nodes to their stable /dev/serial/by-id link."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return {}
+    links = {}
+    for name in sorted(names):
+        path = os.path.join(directory, name)
+        links.setdefault(os.path.realpath(path), path)
+    return links
+
+
+def _usb_id(value: Optional[int]) -> Optional[str]:
+    return f"{value:04X}" if value is not None else None
+
+
+def enumerate_ports() -> list[dict]:
+    """List serial ports with their USB identity (blocking).
+
+    Returns:
+        Port dicts sorted by device name
+    """
+    links = _by_id_links()
+    ports = []
+    for port in serial.tools.list_ports.comports():
+        ports.append({
+            "device": port.device,
+            "description": port.description,
+            "manufacturer": port.manufacturer,
+            "hwid": port.hwid,
+            "vid": _usb_id(port.vid),
+            "pid": _usb_id(port.pid),
+            "serial_number": port.serial_number,
+            "product": port.product,
+            "location": port.location,
+            "by_id": links.get(os.path.realpath(port.device)),
+        })
+    return sorted(ports, key=lambda p: p["device"])
+
+
+def diff_ports(old: list[dict], new: list[dict]) -> dict:
+    """Describe how a port list changed.
+
+    Returns:
+        Dict with the "added" and "changed" port dicts and the "removed"
+        device names
+    """
+    before = {port["device"]: port for port in old}
+    after = {port["device"]: port for port in new}
+    return {
+        "added": [port for device, port in after.items() if device not in before],
+        "removed": [device for device in before if device not in after],
+        "changed": [port for device, port in after.items() if device in before and before[device] != port],
+    }
+
+
+class PortInventory:
+    """Cached port snapshot refreshed in a worker thread.
+
+    Args:
+        enumerate: Blocking function returning the current port list
+    """
+
+    def __init__(self, enumerate: Callable[[], list[dict]] = enumerate_ports):
+        self.enumerate = enumerate
+        self.ports: list[dict] = []
+        self.generation = 0
+        self.updated_at: Optional[float] = None
+        self.refreshes = 0
+        self.last_refresh_ms: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._listeners: list[Callable[[list[dict]], None]] = []
+
+    def add_listener(self, listener: Callable[[list[dict]], None]) -> None:
+        """Call listener with the new port list after every change."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[list[dict]], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @property
+    def loaded(self) -> bool:
+        return self.updated_at is not None
+
+    async def snapshot(self) -> dict:
+        """Current ports and generation; enumerates only if never loaded."""
+        if not self.loaded:
+            await self.refresh()
+        return {"generation": self.generation, "ports": self.ports}
+
+    async def refresh(self) -> bool:
+        """Re-enumerate off the event loop.
+
+        Concurrent callers share one enumeration.
+
+        Returns:
+            True if the ports differ from the previous snapshot
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self) -> bool:
+        started = time.monotonic()
+        ports = await asyncio.get_running_loop().run_in_executor(None, self.enumerate)
+        self.refreshes += 1
+        self.last_refresh_ms = (time.monotonic() - started) * 1000
+        self.updated_at = time.time()
+        if ports == self.ports and self.generation:
+            return False
+        self.ports = ports
+        self.generation += 1
+        for listener in list(self._listeners):
+            listener(ports)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "ports": len(self.ports),
+            "refreshes": self.refreshes,
+            "last_refresh_ms": self.last_refresh_ms,
+            "updated_at": self.updated_at,
+        }
+
+
+# Global inventory instance
+_inventory: Optional[PortInventory] = None
+
+
+def get_port_inventory() -> PortInventory:
+    """Get or create the global port inventory."""
+    global _inventory
+    if _inventory is None:
+        _inventory = PortInventory()
+    return _inventory
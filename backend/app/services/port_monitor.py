@@ -1,25 +1,61 @@
-"""Serial port monitoring service using polling."""
+"""Serial port monitoring service.
+
+The monitor keeps the shared PortInventory up to date: ports are rescanned
+when a hotplug watcher (udev or inotify, see app.services.hotplug) reports
+activity, after a short debounce window so a device appearing together with
+its by-id links costs one scan. Polling is kept as the fallback where no
+watcher can be used.
+"""
 import asyncio
-from typing import Callable, Optional, Set
-import serial.tools.list_ports
+import logging
+from typing import Callable, Optional
+
+from app.services.hotplug import InotifyWatcher, UdevWatcher
+from app.services.port_inventory import PortInventory, get_port_inventory
+
+logger = logging.getLogger(__name__)
+
+MONITOR_MODES = ("auto", "udev", "inotify", "polling")
+# Safety rescan while watching, in case an event was missed
+RESCAN_INTERVAL = 30.0
+# Longest a continuous burst of events may postpone a rescan
+MAX_DEBOUNCE = 1.0
 
 
 class PortMonitor:
-    """Monitors serial port changes using polling."""
-    
-    def __init__(self, callback: Callable[[list], None]):
-        """Initialize port monitor.
-        
-        Args:
-            callback: Function to call when ports change, receives list of port dicts
-                     Can be sync or async
-        """
+    """Monitors serial port changes.
+
+    Args:
+        callback: Function to call when ports change, receives list of port dicts
+                 Can be sync or async
+        mode: "auto" (udev, then inotify, then polling), "udev", "inotify" or "polling"
+        debounce: Seconds without events to wait before rescanning
+        poll_interval: Seconds between scans when polling
+        watch_paths: Directories for the inotify watcher (defaults to /dev
+                    and /dev/serial/by-id)
+        inventory: Port inventory to refresh (defaults to the shared one)
+    """
+
+    def __init__(self, callback: Callable[[list], None], mode: str = "auto",
+                 debounce: float = 0.05, poll_interval: float = 1.0,
+                 watch_paths: Optional[tuple[str, ...]] = None,
+                 inventory: Optional[PortInventory] = None):
+        if mode not in MONITOR_MODES:
+            raise ValueError(f"Port monitor mode must be one of {list(MONITOR_MODES)}, got {mode}")
         self.callback = callback
+        self.mode = mode
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.watch_paths = watch_paths
+        self.inventory = inventory or get_port_inventory()
+        self.active_mode: Optional[str] = None
+        self.scans = 0
         self.monitor_task: Optional[asyncio.Task] = None
         self._running = False
-        self._last_ports: Set[str] = set()
+        self._watcher = None
+        self._changed: Optional[asyncio.Event] = None
         self._loop = None
-    
+
     def _invoke_callback(self, ports: list[dict]):
         """Invoke callback, handling both sync and async callbacks."""
         # Check if callback is async
@@ -44,65 +80,113 @@ class PortMonitor:
         else:
             # Call sync callback directly
             self.callback(ports)
-        
+
     def start(self):
         """Start monitoring ports."""
         if self._running:
             return
         self._running = True
+        self._changed = asyncio.Event()
+        self.inventory.add_listener(self._invoke_callback)
         self.monitor_task = asyncio.create_task(self._monitor_loop())
-        
+
     def stop(self):
         """Stop monitoring ports."""
         self._running = False
+        self.inventory.remove_listener(self._invoke_callback)
+        self._stop_watcher()
         if self.monitor_task:
+            # Called from the loop at shutdown: cancel without waiting
             self.monitor_task.cancel()
-            try:
-                asyncio.get_event_loop().run_until_complete(self.monitor_task)
-            except asyncio.CancelledError:
-                pass
             self.monitor_task = None
-    
-    def _get_current_ports(self) -> list[dict]:
-        """Get current list of ports."""
-        ports = []
-        for port in serial.tools.list_ports.comports():
-            ports.append({
-                "device": port.device,
-                "description": port.description,
-                "manufacturer": port.manufacturer,
-                "hwid": port.hwid,
-            })
-        return ports
-    
-    def _ports_changed(self, current_ports: list[dict]) -> bool:
-        """Check if ports have changed."""
-        current_set = {p["device"] for p in current_ports}
-        if current_set != self._last_ports:
-            self._last_ports = current_set
-            return True
-        return False
-    
+
+    async def _scan(self) -> None:
+        """Refresh the inventory; its listeners (our callback) hear of changes.
+
+        A port whose metadata differs (another board on the same device
+        name) counts as a change, not only ports appearing or vanishing.
+        """
+        self.scans += 1
+        await self.inventory.refresh()
+
+    def _notify_change(self) -> None:
+        """Watcher callback: schedule a debounced rescan."""
+        self._changed.set()
+
+    def _start_watcher(self):
+        """Start the best available hotplug watcher, or None to poll."""
+        candidates = []
+        if self.mode in ("auto", "udev") and UdevWatcher.available():
+            candidates.append(("udev", lambda: UdevWatcher(self._notify_change)))
+        if self.mode in ("auto", "inotify") and InotifyWatcher.available():
+            paths = {"paths": self.watch_paths} if self.watch_paths else {}
+            candidates.append(("inotify", lambda: InotifyWatcher(self._notify_change, **paths)))
+        for name, factory in candidates:
+            watcher = factory()
+            try:
+                watcher.start()
+            except Exception as e:
+                logger.warning("Port monitor: %s watcher unavailable: %s", name, e)
+                continue
+            self.active_mode = name
+            return watcher
+        if self.mode not in ("auto", "polling"):
+            logger.warning("Port monitor: %s monitoring unavailable, falling back to polling", self.mode)
+        self.active_mode = "polling"
+        return None
+
+    def _stop_watcher(self) -> None:
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+
     async def _monitor_loop(self):
-        """Main monitoring loop - uses polling."""
-        await self._monitor_polling()
-    
+        """Main monitoring loop - event driven when a watcher is available."""
+        self._watcher = self._start_watcher()
+        try:
+            if self._watcher:
+                await self._monitor_events()
+            else:
+                await self._monitor_polling()
+        finally:
+            self._stop_watcher()
+
+    async def _debounce(self) -> None:
+        """Wait until events have been quiet for the debounce window."""
+        waited = 0.0
+        while self.debounce > 0 and self._changed.is_set() and waited < MAX_DEBOUNCE:
+            self._changed.clear()
+            await asyncio.sleep(self.debounce)
+            waited += self.debounce
+        self._changed.clear()
+
+    async def _monitor_events(self):
+        """Rescan on hotplug events, with an occasional safety rescan."""
+        logger.info("Using %s-based port monitoring", self.active_mode)
+        await self._scan()
+
+        while self._running:
+            try:
+                await asyncio.wait_for(self._changed.wait(), RESCAN_INTERVAL)
+                await self._debounce()
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self._scan()
+            except Exception as e:
+                logger.error("Error in port monitor: %s", e)
+
     async def _monitor_polling(self):
         """Polling-based port monitoring."""
-        print("Using polling-based port monitoring")
-        
+        logger.info("Using polling-based port monitoring")
+
         # Initial port list
-        ports = self._get_current_ports()
-        if self._ports_changed(ports):
-            self._invoke_callback(ports)
-        
+        await self._scan()
+
         while self._running:
             try:
-                await asyncio.sleep(1.0)  # Poll every second
-                ports = self._get_current_ports()
-                if self._ports_changed(ports):
-                    self._invoke_callback(ports)
+                await asyncio.sleep(self.poll_interval)
+                await self._scan()
             except Exception as e:
-                print(f"Error in polling monitor: {e}")
+                logger.error("Error in polling monitor: %s", e)
                 await asyncio.sleep(1)
-
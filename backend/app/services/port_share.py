@@ -0,0 +1,329 @@
+"""Re-publish connected ports on local TCP sockets.
+
+Only one process can open a tty, so while zfield holds a port no other tool
+can reach the device. A PortShare listens on a TCP port and lets test rigs,
+terminal programs or pyserial's ``rfc2217://`` URLs use the connection
+alongside the browser:
+
+- every TCP client gets its own hub subscription, exactly like a WebSocket
+  client, so data is fanned out from the same history buffer;
+- client input is written through the backend, so it is logged and ordered
+  with the other writers;
+- a TxArbiter decides who may write when several clients type at once.
+
+In "rfc2217" mode the server side of RFC 2217 is spoken: line settings and
+modem lines requested by a client are applied to local serial ports. Other
+backends have no line to configure, so requests are acknowledged unchanged.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.backends import telnet_protocol as tp
+from app.backends.base import BaseBackend
+
+logger = logging.getLogger(__name__)
+
+SHARE_MODES = ("raw", "rfc2217")
+TX_POLICIES = ("shared", "lease")
+
+# RFC 2217 commands answered without any effect on the port
+SET_LINESTATE_MASK = 10
+SET_MODEMSTATE_MASK = 11
+SIGNATURE = 0
+
+# SET_CONTROL values for modem lines: query, on, off
+_CONTROL_LINES = {
+    4: ("break_condition", 5, 6),
+    7: ("dtr", 8, 9),
+    10: ("rts", 11, 12),
+}
+_FLOW_CODES = {tp.FLOW_NONE: (False, False), tp.FLOW_XONXOFF: (True, False), tp.FLOW_HARDWARE: (False, True)}
+
+
+class TxArbiter:
+    """Decides which writer may transmit to a shared port.
+
+    Policies:
+        shared: Every writer may send; chunks interleave but are never split
+        lease: A writer owns the port until it has been idle for ``lease``
+            seconds; input from anyone else meanwhile is refused
+    """
+
+    def __init__(self, policy: str = "lease", lease: float = 0.5):
+        if policy not in TX_POLICIES:
+            raise ValueError(f"TX policy must be one of {list(TX_POLICIES)}, got {policy}")
+        self.policy = policy
+        self.lease = lease
+        self.owner: Optional[str] = None
+        self.granted = 0
+        self.refused = 0
+        self._last_write = 0.0
+
+    def claim(self, owner: str) -> bool:
+        """Ask to write now; True if owner may send."""
+        now = time.monotonic()
+        if self.policy == "lease" and self.owner not in (None, owner) and now - self._last_write < self.lease:
+            self.refused += 1
+            return False
+        self.owner = owner
+        self._last_write = now
+        self.granted += 1
+        return True
+
+    def release(self, owner: str) -> None:
+        """Give up the lease early (e.g. when the writer disconnects)."""
+        if self.owner == owner:
+            self.owner = None
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "owner": self.owner,
+            "granted": self.granted,
+            "refused": self.refused,
+        }
+
+
+class _ShareClient:
+    """One TCP connection to a PortShare."""
+
+    def __init__(self, share: "PortShare", reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.share = share
+        self.reader = reader
+        self.writer = writer
+        peer = writer.get_extra_info('peername')
+        self.name = f"tcp:{peer[0]}:{peer[1]}" if peer else "tcp"
+        self.tx_bytes = 0
+        self.refused_bytes = 0
+        self.codec: Optional[tp.TelnetCodec] = None
+        if share.mode == "rfc2217":
+            self.codec = tp.TelnetCodec(accept_remote=frozenset({tp.BINARY, tp.SGA, tp.COM_PORT_OPTION}))
+            self.codec.on_subnegotiation = self._on_subnegotiation
+            self.codec.request_will(tp.BINARY)
+            self.codec.request_will(tp.SGA)
+            self.codec.request_do(tp.BINARY)
+        self.subscription = share.backend.subscribe(name=self.name)
+
+    async def run(self) -> None:
+        """Serve the client until either side goes away."""
+        pump = asyncio.create_task(self._pump())
+        try:
+            if self.codec:
+                self.writer.write(self.codec.take_replies())
+            while not self.subscription.closed:
+                data = await self.reader.read(4096)
+                if not data:
+                    break
+                await self._transmit(self._decode(data))
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning("Port share client %s dropped: %s", self.name, e)
+        finally:
+            pump.cancel()
+            self.close()
+            self.share.arbiter.release(self.name)
+            try:
+                await pump
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # The pump may already have died writing to a dropped client
+                logger.warning("Port share client %s send failed: %s", self.name, e)
+
+    def close(self) -> None:
+        self.subscription.close()
+        self.writer.close()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "tx_bytes": self.tx_bytes,
+            "refused_bytes": self.refused_bytes,
+            **self.subscription.stats(),
+        }
+
+    async def _pump(self) -> None:
+        """Forward received port data to the client."""
+        while not self.subscription.closed:
+            await self.subscription.wait()
+            data = self.subscription.read()
+            if not data:
+                continue
+            self.writer.write(self.codec.encode(data) if self.codec else data)
+            await self.writer.drain()
+
+    def _decode(self, data: bytes) -> bytes:
+        if not self.codec:
+            return data
+        data = self.codec.feed(data)
+        replies = self.codec.take_replies()
+        if replies:
+            self.writer.write(replies)
+        return data
+
+    async def _transmit(self, data: bytes) -> None:
+        if not data:
+            return
+        if not self.share.arbiter.claim(self.name):
+            self.refused_bytes += len(data)
+            return
+        try:
+            await self.share.backend.send(data)
+            self.tx_bytes += len(data)
+        except Exception as e:
+            logger.error("Port share write from %s failed: %s", self.name, e)
+
+    def _on_subnegotiation(self, option: int, payload: bytes) -> None:
+        if option != tp.COM_PORT_OPTION or not payload:
+            return
+        reply = self.share.com_port_reply(payload[0], payload[1:])
+        if reply is not None:
+            self.writer.write(tp.com_port_command(payload[0] + tp.SERVER_OFFSET, reply))
+
+
+class PortShare:
+    """TCP listener re-publishing one connected port.
+
+    Args:
+        port: Name of the shared connection (diagnostics only)
+        backend: Connected backend to share
+        mode: "raw" or "rfc2217"
+        arbiter: TX arbitration shared with the port's WebSocket clients
+    """
+
+    def __init__(self, port: str, backend: BaseBackend, mode: str = "raw",
+                 arbiter: Optional[TxArbiter] = None):
+        if mode not in SHARE_MODES:
+            raise ValueError(f"Share mode must be one of {list(SHARE_MODES)}, got {mode}")
+        self.port = port
+        self.backend = backend
+        self.mode = mode
+        self.arbiter = arbiter or TxArbiter()
+        self.address: Optional[tuple[str, int]] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: set[_ShareClient] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self, host: str, listen_port: int) -> None:
+        """Start listening (listen_port 0 picks a free port)."""
+        self._server = await asyncio.start_server(self._handle, host, listen_port)
+        self.address = self._server.sockets[0].getsockname()[:2]
+        logger.info("Sharing %s on %s:%s (%s)", self.port, self.address[0], self.address[1], self.mode)
+
+    async def close(self) -> None:
+        """Stop listening and drop all clients."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Closing the transports ends each client's read loop
+        for client in list(self._clients):
+            client.close()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Listener address, TX arbitration and per-client counters."""
+        host, port = self.address or (None, None)
+        return {
+            "port": self.port,
+            "mode": self.mode,
+            "address": f"{host}:{port}" if host else None,
+            "tx": self.arbiter.stats(),
+            "clients": [client.stats() for client in self._clients],
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _ShareClient(self, reader, writer)
+        logger.info("Port share client %s attached to %s", client.name, self.port)
+        self._clients.add(client)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            await client.run()
+        finally:
+            self._clients.discard(client)
+            self._tasks.discard(task)
+
+    def com_port_reply(self, command: int, value: bytes) -> Optional[bytes]:
+        """Handle an RFC 2217 client command and return the value to acknowledge."""
+        handlers = {
+            tp.SET_BAUDRATE: self._set_baudrate,
+            tp.SET_DATASIZE: self._set_datasize,
+            tp.SET_PARITY: self._set_parity,
+            tp.SET_STOPSIZE: self._set_stopsize,
+            tp.SET_CONTROL: self._set_control,
+        }
+        if command in handlers and value:
+            return handlers[command](value)
+        if command in (tp.PURGE_DATA, SET_LINESTATE_MASK, SET_MODEMSTATE_MASK):
+            # Acknowledged only: purging would discard data other readers share
+            return value
+        if command == SIGNATURE:
+            return b"zfield"
+        return None
+
+    def _line(self):
+        """The local pyserial port behind the backend, if any."""
+        return getattr(self.backend, 'serial_port', None)
+
+    def _apply(self, name: str, value) -> None:
+        """Change a line setting; None (a query) and invalid values leave it unchanged."""
+        line = self._line()
+        if line is None or value is None:
+            return
+        try:
+            setattr(line, name, value)
+        except Exception as e:
+            # pyserial raises ValueError, SerialException or termios.error
+            logger.warning("Port share could not set %s=%s on %s: %s", name, value, self.port, e)
+
+    def _set_baudrate(self, value: bytes) -> bytes:
+        self._apply('baudrate', int.from_bytes(value[:4], 'big') or None)
+        line = self._line()
+        return tp.baudrate_value(line.baudrate) if line else value
+
+    def _set_datasize(self, value: bytes) -> bytes:
+        self._apply('bytesize', value[0] or None)
+        line = self._line()
+        return bytes([line.bytesize]) if line else value
+
+    def _set_parity(self, value: bytes) -> bytes:
+        parities = {code: name for name, code in tp.PARITY_CODES.items()}
+        self._apply('parity', parities.get(value[0]))
+        line = self._line()
+        return bytes([tp.PARITY_CODES[line.parity]]) if line else value
+
+    def _set_stopsize(self, value: bytes) -> bytes:
+        stopbits = {code: bits for bits, code in tp.STOPBITS_CODES.items()}
+        self._apply('stopbits', stopbits.get(value[0]))
+        line = self._line()
+        return bytes([tp.STOPBITS_CODES[line.stopbits]]) if line else value
+
+    def _set_control(self, value: bytes) -> bytes:
+        line = self._line()
+        code = value[0]
+        if line is None:
+            return value
+        if code in _FLOW_CODES:
+            xonxoff, rtscts = _FLOW_CODES[code]
+            self._apply('xonxoff', xonxoff)
+            self._apply('rtscts', rtscts)
+        if code in _FLOW_CODES or code == 0:
+            return bytes([self._flow_code(line)])
+        return self._set_modem_line(line, code)
+
+    @staticmethod
+    def _flow_code(line) -> int:
+        if line.rtscts:
+            return tp.FLOW_HARDWARE
+        return tp.FLOW_XONXOFF if line.xonxoff else tp.FLOW_NONE
+
+    def _set_modem_line(self, line, code: int) -> bytes:
+        for query, (name, on, off) in _CONTROL_LINES.items():
+            if code in (on, off):
+                self._apply(name, code == on)
+            if code in (query, on, off):
+                return bytes([on if getattr(line, name) else off])
+        return bytes([code])
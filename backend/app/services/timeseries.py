@@ -0,0 +1,229 @@
+"""In-memory time-series store for numeric values extracted from ports.
+
+Each (port, series) pair keeps two parallel ``array('d')`` columns, unix
+timestamps and values, so a sample costs 16 bytes and a week of one value
+per second fits in about 10MB. Timestamps never decrease, which lets a time
+range be located by bisection.
+
+Queries return at most ``points`` samples:
+    raw: Every sample in the range (capped at ``points``, newest kept)
+    minmax: The lowest and highest sample of each of ``points / 2`` equal
+        time buckets, which keeps every spike visible
+    lttb: Largest-Triangle-Three-Buckets, the shape-preserving choice for
+        line charts. Long ranges are first reduced to the min/max of
+        ``2 * points`` buckets (MinMaxLTTB), so only a few thousand samples
+        go through the Python loop however long the range is.
+
+Every full block of BLOCK samples also records its minimum and maximum, so
+the extremes of a bucket are found from the block summaries plus at most
+two partial blocks instead of every sample; a query over a million samples
+takes 10-50 milliseconds.
+"""
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+QUERY_MODES = ("lttb", "minmax", "raw")
+
+# Samples per min/max summary entry
+BLOCK = 64
+
+# Default and largest number of points per query
+DEFAULT_POINTS = 1000
+MAX_POINTS = 20000
+# Candidates per output point kept by the min/max preselection of lttb
+LTTB_PRESELECT = 4
+
+
+class Series:
+    """Timestamp and value columns of one series.
+
+    Args:
+        max_points: Samples kept; the oldest are dropped beyond that
+    """
+
+    def __init__(self, max_points: int):
+        self.max_points = max_points
+        self.timestamps = array('d')
+        self.values = array('d')
+        # Extremes of each full block of values
+        self.block_min = array('d')
+        self.block_max = array('d')
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, timestamp: float, value: float) -> None:
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            # Keep the column sorted if the wall clock steps back
+            timestamp = self.timestamps[-1]
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+        if len(self.values) % BLOCK == 0:
+            block = self.values[-BLOCK:]
+            self.block_min.append(min(block))
+            self.block_max.append(max(block))
+        # Trim whole blocks in steps of 1/8 so the memmove is amortized
+        excess = len(self.values) - self.max_points
+        if excess > self.max_points // 8:
+            blocks = excess // BLOCK
+            del self.timestamps[:blocks * BLOCK]
+            del self.values[:blocks * BLOCK]
+            del self.block_min[:blocks]
+            del self.block_max[:blocks]
+            self.dropped += blocks * BLOCK
+
+    def index_range(self, start: Optional[float], end: Optional[float]) -> tuple[int, int]:
+        """[lo, hi) indices of the samples with start <= timestamp <= end."""
+        lo = bisect_left(self.timestamps, start) if start is not None else 0
+        hi = bisect_right(self.timestamps, end) if end is not None else len(self.timestamps)
+        return lo, max(lo, hi)
+
+    def extreme(self, lo: int, hi: int, pick=min) -> int:
+        """Index of the lowest (pick=min) or highest (pick=max) value in [lo, hi)."""
+        first_block = -(-lo // BLOCK)
+        end_block = hi // BLOCK
+        if end_block - first_block < 2:
+            chunk = self.values[lo:hi]
+            return lo + chunk.index(pick(chunk))
+        summary = (self.block_min if pick is min else self.block_max)[first_block:end_block]
+        value = pick(summary)
+        block = first_block + summary.index(value)
+        candidates = [(value, block * BLOCK + self.values[block * BLOCK:(block + 1) * BLOCK].index(value))]
+        # Partial blocks at both ends are scanned directly
+        for start, chunk in ((lo, self.values[lo:first_block * BLOCK]),
+                             (end_block * BLOCK, self.values[end_block * BLOCK:hi])):
+            if chunk:
+                value = pick(chunk)
+                candidates.append((value, start + chunk.index(value)))
+        return pick(candidates, key=lambda candidate: candidate[0])[1]
+
+    def info(self) -> dict:
+        return {
+            "points": len(self.values),
+            "start": self.timestamps[0] if self.timestamps else None,
+            "end": self.timestamps[-1] if self.timestamps else None,
+            "dropped": self.dropped,
+        }
+
+
+def _minmax_indices(series: Series, lo: int, hi: int, buckets: int) -> list[int]:
+    """Indices of the min and max sample of equal time buckets, in order."""
+    timestamps = series.timestamps
+    first, last = timestamps[lo], timestamps[hi - 1]
+    width = (last - first) / buckets
+    indices = []
+    a = lo
+    for bucket in range(1, buckets + 1):
+        b = hi if bucket == buckets else bisect_left(timestamps, first + bucket * width, a, hi)
+        if b <= a:
+            continue
+        indices.extend(sorted({series.extreme(a, b, min), series.extreme(a, b, max)}))
+        a = b
+    return indices
+
+
+def _lttb_indices(series: Series, candidates: list[int], points: int) -> list[int]:
+    """Pick points of candidates (sample indices) with Largest-Triangle-Three-Buckets."""
+    if len(candidates) <= points:
+        return candidates
+    ts = [series.timestamps[i] for i in candidates]
+    vs = [series.values[i] for i in candidates]
+    size = len(candidates)
+    every = (size - 2) / (points - 2)
+    chosen = [0]
+    a = 0
+    for bucket in range(points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_end = min(int((bucket + 2) * every) + 1, size)
+        span = max(1, next_end - end)
+        avg_t = sum(ts[end:next_end]) / span if next_end > end else ts[-1]
+        avg_v = sum(vs[end:next_end]) / span if next_end > end else vs[-1]
+        at, av = ts[a], vs[a]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((at - avg_t) * (vs[i] - av) - (at - ts[i]) * (avg_v - av))
+            if area > best_area:
+                best, best_area = i, area
+        chosen.append(best)
+        a = best
+    chosen.append(size - 1)
+    return [candidates[i] for i in chosen]
+
+
+class SeriesStore:
+    """All series, keyed by port and series name.
+
+    Args:
+        max_points: Samples kept per series
+    """
+
+    def __init__(self, max_points: int = 1000000):
+        self.max_points = max_points
+        self._series: dict[tuple[str, str], Series] = {}
+
+    def append(self, port: str, name: str, value: float, timestamp: Optional[float] = None) -> None:
+        series = self._series.get((port, name))
+        if series is None:
+            series = self._series[(port, name)] = Series(self.max_points)
+        series.append(time.time() if timestamp is None else timestamp, value)
+
+    def list(self) -> list[dict]:
+        return [{"port": port, "series": name, **series.info()}
+                for (port, name), series in sorted(self._series.items())]
+
+    def clear(self, port: Optional[str] = None, name: Optional[str] = None) -> int:
+        """Delete the matching series; returns how many were deleted."""
+        keys = [key for key in self._series
+                if port in (None, key[0]) and name in (None, key[1])]
+        for key in keys:
+            del self._series[key]
+        return len(keys)
+
+    def query(self, port: str, name: str, start: Optional[float] = None, end: Optional[float] = None,
+              points: int = DEFAULT_POINTS, mode: str = "lttb") -> dict:
+        """Samples of a series between start and end (unix time), downsampled.
+
+        Returns:
+            ``total`` samples in the range and the selected ones as the
+            columns ``t`` and ``v``
+
+        Raises:
+            KeyError: If the series does not exist
+            ValueError: For an unknown mode or fewer than 3 points
+        """
+        if mode not in QUERY_MODES:
+            raise ValueError(f"Mode must be one of {list(QUERY_MODES)}, got {mode}")
+        if not 3 <= points <= MAX_POINTS:
+            raise ValueError(f"Points must be between 3 and {MAX_POINTS}, got {points}")
+        series = self._series.get((port, name))
+        if series is None:
+            raise KeyError(f"No series {name} on {port}")
+
+        lo, hi = series.index_range(start, end)
+        total = hi - lo
+        if total <= points or mode == "raw":
+            lo = max(lo, hi - points)
+            indices = range(lo, hi)
+        elif mode == "minmax":
+            indices = _minmax_indices(series, lo, hi, points // 2)
+        else:
+            if total > LTTB_PRESELECT * points:
+                candidates = _minmax_indices(series, lo, hi, LTTB_PRESELECT * points // 2)
+                # The first and last sample anchor the line
+                candidates = sorted({lo, hi - 1, *candidates})
+            else:
+                candidates = list(range(lo, hi))
+            indices = _lttb_indices(series, candidates, points)
+        return {
+            "port": port,
+            "series": name,
+            "mode": mode,
+            "total": total,
+            "t": [series.timestamps[i] for i in indices],
+            "v": [series.values[i] for i in indices],
+        }
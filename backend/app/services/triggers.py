@@ -0,0 +1,454 @@
+"""Server-side triggers: counters, traffic lights, slicers and auto-responses.
+
+Rules run on the stream received from each port they watch, so they keep
+counting and answering with no browser attached. Per port, the literal
+patterns of all rules are searched in a single pass (MultiPatternMatcher)
+and regex rules are precompiled and tried on complete lines. Escape
+sequences (colors, cursor movement) are removed first so a pattern matches
+what the terminal shows.
+
+Rule types:
+    count: Counts occurrences of ``pattern``
+    traffic: "green" on ``pattern``, "red" on ``alert_pattern``; clients
+        fall back to "yellow" after ``reset_after`` seconds without either
+    slice: Extracts the text between ``pattern`` and ``end`` (a newline by
+        default); for regex rules, the first group or the whole match. With
+        a ``series`` name, the first number in each value is recorded in
+        the registry's SeriesStore under the port it came from
+    respond: Sends ``response`` and a newline to the port on ``pattern``, at
+        most once per ``cooldown`` seconds (regex rules may use \\1 or \\g<name>).
+        On a shared port the response claims TX as "trigger:<rule id>" and
+        is skipped while another writer holds the lease
+
+Rule state is shared by all ports a rule watches. Changes are collected and
+handed to listeners as compact updates at most every EVENT_INTERVAL seconds.
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Optional
+
+from app.backends.base import BaseBackend
+from app.backends.log_filter import EscapeFilter
+from app.backends.pattern_matcher import MultiPatternMatcher
+from app.services.timeseries import SeriesStore
+
+logger = logging.getLogger(__name__)
+
+RULE_TYPES = ("count", "traffic", "slice", "respond")
+
+# Seconds between update batches sent to listeners
+EVENT_INTERVAL = 0.1
+# Longest line kept for regex rules and longest sliced value
+MAX_LINE = 4096
+MAX_SLICE = 256
+
+# First number in a sliced value ("heap: 1234 bytes", "-67dBm", "2.5e3")
+_NUMBER = re.compile(r'[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+class TriggerRule:
+    """One rule and its current state.
+
+    Args:
+        rule_id: Client-chosen identifier
+        rule_type: One of RULE_TYPES
+        pattern: Text (or regex) that fires the rule
+        port: Port name the rule watches, or "all"
+        regex: Treat the patterns as regular expressions matched per line
+        alert_pattern: Second pattern of traffic rules (turns them red)
+        end: Text ending a slice (defaults to a newline)
+        response: Text sent by respond rules
+        reset_after: Seconds a traffic rule stays green or red
+        cooldown: Minimum seconds between two responses
+        enabled: Disabled rules are kept but not evaluated
+        count: Initial count
+        series: Record numeric slice values under this series name
+    """
+
+    def __init__(self, rule_id: str, rule_type: str, pattern: str = "", port: str = "all",
+                 regex: bool = False, alert_pattern: str = "", end: str = "", response: str = "",
+                 reset_after: float = 5.0, cooldown: float = 0.0, enabled: bool = True, count: int = 0,
+                 series: str = ""):
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"Rule type must be one of {list(RULE_TYPES)}, got {rule_type}")
+        if not pattern and not (rule_type == "traffic" and alert_pattern):
+            raise ValueError(f"Rule {rule_id} has no pattern")
+        if rule_type == "respond" and not response:
+            raise ValueError(f"Rule {rule_id} has no response")
+        self.id = rule_id
+        self.type = rule_type
+        self.pattern = pattern
+        self.port = port
+        self.regex = regex
+        self.alert_pattern = alert_pattern if rule_type == "traffic" else ""
+        self.end = end
+        self.response = response
+        self.reset_after = reset_after
+        self.cooldown = cooldown
+        self.enabled = enabled
+        self.series = series if rule_type == "slice" else ""
+        self.regexes = self._compile() if regex else []
+        # State
+        self.count = count
+        self.state = "yellow"
+        self.value: Optional[str] = None
+        self.changed_at: Optional[float] = None
+        self._last_response = 0.0
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "TriggerRule":
+        spec = dict(spec)
+        return cls(spec.pop("id"), spec.pop("type"), **spec)
+
+    def _compile(self) -> list[tuple[str, re.Pattern]]:
+        compiled = []
+        for kind, text in self.patterns():
+            try:
+                compiled.append((kind, re.compile(text.encode('utf-8'))))
+            except re.error as e:
+                raise ValueError(f"Invalid pattern in rule {self.id}: {e}") from e
+        return compiled
+
+    def patterns(self) -> list[tuple[str, str]]:
+        """(kind, text) of every pattern the rule reacts to."""
+        kinds = [("match", self.pattern), ("alert", self.alert_pattern)]
+        return [(kind, text) for kind, text in kinds if text]
+
+    def watches(self, port: str) -> bool:
+        return self.enabled and self.port in ("all", port)
+
+    def current_state(self) -> str:
+        if self.changed_at and time.time() - self.changed_at >= self.reset_after:
+            return "yellow"
+        return self.state
+
+    def adopt_state(self, other: "TriggerRule") -> None:
+        """Keep the state of the rule this one replaces."""
+        self.count = other.count
+        self.state = other.state
+        self.value = other.value
+        self.changed_at = other.changed_at
+        self._last_response = other._last_response
+
+    def reset(self) -> None:
+        self.count = 0
+        self.state = "yellow"
+        self.value = None
+        self.changed_at = None
+
+    def may_respond(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_response < self.cooldown:
+            return False
+        self._last_response = now
+        return True
+
+    def update(self) -> dict:
+        """Compact state sent to clients."""
+        update = {"id": self.id, "count": self.count}
+        if self.type == "traffic":
+            update["state"] = self.current_state()
+        elif self.type == "slice":
+            update["value"] = self.value
+        return update
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "port": self.port,
+            "pattern": self.pattern,
+            "regex": self.regex,
+            "alert_pattern": self.alert_pattern,
+            "end": self.end,
+            "response": self.response,
+            "reset_after": self.reset_after,
+            "cooldown": self.cooldown,
+            "enabled": self.enabled,
+            "series": self.series,
+            **self.update(),
+        }
+
+
+class TriggerEngine:
+    """Evaluates the rules watching one port on its received data.
+
+    Args:
+        port: Port name
+        backend: Backend whose data is scanned and which receives responses
+        rules: Rules watching this port
+        on_change: Called with a rule whenever its state changed
+        series: Store receiving the values of slice rules with a series
+        claim_tx: Asked (port, writer name) before a response is sent
+        release_tx: Called (port, writer name) once a response was sent
+    """
+
+    def __init__(self, port: str, backend: BaseBackend, rules: list[TriggerRule],
+                 on_change: Callable[[TriggerRule], None], series: Optional[SeriesStore] = None,
+                 claim_tx: Optional[Callable[[str, str], bool]] = None,
+                 release_tx: Optional[Callable[[str, str], None]] = None):
+        self.port = port
+        self.backend = backend
+        self.rules = rules
+        self.on_change = on_change
+        self.series = series
+        self.claim_tx = claim_tx
+        self.release_tx = release_tx
+        self.bytes = 0
+        self.samples = 0
+        self.matches = 0
+        self.responses = 0
+        self.refused_responses = 0
+        self._filter = EscapeFilter()
+        self._targets: list[tuple[TriggerRule, str]] = []
+        self._regex_rules = [rule for rule in rules if rule.regex]
+        literals = []
+        for rule in rules:
+            if rule.regex:
+                continue
+            for kind, text in rule.patterns():
+                literals.append(text.encode('utf-8'))
+                self._targets.append((rule, kind))
+        self.matcher = MultiPatternMatcher(literals)
+        self._line = bytearray()
+        # Slices whose end has not been received yet
+        self._slices: dict[TriggerRule, bytearray] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def feed(self, data: bytes) -> None:
+        """Hub callback: evaluate a received chunk."""
+        text = self._filter.feed(data)
+        if not text:
+            return
+        self.bytes += len(text)
+        for rule in list(self._slices):
+            self._extend_slice(rule, text)
+        chunk_start = self.matcher.position
+        for index, end in self.matcher.feed(text):
+            rule, kind = self._targets[index]
+            self.matches += 1
+            self._fire(rule, kind, text[end - chunk_start:])
+        if self._regex_rules:
+            self._feed_lines(text)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "port": self.port,
+            "rules": len(self.rules),
+            "bytes": self.bytes,
+            "matches": self.matches,
+            "responses": self.responses,
+            "refused_responses": self.refused_responses,
+            "samples": self.samples,
+        }
+
+    def _fire(self, rule: TriggerRule, kind: str, after: bytes) -> None:
+        """Apply a literal match; after is the rest of the chunk."""
+        if rule.type == "slice":
+            self._slices[rule] = bytearray()
+            self._extend_slice(rule, after)
+            return
+        if rule.type == "respond":
+            self._respond(rule, rule.response.encode('utf-8'))
+        elif rule.type == "traffic":
+            rule.state = "red" if kind == "alert" else "green"
+            rule.changed_at = time.time()
+        rule.count += 1
+        self.on_change(rule)
+
+    def _extend_slice(self, rule: TriggerRule, data: bytes) -> None:
+        captured = self._slices[rule]
+        end = rule.end.encode('utf-8') or b'\n'
+        searched = max(0, len(captured) - len(end) + 1)
+        captured += data
+        index = captured.find(end, searched)
+        if index < 0:
+            if len(captured) > MAX_SLICE:
+                del self._slices[rule]
+            return
+        del self._slices[rule]
+        self._set_value(rule, bytes(captured[:index]))
+
+    def _set_value(self, rule: TriggerRule, value: bytes) -> None:
+        rule.value = value.decode('utf-8', errors='replace').strip()
+        rule.count += 1
+        self.on_change(rule)
+        if rule.series and self.series is not None:
+            self._record(rule)
+
+    def _record(self, rule: TriggerRule) -> None:
+        number = _NUMBER.search(rule.value)
+        if not number:
+            return
+        self.samples += 1
+        self.series.append(self.port, rule.series, float(number.group(0)))
+
+    def _feed_lines(self, text: bytes) -> None:
+        start = 0
+        newline = text.find(b'\n')
+        while newline >= 0:
+            self._line += text[start:newline]
+            self._match_line(bytes(self._line))
+            self._line.clear()
+            start = newline + 1
+            newline = text.find(b'\n', start)
+        self._line += text[start:]
+        if len(self._line) > MAX_LINE:
+            del self._line[:-MAX_LINE]
+
+    def _match_line(self, line: bytes) -> None:
+        line = line.rstrip(b'\r')
+        for rule in self._regex_rules:
+            for kind, regex in rule.regexes:
+                self._apply_regex(rule, kind, regex, line)
+
+    def _apply_regex(self, rule: TriggerRule, kind: str, regex: re.Pattern, line: bytes) -> None:
+        if rule.type == "count":
+            hits = sum(1 for _ in regex.finditer(line))
+            if hits:
+                self.matches += hits
+                rule.count += hits
+                self.on_change(rule)
+            return
+        match = regex.search(line)
+        if not match:
+            return
+        self.matches += 1
+        if rule.type == "slice":
+            self._set_value(rule, match.group(1) if regex.groups else match.group(0))
+        elif rule.type == "respond":
+            self._respond(rule, match.expand(rule.response.encode('utf-8')))
+            rule.count += 1
+            self.on_change(rule)
+        else:
+            self._fire(rule, kind, b'')
+
+    def _respond(self, rule: TriggerRule, response: bytes) -> None:
+        if not rule.may_respond() or not self.backend.is_connected():
+            return
+        writer = f"trigger:{rule.id}"
+        if self.claim_tx and not self.claim_tx(self.port, writer):
+            self.refused_responses += 1
+            logger.debug("Trigger %s did not answer on %s: port is in use by another writer", rule.id, self.port)
+            return
+        self.responses += 1
+        task = asyncio.get_running_loop().create_task(self._send(writer, response + b'\n'))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, writer: str, data: bytes) -> None:
+        try:
+            await self.backend.send(data)
+        except Exception as e:
+            logger.error("Trigger response to %s failed: %s", self.port, e)
+        finally:
+            # A response is a one-off write; don't keep people typing out
+            if self.release_tx:
+                self.release_tx(self.port, writer)
+
+
+class TriggerRegistry:
+    """The configured rules and the engines applying them to connected ports.
+
+    Args:
+        series: Store for extracted numeric values (a new one by default)
+        claim_tx: TX arbitration of shared ports (ConnectionManager.claim_tx)
+        release_tx: Gives a claimed lease back (ConnectionManager.release_tx)
+    """
+
+    def __init__(self, series: Optional[SeriesStore] = None,
+                 claim_tx: Optional[Callable[[str, str], bool]] = None,
+                 release_tx: Optional[Callable[[str, str], None]] = None):
+        self.series = series if series is not None else SeriesStore()
+        self.claim_tx = claim_tx
+        self.release_tx = release_tx
+        self.rules: dict[str, TriggerRule] = {}
+        self._engines: dict[str, TriggerEngine] = {}
+        self._backends: dict[str, BaseBackend] = {}
+        self._listeners: list[Callable[[list[dict]], None]] = []
+        self._dirty: dict[str, TriggerRule] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def set_rules(self, specs: list[dict]) -> None:
+        """Replace all rules; rules keeping their id keep their state.
+
+        Raises:
+            ValueError: If a rule is invalid (nothing is changed then)
+        """
+        rules = {}
+        for spec in specs:
+            rule = TriggerRule.from_dict(spec)
+            if rule.id in self.rules and self.rules[rule.id].type == rule.type:
+                rule.adopt_state(self.rules[rule.id])
+            rules[rule.id] = rule
+        self.rules = rules
+        for port, backend in list(self._backends.items()):
+            self.attach(port, backend)
+
+    def reset(self, rule_id: Optional[str] = None) -> None:
+        """Reset one rule (or all) and tell listeners."""
+        for rule in self.rules.values():
+            if rule_id in (None, rule.id):
+                rule.reset()
+                self._changed(rule)
+
+    def attach(self, port: str, backend: BaseBackend) -> None:
+        """Start evaluating rules on a connected port."""
+        self.detach(port)
+        self._backends[port] = backend
+        rules = [rule for rule in self.rules.values() if rule.watches(port)]
+        if not rules:
+            return
+        engine = TriggerEngine(port, backend, rules, self._changed, self.series,
+                               claim_tx=self.claim_tx, release_tx=self.release_tx)
+        self._engines[port] = engine
+        backend.hub.add_callback(engine.feed)
+
+    def detach(self, port: str) -> None:
+        """Stop evaluating rules on a port."""
+        backend = self._backends.pop(port, None)
+        engine = self._engines.pop(port, None)
+        if engine:
+            backend.hub.remove_callback(engine.feed)
+            engine.close()
+
+    def detach_backend(self, backend: BaseBackend) -> None:
+        """Stop evaluating rules on every port served by backend."""
+        for port, attached in list(self._backends.items()):
+            if attached is backend:
+                self.detach(port)
+
+    def add_listener(self, listener: Callable[[list[dict]], None]) -> None:
+        """Call listener with batches of rule updates."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[list[dict]], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def snapshot(self) -> list[dict]:
+        return [rule.to_dict() for rule in self.rules.values()]
+
+    def stats(self) -> list[dict]:
+        return [engine.stats() for engine in self._engines.values()]
+
+    def _changed(self, rule: TriggerRule) -> None:
+        self._dirty[rule.id] = rule
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(EVENT_INTERVAL, self._flush)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        updates = [rule.update() for rule in self._dirty.values()]
+        self._dirty.clear()
+        for listener in list(self._listeners):
+            try:
+                listener(updates)
+            except Exception as e:
+                logger.error("Error in trigger listener: %s", e)
@@ -21,6 +21,7 @@ def open_browser():
 def start():
     """Start the application with browser auto-open."""
     import uvicorn
+    from app.config import get_settings
     from app.main import app
     
     # Start browser in separate thread
@@ -29,7 +30,7 @@ def start():
     # Start server
     print("Starting Zephyr Device Manager...")
     print("Server will be available at http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=not get_settings().ws_compression_enabled)
 
 
 if __name__ == "__main__":
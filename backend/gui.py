@@ -6,8 +6,10 @@ import uvicorn
 import socket
 import os
 import signal
+import multiprocessing
 import warnings
 from pathlib import Path
+from app.config import get_settings
 from app.main import app
 
 # Suppress pywebview recursion warnings on Windows
@@ -87,7 +89,8 @@ def start_server(port):
             port=port, 
             log_level="info", 
             access_log=True,
-            use_colors=True  # Enable colored output for better visibility
+            use_colors=True,  # Enable colored output for better visibility
+            ws_per_message_deflate=not get_settings().ws_compression_enabled
         )
     except Exception as e:
         print(f"ERROR: Server failed to start: {e}")
@@ -379,5 +382,7 @@ def main():
         cleanup_pid_file()
 
 if __name__ == '__main__':
+    # Backend worker processes (ZFIELD_BACKEND_WORKERS) in frozen builds
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,62 @@
+"""Micro-benchmark: printable log filter throughput in MB/s.
+
+Compares the streaming PrintableFilter with the per-chunk implementation
+previously inlined in the backends' _write_to_log.
+
+Usage: python tests/bench_log_filter.py
+"""
+import os
+import re
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.log_filter import PrintableFilter
+
+TOTAL_BYTES = 8 * 1024 * 1024
+CHUNK_SIZES = [64, 1024, 16384]
+
+
+def legacy_filter(data: bytes) -> bytes:
+    """Previous implementation, kept verbatim for comparison."""
+    text = data.decode('latin-1')
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    text = ansi_escape.sub('', text)
+    return bytes([b for b in text.encode('latin-1') if 32 <= b <= 126 or b in (9, 10, 13)])
+
+
+def make_stream() -> bytes:
+    """Zephyr-style colored log output."""
+    lines = [
+        b'[00:00:01.234,567] \x1b[0m<inf> main: heap free 12345 bytes\x1b[0m\r\n',
+        b'[00:00:01.234,890] \x1b[1;33m<wrn> net: retrying connection\x1b[0m\r\n',
+        b'[00:00:01.235,001] \x1b[1;31m<err> i2c: NACK on 0x48\x1b[0m\r\n',
+        b'uart:~$ \x1b[m\x1b[8D\x1b[J',
+    ]
+    block = b''.join(lines)
+    return block * (TOTAL_BYTES // len(block))
+
+
+def run(name: str, fn, stream: bytes, chunk_size: int) -> float:
+    chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+    start = time.perf_counter()
+    for chunk in chunks:
+        fn(chunk)
+    elapsed = time.perf_counter() - start
+    rate = len(stream) / elapsed / 1e6
+    print(f"{name:<10} chunk={chunk_size:>6}  {rate:8.1f} MB/s")
+    return rate
+
+
+def main():
+    stream = make_stream()
+    for chunk_size in CHUNK_SIZES:
+        old = run("legacy", legacy_filter, stream, chunk_size)
+        new = run("streaming", PrintableFilter().feed, stream, chunk_size)
+        print(f"{'':<10} speedup x{new / old:.1f}")
+
+
+if __name__ == "__main__":
+    main()
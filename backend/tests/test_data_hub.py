@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.data_hub import DataHub
+from app.backends.ring_buffer import RingBuffer
+
+
+def test_subscribers_share_buffer_with_own_cursors():
+    hub = DataHub(RingBuffer(64))
+    hub.publish(b'history ')
+    replay = hub.subscribe('replay', start=hub.buffer.start)
+    live = hub.subscribe('live')
+    hub.publish(b'live')
+
+    assert replay.read() == b'history live'
+    assert live.read(2) == b'li'
+    assert live.read() == b've'
+    assert live.pending() == 0
+
+
+def test_callbacks_receive_every_chunk():
+    hub = DataHub(RingBuffer(64))
+    seen = []
+    hub.add_callback(seen.append)
+    hub.publish(b'a')
+    hub.publish(b'b')
+    hub.remove_callback(seen.append)
+    hub.publish(b'c')
+    assert seen == [b'a', b'b']
+
+
+def test_skip_policy_drops_oldest_unread_bytes():
+    hub = DataHub(RingBuffer(8))
+    sub = hub.subscribe('slow', policy='skip')
+    hub.publish(b'0123456789')
+    assert sub.dropped_bytes == 2
+    assert sub.read() == b'23456789'
+
+
+def test_disconnect_policy_closes_lagging_reader():
+    hub = DataHub(RingBuffer(64))
+    sub = hub.subscribe('slow', policy='disconnect', max_lag=4)
+    hub.publish(b'abcdef')
+    assert sub.closed
+    assert sub.close_reason
+    assert hub.subscriber_count == 0
+
+
+def test_wait_wakes_on_publish():
+    async def scenario():
+        hub = DataHub(RingBuffer(64))
+        sub = hub.subscribe('ws')
+        waiter = asyncio.create_task(sub.wait())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        hub.publish(b'x')
+        await asyncio.wait_for(waiter, 1)
+        return sub.read()
+
+    assert asyncio.run(scenario()) == b'x'
+
+
+def test_spill_policy_delivers_overflow_late():
+    hub = DataHub(RingBuffer(8))
+    sub = hub.subscribe('slow', policy='spill')
+    hub.publish(b'abcdef')
+    hub.publish(b'ghijkl')
+    hub.publish(b'mnopqrstuvwxyz')
+
+    assert sub.pending() == 26
+    assert sub.read(4) == b'abcd'
+    assert sub.read() == b'efghijklmnopqrstuvwxyz'
+    stats = sub.stats()
+    assert stats['dropped_bytes'] == 0
+    assert stats['spilled_bytes'] == stats['late_bytes'] == 18
+    sub.close()
+
+
+def test_spill_does_not_wait_for_the_disk():
+    hub = DataHub(RingBuffer(8))
+    sub = hub.subscribe('slow', policy='spill')
+    # A write stuck on a slow disk holds the file lock
+    with sub._spill_file_lock:
+        hub.publish(b'abcdef')
+        hub.publish(b'ghijkl')
+        hub.publish(b'mnopqrstuvwxyz')
+        assert sub.stats()['spill_unwritten_bytes'] == 18
+        # Not yet written chunks are delivered from memory, in order
+        assert sub.read(10) == b'abcdefghij'
+    assert sub.read() == b'klmnopqrstuvwxyz'
+    sub.close()
+
+
+def test_spilled_data_is_read_back_from_disk():
+    hub = DataHub(RingBuffer(8))
+    sub = hub.subscribe('slow', policy='spill')
+    for i in range(100):
+        hub.publish(b'%08d' % i)
+    deadline = time.monotonic() + 5
+    while sub.stats()['spill_unwritten_bytes'] and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    assert sub.stats()['spill_unwritten_bytes'] == 0
+    assert sub.read() == b''.join(b'%08d' % i for i in range(100))
+    # The drained file is truncated for reuse
+    while sub._spill_base != sub._spill_write and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert sub._spill_base == 792
+    hub.publish(b'0123456789')
+    assert sub.read() == b'0123456789'
+    sub.close()
+
+
+def test_backpressure_pauses_until_reader_drains():
+    hub = DataHub(RingBuffer(16))
+    sub = hub.subscribe('slow', policy='backpressure')
+    hub.publish(b'x' * 8)
+    assert not hub.paused
+    hub.publish(b'x' * 4)
+    assert hub.paused
+
+    sub.read(4)
+    assert hub.paused
+    sub.read()
+    assert not hub.paused
+
+    hub.publish(b'y' * 12)
+    sub.close()
+    assert not hub.paused
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.io_runtime import IORuntime
+
+
+def test_slow_channel_does_not_delay_others():
+    async def scenario():
+        runtime = IORuntime(max_threads=4)
+        slow = runtime.open_channel('slow')
+        fast = runtime.open_channel('fast')
+        slow_call = asyncio.create_task(slow.run(time.sleep, 0.3))
+        started = time.monotonic()
+        thread_name = await fast.run(lambda: threading.current_thread().name)
+        elapsed = time.monotonic() - started
+        await slow_call
+        slow.close()
+        fast.close()
+        return elapsed, thread_name
+
+    elapsed, thread_name = asyncio.run(scenario())
+    assert elapsed < 0.1
+    assert thread_name.startswith('io:fast')
+
+
+def test_thread_limit_and_release():
+    runtime = IORuntime(max_threads=2)
+    first = runtime.open_channel('a')
+    runtime.open_channel('b')
+    with pytest.raises(RuntimeError):
+        runtime.open_channel('c')
+
+    first.close()
+    runtime.open_channel('c')
+    assert runtime.stats()['threads'] == 2
+
+
+def test_utilization_counts_busy_time():
+    async def scenario():
+        runtime = IORuntime()
+        channel = runtime.open_channel('port')
+        await channel.run(time.sleep, 0.1)
+        await asyncio.sleep(0.1)
+        stats = runtime.stats()['channels'][0]
+        channel.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats['calls'] == 1
+    assert 0.3 < stats['utilization'] < 0.8
@@ -0,0 +1,30 @@
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.log_filter import PrintableFilter
+
+
+def test_strips_sequences_and_control_bytes():
+    f = PrintableFilter()
+    data = b'\x1b[1;32muart:~$ \x1b[m\x07ls\r\n\x1b]0;title\x07\x1b(Bdone\t\x00\xff'
+    assert f.feed(data) == b'uart:~$ ls\r\ndone\t'
+
+
+def test_sequence_split_across_chunks():
+    f = PrintableFilter()
+    out = f.feed(b'red \x1b[3')
+    out += f.feed(b'1mtext\x1b')
+    out += f.feed(b'[0m end')
+    assert out == b'red text end'
+
+
+def test_every_split_point_matches_whole_stream():
+    data = b'a\x1b[38;5;208mb\x1b]2;t\x1b\\c\x1bMd\x1b(0e\r\n'
+    expected = PrintableFilter().feed(data)
+    assert expected == b'abcde\r\n'
+    for i in range(len(data) + 1):
+        f = PrintableFilter()
+        assert f.feed(data[:i]) + f.feed(data[i:]) == expected
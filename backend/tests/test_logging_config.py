@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import logging_config
+from app.config import Settings
+
+
+def test_records_are_written_as_json_by_the_listener(tmp_path):
+    settings = Settings(log_file=str(tmp_path / "logs" / "zfield.log"), log_format="json",
+                        log_rate_limit_burst=3, log_rate_limit_interval=60)
+    logging_config.setup_logging(settings)
+    logger = logging.getLogger("app.backends.test")
+    try:
+        for chunk in range(10):
+            logger.warning("Error in data subscriber callback: chunk %d", chunk)
+        logger.info("Connected to %s", "/dev/ttyACM0", extra={"port": "/dev/ttyACM0"})
+        logger.debug("Not at INFO level")
+        stats = logging_config.logging_stats()
+    finally:
+        logging_config.shutdown_logging()
+
+    entries = [json.loads(line) for line in (tmp_path / "logs" / "zfield.log").read_text().splitlines()]
+    assert [entry["message"] for entry in entries] == [
+        "Error in data subscriber callback: chunk 0",
+        "Error in data subscriber callback: chunk 1",
+        "Error in data subscriber callback: chunk 2",
+        "Connected to /dev/ttyACM0",
+    ]
+    assert entries[3]["port"] == "/dev/ttyACM0" and entries[3]["level"] == "INFO"
+    assert stats["suppressed"] == 7
+    assert not logging.getLogger("app").handlers
+
+
+def test_rate_limit_reports_suppressed_records(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    limit = logging_config.RateLimitFilter(burst=1, interval=10)
+
+    def record():
+        return logging.LogRecord("app", logging.WARNING, "hub.py", 42, "Queue full", None, None)
+
+    assert [limit.filter(record()) for _ in range(4)] == [True, False, False, False]
+    now[0] = 11
+    late = record()
+    assert limit.filter(late)
+    assert late.getMessage() == "Queue full (3 similar messages suppressed)"
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logging_config.DroppingQueueHandler(logging_config.queue.Queue(2))
+    logger = logging.Logger("burst")
+    logger.addHandler(handler)
+    for i in range(5):
+        logger.error("record %d", i)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import websocket
+from app.backends.serial_backend import SerialBackend
+from app.backends.telnet_backend import TelnetBackend
+from app.services import metrics
+from app.services.connection_manager import ConnectionManager
+from app.services.triggers import TriggerRegistry
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+
+def scrape(backends, clients=()):
+    manager = SimpleNamespace(backends=backends, triggers=TriggerRegistry())
+    return metrics.render(manager, list(clients), metrics.LoopLagMonitor())
+
+
+def test_disabled_metrics_observe_nothing():
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+
+    async def scenario():
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        backend = SerialBackend(read_mode="event", history_size=1024)
+        subscription = backend.subscribe('test')
+        try:
+            assert await backend.connect(os.ttyname(slave))
+            os.write(master, b'boot\n')
+            await asyncio.wait_for(subscription.wait(5), 5)
+            return scrape({"/dev/ttyBOARD": backend})
+        finally:
+            await backend.disconnect()
+            os.close(master)
+            os.close(slave)
+
+    text = asyncio.run(scenario())
+    assert 'zfield_rx_bytes_total{port="/dev/ttyBOARD"} 5' in text
+    assert 'zfield_rx_chunks_total{port="/dev/ttyBOARD"} 1' in text
+    assert "zfield_read_call_seconds_count" not in text
+
+
+def test_enabled_metrics_export_histograms(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+
+    async def scenario():
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        backend = SerialBackend(read_mode="event", history_size=1024)
+        subscription = backend.subscribe('test')
+        try:
+            assert await backend.connect(os.ttyname(slave))
+            os.write(master, b'x' * 100)
+            await asyncio.wait_for(subscription.wait(100), 5)
+            await backend.send(b'help\n')
+            os.read(master, 5)
+            terminals = {"port": "/dev/ttyBOARD", "clients": 2, "frames": 3, "bytes": 100,
+                         "pending": 7, "dropped_bytes": 0, "spilled_bytes": 0}
+            return scrape({"/dev/ttyBOARD": backend}, [terminals]), os.ttyname(slave)
+        finally:
+            await backend.disconnect()
+            os.close(master)
+            os.close(slave)
+
+    text, name = asyncio.run(scenario())
+    assert 'zfield_tx_bytes_total{port="/dev/ttyBOARD"} 5' in text
+    assert 'zfield_ws_queue_bytes{port="/dev/ttyBOARD"} 7' in text
+    assert 'zfield_ws_clients 2' in text
+    # Histograms are labelled with the device the backend read from
+    assert f'zfield_read_chunk_bytes_bucket{{port="{name}",le="256"}} ' in text
+    assert f'zfield_read_chunk_bytes_bucket{{port="{name}",le="+Inf"}} ' in text
+    assert f'zfield_read_chunk_bytes_sum{{port="{name}"}} 100' in text
+    assert "# TYPE zfield_read_call_seconds histogram" in text
+
+
+def test_tcp_ports_report_tx():
+    async def scenario():
+        async def handle(reader, writer):
+            await reader.read(100)
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        backend = TelnetBackend(mode="raw")
+        assert await backend.connect('127.0.0.1', server.sockets[0].getsockname()[1])
+        try:
+            await backend.send(b'help\n')
+            return scrape({"10.0.0.5:23": backend})
+        finally:
+            await backend.disconnect()
+            server.close()
+            await server.wait_closed()
+
+    text = asyncio.run(scenario())
+    assert 'zfield_tx_bytes_total{port="10.0.0.5:23"} 5' in text
+    assert 'zfield_tx_writes_total{port="10.0.0.5:23"} 1' in text
+
+
+def test_disconnected_ports_drop_terminal_totals(monkeypatch):
+    departed = dict.fromkeys(websocket.TOTAL_KEYS, 0)
+    monkeypatch.setattr(websocket, "_departed_totals", {})
+
+    async def scenario():
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        port = os.ttyname(slave)
+        manager = ConnectionManager()
+        manager.add_disconnect_listener(websocket.forget_terminal_port)
+        try:
+            assert await manager.connect(port)
+            websocket._departed_totals[port] = {**departed, "frames": 3}
+            before = [totals["port"] for totals in websocket.get_terminal_port_stats()]
+            await manager.disconnect(port)
+            return port, before, websocket.get_terminal_port_stats()
+        finally:
+            await manager.shutdown()
+            os.close(master)
+            os.close(slave)
+
+    port, before, after = asyncio.run(scenario())
+    assert before == [port]
+    assert after == []
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import port_websocket
+from app.config import get_settings
+from app.services.port_inventory import PortInventory, diff_ports
+
+
+class FakeClient:
+    def __init__(self, stall=False):
+        self.stall = stall
+        self.messages = []
+        self.closed = False
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.sleep(3600)
+        self.messages.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+def test_diff_ports_reports_added_removed_and_changed():
+    old = [{"device": "/dev/ttyACM0", "serial_number": "A"}, {"device": "/dev/ttyACM1"}]
+    new = [{"device": "/dev/ttyACM0", "serial_number": "B"}, {"device": "/dev/ttyUSB0"}]
+    assert diff_ports(old, new) == {
+        "added": [{"device": "/dev/ttyUSB0"}],
+        "removed": ["/dev/ttyACM1"],
+        "changed": [{"device": "/dev/ttyACM0", "serial_number": "B"}],
+    }
+
+
+def test_broadcast_is_concurrent_and_sends_deltas(monkeypatch):
+    ports = [[{"device": "/dev/ttyACM0"}]]
+    inventory = PortInventory(lambda: ports[0])
+    monkeypatch.setattr(port_websocket, "get_port_inventory", lambda: inventory)
+    monkeypatch.setattr(port_websocket, "_connected_clients", {})
+    monkeypatch.setattr(port_websocket, "_client_generations", {})
+    monkeypatch.setattr(port_websocket, "_last_broadcast", {"generation": 0, "ports": []})
+    monkeypatch.setattr(get_settings(), "ws_ports_send_timeout", 0.2)
+
+    async def scenario():
+        monkeypatch.setattr(port_websocket, "_broadcast_lock", asyncio.Lock())
+        await inventory.refresh()
+        await port_websocket.broadcast_port_changes(inventory.ports)
+
+        current, fresh, stalled = FakeClient(), FakeClient(), FakeClient(stall=True)
+        for client in (current, fresh, stalled):
+            port_websocket._connected_clients[client] = None
+        port_websocket._client_generations[current] = inventory.generation
+        port_websocket._client_generations[stalled] = inventory.generation
+
+        ports[0] = [{"device": "/dev/ttyACM0", "hwid": "other board"}, {"device": "/dev/ttyUSB0"}]
+        await inventory.refresh()
+        started = time.monotonic()
+        await port_websocket.broadcast_port_changes(inventory.ports)
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0)
+        return current, fresh, stalled, elapsed
+
+    current, fresh, stalled, elapsed = asyncio.run(scenario())
+    # The stalled client costs one timeout, not one per client
+    assert elapsed < 1
+    assert current.messages == [{
+        "type": "ports_delta", "generation": 2, "base_generation": 1,
+        "added": [{"device": "/dev/ttyUSB0"}], "removed": [],
+        "changed": [{"device": "/dev/ttyACM0", "hwid": "other board"}],
+    }]
+    assert fresh.messages == [{"type": "ports_changed", "generation": 2, "ports": ports[0]}]
+    assert stalled.closed
+    assert list(port_websocket._connected_clients) == [current, fresh]
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.port_inventory import PortInventory
+
+
+def test_refresh_is_shared_and_off_loop():
+    calls = []
+
+    def slow_enumerate():
+        calls.append(threading.current_thread())
+        time.sleep(0.05)
+        return [{"device": "/dev/ttyACM0"}]
+
+    async def scenario():
+        inventory = PortInventory(slow_enumerate)
+        changes = []
+        inventory.add_listener(changes.append)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        tick_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(inventory.refresh(), inventory.refresh(), inventory.snapshot())
+        tick_task.cancel()
+        # Served from cache from now on
+        snapshot = await inventory.snapshot()
+        unchanged = await inventory.refresh()
+        return inventory, results, snapshot, unchanged, changes, ticks
+
+    inventory, results, snapshot, unchanged, changes, ticks = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert threading.main_thread() not in calls
+    # The loop kept running during the enumeration
+    assert ticks > 3
+    assert results[:2] == [True, True]
+    assert snapshot == {"generation": 1, "ports": [{"device": "/dev/ttyACM0"}]}
+    assert not unchanged
+    assert changes == [[{"device": "/dev/ttyACM0"}]]
+    assert inventory.stats()["refreshes"] == 2
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.hotplug import InotifyWatcher, UdevWatcher
+from app.services.port_inventory import PortInventory
+from app.services.port_monitor import PortMonitor
+
+if not InotifyWatcher.available():
+    pytest.skip("inotify is Linux only", allow_module_level=True)
+
+
+def directory_inventory(directory, hwid):
+    """Reports the files of a directory as ports, with editable metadata."""
+    return PortInventory(lambda: [{"device": name, "hwid": hwid.get(name, "")}
+                                  for name in sorted(os.listdir(directory))])
+
+
+async def wait_for(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_hotplug_burst_triggers_one_debounced_scan():
+    async def scenario(directory):
+        updates = []
+        hwid = {}
+        monitor = PortMonitor(updates.append, mode="inotify", debounce=0.05, watch_paths=(directory,),
+                              inventory=directory_inventory(directory, hwid))
+        monitor.start()
+        await wait_for(lambda: updates)
+        scans = monitor.scans
+
+        # A device node and its links appearing together
+        for name in ("ttyACM0", "usb-board-if00", "ttyACM0.lock"):
+            open(os.path.join(directory, name), "w").close()
+        await wait_for(lambda: len(updates) > 1)
+        await asyncio.sleep(0.1)
+        burst_scans = monitor.scans - scans
+
+        # Same device name, different board: metadata differs
+        hwid["ttyACM0"] = "USB VID:PID=2FE3:0001 SER=OTHER"
+        os.utime(os.path.join(directory, "ttyACM0"))
+        await wait_for(lambda: len(updates) > 2)
+
+        mode = monitor.active_mode
+        task = monitor.monitor_task
+        monitor.stop()
+        await asyncio.gather(task, return_exceptions=True)
+        return updates, burst_scans, mode, monitor._watcher
+
+    with tempfile.TemporaryDirectory() as directory:
+        updates, burst_scans, mode, watcher = asyncio.run(scenario(directory))
+    assert mode == "inotify"
+    assert updates[0] == []
+    assert burst_scans == 1
+    assert [p["device"] for p in updates[1]] == ["ttyACM0", "ttyACM0.lock", "usb-board-if00"]
+    assert updates[2][0]["hwid"] == "USB VID:PID=2FE3:0001 SER=OTHER"
+    assert watcher is None
+
+
+@pytest.mark.skipif(UdevWatcher.available(), reason="pyudev is installed")
+def test_unavailable_watcher_falls_back_to_polling():
+    async def scenario():
+        updates = []
+        inventory = PortInventory(lambda: [{"device": "/dev/ttyS0"}])
+        monitor = PortMonitor(updates.append, mode="udev", poll_interval=0.05, inventory=inventory)
+        monitor.start()
+        await wait_for(lambda: monitor.scans >= 2)
+        task = monitor.monitor_task
+        monitor.stop()
+        await asyncio.gather(task, return_exceptions=True)
+        return updates, monitor.active_mode
+
+    updates, mode = asyncio.run(scenario())
+    assert mode == "polling"
+    assert updates == [[{"device": "/dev/ttyS0"}]]
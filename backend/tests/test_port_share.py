@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+
+import pytest
+import serial
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.serial_backend import SerialBackend
+from app.services.port_share import PortShare, TxArbiter
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+async def read_until(master, size):
+    data = b''
+    while len(data) < size:
+        data += await asyncio.get_running_loop().run_in_executor(None, os.read, master, 1024)
+    return data
+
+
+def test_lease_refuses_other_writers_until_idle():
+    arbiter = TxArbiter("lease", lease=0.05)
+    assert arbiter.claim("ws")
+    assert not arbiter.claim("tcp")
+    assert arbiter.claim("ws")
+    arbiter.release("ws")
+    assert arbiter.claim("tcp")
+    assert arbiter.stats()["refused"] == 1
+
+    shared = TxArbiter("shared")
+    assert shared.claim("ws") and shared.claim("tcp")
+
+
+def test_rfc2217_client_shares_serial_port():
+    async def scenario():
+        master, slave, name = open_pty()
+        backend = SerialBackend(read_mode="event", history_size=1024)
+        share = None
+        try:
+            assert await backend.connect(name, baudrate=115200)
+            share = PortShare(name, backend, "rfc2217", TxArbiter("shared"))
+            await share.start("127.0.0.1", 0)
+            url = f"rfc2217://127.0.0.1:{share.address[1]}"
+
+            loop = asyncio.get_running_loop()
+            client = await loop.run_in_executor(
+                None, lambda: serial.serial_for_url(url, baudrate=9600, timeout=2))
+            try:
+                await loop.run_in_executor(None, client.write, b'to device')
+                sent = await asyncio.wait_for(read_until(master, 9), 5)
+                os.write(master, b'from device')
+                received = await loop.run_in_executor(None, client.read, 11)
+            finally:
+                await loop.run_in_executor(None, client.close)
+            return sent, received, backend.serial_port.baudrate, backend.get_history()
+        finally:
+            if share:
+                await share.close()
+            await backend.disconnect()
+            os.close(master)
+            os.close(slave)
+
+    sent, received, baudrate, history = asyncio.run(scenario())
+    assert sent == b'to device'
+    assert received == b'from device'
+    # Line settings requested by the client are applied to the local port
+    assert baudrate == 9600
+    # The shared data went through the connection's own history
+    assert history == b'from device'
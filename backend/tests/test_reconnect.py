@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.serial_backend import SerialBackend
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+@pytest.mark.parametrize("read_mode", ["event", "executor"])
+def test_lost_device_is_reopened_in_the_same_session(tmp_path, read_mode):
+    # A stable name for the device, like /dev/serial/by-id/...
+    link = str(tmp_path / "ttyBOARD")
+
+    async def scenario():
+        master, slave, name = open_pty()
+        os.symlink(name, link)
+        backend = SerialBackend(read_mode=read_mode, history_size=1024,
+                                reconnect_attempts=2, reconnect_delay=2.0)
+        states = []
+        backend.add_state_listener(states.append)
+        subscription = backend.subscribe('test')
+        try:
+            assert await backend.connect(link)
+            os.write(master, b'before reset\n')
+            await asyncio.wait_for(subscription.wait(13), 5)
+
+            # The board resets: its device goes away and comes back
+            os.unlink(link)
+            os.close(master)
+            os.close(slave)
+            while not backend.reconnecting:
+                await asyncio.sleep(0.01)
+            master, slave, name = open_pty()
+            os.symlink(name, link)
+            while not backend.is_connected():
+                await asyncio.sleep(0.01)
+
+            os.write(master, b'boot log\n')
+            await asyncio.wait_for(subscription.wait(22), 5)
+            return subscription.read(), backend.get_history(), states, backend.reconnect_stats()
+        finally:
+            await backend.disconnect()
+            os.close(master)
+            os.close(slave)
+
+    received, history, states, stats = asyncio.run(scenario())
+    assert received == b'before reset\nboot log\n'
+    assert history == received
+    assert states == ["reconnecting", "connected"]
+    assert stats["reconnects"] == 1
+    assert stats["last_latency_ms"] < 2000
+
+
+def test_reconnect_gives_up_after_last_attempt(tmp_path):
+    link = str(tmp_path / "ttyGONE")
+
+    async def scenario():
+        master, slave, name = open_pty()
+        os.symlink(name, link)
+        backend = SerialBackend(read_mode="event", reconnect_attempts=2, reconnect_delay=0.05)
+        states = []
+        backend.add_state_listener(states.append)
+        assert await backend.connect(link)
+        os.unlink(link)
+        os.close(master)
+        os.close(slave)
+        await asyncio.wait_for(backend.read_task, 5)
+        await backend.disconnect()
+        return states, backend.reconnect_stats()
+
+    states, stats = asyncio.run(scenario())
+    assert states == ["reconnecting", "disconnected"]
+    assert stats["failed"] == 1 and stats["reconnects"] == 0
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.ring_buffer import RingBuffer
+
+
+def test_append_and_getvalue():
+    ring = RingBuffer(8)
+    ring.append(b'abc')
+    ring.append(b'de')
+    assert ring.getvalue() == b'abcde'
+    assert (ring.start, ring.end, len(ring)) == (0, 5, 5)
+
+
+def test_wraps_and_keeps_newest_bytes():
+    ring = RingBuffer(8)
+    ring.append(b'abcdef')
+    ring.append(b'ghij')
+    assert ring.getvalue() == b'cdefghij'
+    assert (ring.start, ring.end) == (2, 10)
+    # Wrapped content is exposed as two zero-copy views
+    assert [bytes(v) for v in ring.views()] == [b'cdefgh', b'ij']
+
+
+def test_chunk_larger_than_capacity():
+    ring = RingBuffer(4)
+    ring.append(b'xy')
+    ring.append(b'0123456789')
+    assert ring.getvalue() == b'6789'
+    assert ring.end == 12
+
+
+def test_read_absolute_range_is_clamped():
+    ring = RingBuffer(4)
+    ring.append(b'abcdef')
+    assert ring.read(3, 5) == b'de'
+    assert ring.read(0) == b'cdef'
+    assert ring.read(6) == b''
+
+
+def test_rejects_invalid_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.scrollback import ScrollbackStore
+from app.config import get_settings
+from app.services.connection_manager import ConnectionManager
+
+
+def test_read_across_segments(tmp_path):
+    store = ScrollbackStore(str(tmp_path / 'port'), segment_size=16)
+    for i in range(10):
+        store.append(b'line%02d\n' % i)
+    assert store.flush(5)
+
+    assert store.info()['segments'] > 1
+    start, data = store.read(7, 28)
+    assert start == 7
+    assert data == b'line01\nline02\nline03\n'
+    store.close()
+    assert not os.path.exists(tmp_path / 'port')
+
+
+def test_retention_drops_oldest_segments(tmp_path):
+    store = ScrollbackStore(str(tmp_path / 'port'), segment_size=10, max_bytes=30)
+    for i in range(20):
+        store.append(b'0123456789')
+    assert store.flush(5)
+
+    assert store.end == 200
+    assert store.start >= 150
+    start, data = store.read(0)
+    assert start == store.start
+    assert len(data) == store.end - store.start
+    store.close()
+
+
+def test_offset_at_time(tmp_path):
+    store = ScrollbackStore(str(tmp_path / 'port'))
+    store.append(b'before')
+    marker = time.time() + 0.05
+    time.sleep(0.15)
+    store.append(b'after')
+    assert store.flush(5)
+
+    assert store.offset_at(marker) == 6
+    assert store.offset_at(marker + 60) == store.end
+    store.close()
+
+
+def test_only_own_segment_files_are_deleted(tmp_path):
+    directory = tmp_path / 'port'
+    directory.mkdir()
+    (directory / 'notes.txt').write_text('keep')
+    (directory / '0000000000000000.seg').write_bytes(b'stale')
+
+    store = ScrollbackStore(str(directory))
+    assert not (directory / '0000000000000000.seg').exists()
+    store.append(b'data')
+    store.close()
+
+    assert [p.name for p in directory.iterdir()] == ['notes.txt']
+
+
+def test_dropped_chunks_leave_a_gap(tmp_path):
+    store = ScrollbackStore(str(tmp_path / 'port'), queue_size=1)
+    # Hold the writer after it takes the first chunk so the queue fills up
+    with store._written:
+        store.append(b'first')
+        while store._queue.qsize():
+            time.sleep(0.001)
+        store.append(b'second')
+        store.append(b'lost')
+    while store._queue.qsize():
+        time.sleep(0.001)
+    store.append(b'kept')
+    assert store.flush(5)
+
+    assert store.info()['dropped_bytes'] == 4
+    assert store.read() == (0, b'firstsecond')
+    assert store.read(11) == (15, b'kept')
+    store.close()
+
+
+def test_offsets_match_history_from_the_first_byte(tmp_path, monkeypatch):
+    pty = pytest.importorskip("pty")
+    tty = pytest.importorskip("tty")
+    monkeypatch.setattr(get_settings(), "scrollback_dir", str(tmp_path))
+
+    banner = b'*** Booting Zephyr OS ***\r\n'
+
+    async def wait_for_history(backend):
+        while backend.hub.buffer.end < len(banner):
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        manager = ConnectionManager()
+        try:
+            assert await manager.connect(os.ttyname(slave), scrollback=True)
+            os.write(master, banner)
+            backend = manager.get_backend(os.ttyname(slave))
+            await asyncio.wait_for(wait_for_history(backend), 5)
+            store = backend.scrollback
+            assert await asyncio.get_running_loop().run_in_executor(None, store.flush, 5)
+            return store.read(), backend.get_history()
+        finally:
+            await manager.disconnect()
+            os.close(master)
+            os.close(slave)
+
+    (start, data), history = asyncio.run(scenario())
+    assert start == 0
+    assert data == history == banner
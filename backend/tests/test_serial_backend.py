@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api.routes import ConnectionRequest
+from app.backends.serial_backend import SerialBackend
+from app.services.connection_manager import ConnectionManager
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+
+@pytest.mark.parametrize("read_mode", ["event", "executor"])
+def test_reads_device_data_and_disconnects_cleanly(read_mode):
+    async def scenario():
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        backend = SerialBackend(read_mode=read_mode, history_size=1024)
+        subscription = backend.subscribe('test')
+        try:
+            assert await backend.connect(os.ttyname(slave))
+            event_reads = backend._event_reads
+            fd = backend.serial_port.fileno()
+            os.write(master, b'uart:~$ ')
+            await asyncio.wait_for(subscription.wait(8), 5)
+            os.write(master, b'help\n')
+            # Nothing has been read yet: wait for both writes
+            await asyncio.wait_for(subscription.wait(13), 5)
+            received = subscription.read()
+        finally:
+            await backend.disconnect()
+            os.close(master)
+            os.close(slave)
+        # No reader callback may outlive the connection
+        reader_left = asyncio.get_running_loop().remove_reader(fd)
+        return received, event_reads, reader_left, backend.read_task, backend.is_connected()
+
+    received, event_reads, reader_left, read_task, connected = asyncio.run(scenario())
+    assert received == b'uart:~$ help\n'
+    assert event_reads == (read_mode == "event")
+    assert not reader_left
+    assert read_task is None and not connected
+
+
+def test_invalid_history_size_is_rejected():
+    with pytest.raises(ValidationError):
+        ConnectionRequest(port='/dev/ttyUSB0', history_size=0)
+
+    async def scenario():
+        manager = ConnectionManager()
+        return await manager.connect('/dev/ttyUSB0', history_size=-1), manager.backends
+
+    assert asyncio.run(scenario()) == (False, {})
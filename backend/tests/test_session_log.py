@@ -0,0 +1,95 @@
+import asyncio
+import gzip
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.session_log import SessionLog
+from test_triggers import FakeBackend
+
+
+def test_batches_are_written_on_close(tmp_path):
+    path = tmp_path / 'logs' / 'session.log'
+    log = SessionLog(str(path), log_mode='raw', flush_interval=10)
+    for i in range(100):
+        log.write(b'%d\n' % i)
+    log.close()
+
+    assert path.read_bytes() == b''.join(b'%d\n' % i for i in range(100))
+    assert log.stats()['bytes_written'] == path.stat().st_size
+
+
+def test_printable_mode_filters_escape_sequences(tmp_path):
+    path = tmp_path / 'session.log'
+    log = SessionLog(str(path), log_mode='printable', fsync='always')
+    log.write(b'\x1b[1;32mok\x1b[0m\x07\r\n')
+    log.close()
+
+    assert path.read_bytes() == b'ok\r\n'
+
+
+def test_full_queue_counts_overflow(tmp_path):
+    log = SessionLog(str(tmp_path / 'session.log'), log_mode='raw', queue_size=1)
+    for _ in range(1000):
+        log.write(b'x' * 1024)
+    log.close()
+
+    stats = log.stats()
+    assert stats['overflow'] + stats['bytes_written'] // 1024 == 1000
+
+
+def test_rotation_compresses_old_segments(tmp_path):
+    path = tmp_path / 'session.log'
+    log = SessionLog(str(path), log_mode='raw', max_bytes=100, backup_count=2)
+    for i in range(5):
+        log.write(b'%d' % i * 100)
+        time.sleep(0.05)
+    log.close()
+
+    # Compression runs on its own thread; give it a moment
+    deadline = time.time() + 5
+    while len(list(tmp_path.glob('*.gz'))) != 2 and time.time() < deadline:
+        time.sleep(0.05)
+
+    rotated = sorted(tmp_path.glob('session.*.log.gz'))
+    assert log.rotations == 4
+    assert len(rotated) == 2
+    assert {gzip.decompress(p.read_bytes()) for p in rotated} == {b'2' * 100, b'3' * 100}
+    assert path.read_bytes() == b'4' * 100
+
+
+def test_rotation_uses_path_factory(tmp_path):
+    names = iter(['b.log', 'c.log'])
+    log = SessionLog(str(tmp_path / 'a.log'), log_mode='raw', max_bytes=10, compression='none',
+                     path_factory=lambda: str(tmp_path / next(names)))
+    log.write(b'x' * 10)
+    time.sleep(0.05)
+    log.write(b'y')
+    log.close()
+
+    assert (tmp_path / 'a.log').read_bytes() == b'x' * 10
+    assert (tmp_path / 'b.log').read_bytes() == b'y'
+
+
+def test_switching_log_file_closes_previous_off_the_loop(tmp_path):
+    async def scenario():
+        backend = FakeBackend()
+        backend.set_log_file(str(tmp_path / 'a.log'), log_mode='raw')
+        previous = backend.session_log
+        backend._write_to_log(b'first')
+        backend.set_log_file(str(tmp_path / 'b.log'), log_mode='raw')
+        # The old writer is closed on an executor thread, not inline
+        for _ in range(500):
+            if not previous._thread.is_alive():
+                break
+            await asyncio.sleep(0.01)
+        backend._write_to_log(b'second')
+        await backend._close_log()
+        return previous._thread.is_alive()
+
+    assert not asyncio.run(scenario())
+    assert (tmp_path / 'a.log').read_bytes() == b'first'
+    assert (tmp_path / 'b.log').read_bytes() == b'second'
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.sharding import BackendWorkerPool, ShardedBackend
+from app.config import get_settings
+from app.services.connection_manager import ConnectionManager
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+async def read_until(master, size):
+    data = b''
+    while len(data) < size:
+        data += await asyncio.get_running_loop().run_in_executor(None, os.read, master, 1024)
+    return data
+
+
+def test_port_hosted_in_worker_process():
+    async def scenario():
+        pool = BackendWorkerPool(workers=1)
+        master, slave, name = open_pty()
+        backend = ShardedBackend(pool, history_size=1024)
+        try:
+            assert await backend.connect(name)
+            assert backend.worker.process.pid != os.getpid()
+            subscription = backend.subscribe('test')
+
+            os.write(master, b'from device\r\n')
+            await asyncio.wait_for(subscription.wait(13), 5)
+            received = subscription.read()
+
+            await backend.send(b'to device')
+            sent = await asyncio.wait_for(read_until(master, 9), 5)
+            return received, sent, backend.get_history()
+        finally:
+            await backend.disconnect()
+            await pool.close()
+            os.close(master)
+            os.close(slave)
+
+    received, sent, history = asyncio.run(scenario())
+    assert received == b'from device\r\n'
+    assert sent == b'to device'
+    assert history == b'from device\r\n'
+
+
+def test_shutdown_stops_worker_processes(monkeypatch):
+    monkeypatch.setattr(get_settings(), "backend_workers", 1)
+
+    async def scenario():
+        manager = ConnectionManager()
+        master, slave, name = open_pty()
+        try:
+            assert await manager.connect(name)
+            process = manager.get_backend(name).worker.process
+            await manager.shutdown()
+            return manager.backends, process, manager.worker_pool.stats()
+        finally:
+            os.close(master)
+            os.close(slave)
+
+    backends, process, workers = asyncio.run(scenario())
+    assert backends == {}
+    assert not process.is_alive() and process.exitcode == 0
+    assert workers == []
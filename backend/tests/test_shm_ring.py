@@ -0,0 +1,47 @@
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.shm_ring import SharedRing
+
+
+def test_attached_reader_sees_appends():
+    producer = SharedRing.create(16)
+    consumer = SharedRing.attach(producer.name, 16)
+    try:
+        producer.append(b'hello ')
+        producer.append(b'world')
+        position, data, lost = consumer.read_since(0)
+        assert (position, data, lost) == (11, b'hello world', 0)
+        # Nothing new since the last read
+        assert consumer.read_since(position) == (11, b'', 0)
+    finally:
+        consumer.close()
+        producer.close()
+
+
+def test_overrun_reports_lost_bytes():
+    ring = SharedRing.create(8)
+    try:
+        ring.append(b'0123456789abcdef')
+        position, data, lost = ring.read_since(0)
+        assert data == b'89abcdef'
+        assert lost == 8
+        assert position == 16
+    finally:
+        ring.close()
+
+
+def test_doorbell_rings_once_after_arming():
+    ring = SharedRing.create(8)
+    try:
+        ring.append(b'a')
+        assert not ring.take_doorbell()
+        ring.arm()
+        ring.append(b'b')
+        assert ring.take_doorbell()
+        assert not ring.take_doorbell()
+    finally:
+        ring.close()
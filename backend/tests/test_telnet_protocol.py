@@ -0,0 +1,116 @@
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends import telnet_protocol as tp
+from app.backends.telnet_backend import TelnetBackend
+
+
+def test_codec_strips_commands_and_answers_negotiation():
+    codec = tp.TelnetCodec()
+    plain = b"no commands here\r\n"
+    assert codec.feed(plain) is plain
+
+    stream = (b"login" + bytes([tp.IAC, tp.WILL, tp.ECHO]) + b": " + bytes([tp.IAC, tp.IAC])
+              + bytes([tp.IAC, tp.DO, 31]) + bytes([tp.IAC, tp.SB, 24, 1, tp.IAC, tp.SE]) + b"ok")
+    # Split at every byte boundary: state must carry across chunks
+    out = b''.join(codec.feed(stream[i:i + 1]) for i in range(len(stream)))
+    assert out == b"login: \xffok"
+    assert codec.take_replies() == bytes([tp.IAC, tp.DO, tp.ECHO, tp.IAC, tp.WONT, 31])
+    assert tp.ECHO in codec.remote
+
+    # Repeated requests for an enabled option are not answered again
+    codec.feed(bytes([tp.IAC, tp.WILL, tp.ECHO]))
+    assert codec.take_replies() == b''
+
+
+def test_codec_escapes_transmitted_iac():
+    codec = tp.TelnetCodec()
+    assert codec.encode(b"abc") == b"abc"
+    assert codec.encode(b"a\xffb") == b"a\xff\xffb"
+
+
+def _rfc2217_server(received: list):
+    """Minimal com port server: echoes data and acknowledges settings."""
+    async def handle(reader, writer):
+        codec = tp.TelnetCodec(accept_local=frozenset({tp.BINARY, tp.SGA}),
+                               accept_remote=frozenset({tp.BINARY, tp.SGA, tp.COM_PORT_OPTION}))
+
+        def on_sb(option, payload):
+            received.append((option, payload))
+            writer.write(tp.com_port_command(payload[0] + tp.SERVER_OFFSET, payload[1:]))
+
+        codec.on_subnegotiation = on_sb
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                break
+            payload = codec.feed(data)
+            writer.write(codec.take_replies())
+            if payload:
+                writer.write(codec.encode(payload))
+            await writer.drain()
+        writer.close()
+
+    return handle
+
+
+def test_rfc2217_configures_remote_port():
+    async def scenario():
+        received = []
+        server = await asyncio.start_server(_rfc2217_server(received), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        backend = TelnetBackend(mode="rfc2217")
+        assert await backend.connect('127.0.0.1', port, baudrate=9600, parity='E', stopbits=2, rtscts=True)
+        chunks = []
+        backend.set_data_callback(lambda data: chunks.append(bytes(data)))
+        await backend.send(b"ping\xff")
+        for _ in range(100):
+            if b''.join(chunks) == b"ping\xff":
+                break
+            await asyncio.sleep(0.01)
+
+        await backend.disconnect()
+        server.close()
+        await server.wait_closed()
+        return backend, received, b''.join(chunks)
+
+    backend, received, echoed = asyncio.run(scenario())
+    assert echoed == b"ping\xff"
+    assert backend.baudrate == 9600
+    assert backend.port_settings == {"baudrate": 9600, "parity": "E", "stopbits": 2,
+                                     "flow_control": "rtscts"}
+    assert received[0] == (tp.COM_PORT_OPTION, bytes([tp.SET_BAUDRATE]) + (9600).to_bytes(4, 'big'))
+
+
+def test_tcp_receive_pauses_for_backpressure():
+    payload = bytes(range(256)) * 1024
+
+    async def scenario():
+        async def handle(reader, writer):
+            writer.write(payload)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        backend = TelnetBackend(history_size=8192, mode="raw", read_size=1024)
+        assert await backend.connect('127.0.0.1', server.sockets[0].getsockname()[1])
+        subscription = backend.subscribe('slow', policy='backpressure', max_lag=4096)
+        received = bytearray()
+        paused = False
+        while len(received) < len(payload):
+            await asyncio.wait_for(subscription.wait(), 5)
+            paused = paused or backend.hub.paused
+            received += subscription.read()
+        await backend.disconnect()
+        server.close()
+        await server.wait_closed()
+        return bytes(received), paused, subscription.stats()
+
+    received, paused, stats = asyncio.run(scenario())
+    assert paused
+    assert stats["dropped_bytes"] == 0
+    assert received == payload
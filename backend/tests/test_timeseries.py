@@ -0,0 +1,59 @@
+import asyncio
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.timeseries import SeriesStore
+from app.services.triggers import TriggerRegistry
+from test_triggers import FakeBackend
+
+
+def test_queries_downsample_and_keep_extremes():
+    store = SeriesStore()
+    for i in range(200000):
+        store.append("/dev/ttyACM0", "rssi", math.sin(i / 1000), timestamp=1000 + i)
+    store.append("/dev/ttyACM0", "rssi", 50.0, timestamp=300000)
+
+    started = time.perf_counter()
+    lttb = store.query("/dev/ttyACM0", "rssi", points=500)
+    elapsed = time.perf_counter() - started
+    minmax = store.query("/dev/ttyACM0", "rssi", start=1000, end=300000, points=500, mode="minmax")
+    window = store.query("/dev/ttyACM0", "rssi", start=1010, end=1019, points=500)
+
+    assert elapsed < 0.5
+    assert lttb["total"] == 200001 and len(lttb["t"]) == 500
+    assert lttb["t"] == sorted(lttb["t"])
+    # The spike and both ends survive downsampling
+    assert lttb["t"][0] == 1000 and lttb["v"][-1] == 50.0
+    assert len(minmax["v"]) <= 500 and max(minmax["v"]) == 50.0
+    assert min(minmax["v"]) == min(math.sin(i / 1000) for i in range(200000))
+    assert window["t"] == [float(t) for t in range(1010, 1020)]
+
+
+def test_retention_drops_oldest_samples():
+    store = SeriesStore(max_points=800)
+    for i in range(1000):
+        store.append("COM3", "heap", i, timestamp=i)
+    info = store.list()[0]
+    assert info["points"] <= 900 and info["end"] == 999
+    assert info["points"] + info["dropped"] == 1000
+
+
+def test_slice_rules_record_numbers():
+    async def scenario():
+        registry = TriggerRegistry()
+        registry.set_rules([
+            {"id": "heap", "type": "slice", "pattern": "heap free: ", "series": "heap"},
+            {"id": "temp", "type": "slice", "pattern": r"T=(\S+)", "regex": True, "series": "temp"},
+        ])
+        backend = FakeBackend()
+        registry.attach("/dev/ttyACM0", backend)
+        backend.receive(b"heap free: 1234 bytes\nT=21.5C\nheap free: n/a\nheap free: -2e3\n")
+        return registry.series
+
+    series = asyncio.run(scenario())
+    assert series.query("/dev/ttyACM0", "heap", mode="raw")["v"] == [1234.0, -2000.0]
+    assert series.query("/dev/ttyACM0", "temp", mode="raw")["v"] == [21.5]
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import threading
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.transmit import TransmitWorker
+
+
+class BlockingWriter:
+    """Records writes; the first write blocks until released."""
+
+    def __init__(self):
+        self.writes = []
+        self.release = threading.Event()
+
+    def write(self, data):
+        if not self.writes:
+            self.writes.append(data)
+            self.release.wait(5)
+            return
+        self.writes.append(data)
+
+
+def test_queued_writes_are_merged_in_order():
+    async def scenario():
+        writer = BlockingWriter()
+        worker = TransmitWorker(writer.write, name='test')
+        first = worker.submit(b'a')
+        await asyncio.sleep(0.05)
+        # Queued while the first write is still in progress
+        rest = [worker.submit(bytes([c])) for c in b'bcdef']
+        writer.release.set()
+        await asyncio.gather(first, *rest)
+        await worker.close()
+        return writer.writes, worker.stats()
+
+    writes, stats = asyncio.run(scenario())
+    assert writes == [b'a', b'bcdef']
+    assert stats['writes'] == 6
+    assert stats['syscalls'] == 2
+    assert stats['max_merged'] == 5
+
+
+def test_merge_limit_splits_large_batches():
+    async def scenario():
+        writer = BlockingWriter()
+        worker = TransmitWorker(writer.write, name='test', merge_limit=4)
+        futures = [worker.submit(b'xx') for _ in range(5)]
+        writer.release.set()
+        await asyncio.gather(*futures)
+        await worker.close()
+        return writer.writes
+
+    writes = asyncio.run(scenario())
+    assert b''.join(writes) == b'xx' * 5
+    assert all(len(chunk) <= 4 for chunk in writes)
+
+
+def test_write_errors_fail_the_batch_futures():
+    def failing_write(data):
+        raise OSError("device gone")
+
+    async def scenario():
+        worker = TransmitWorker(failing_write, name='test')
+        future = worker.submit(b'data')
+        try:
+            await future
+        except OSError as e:
+            return str(e)
+        finally:
+            await worker.close()
+
+    assert asyncio.run(scenario()) == "device gone"
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.backends.base import BaseBackend
+from app.backends.pattern_matcher import MultiPatternMatcher
+from app.services import triggers
+from app.services.port_share import TxArbiter
+from app.services.triggers import TriggerRegistry
+
+
+class FakeBackend(BaseBackend):
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def connect(self, **kwargs):
+        return True
+
+    async def disconnect(self):
+        pass
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    def is_connected(self):
+        return True
+
+    def receive(self, data):
+        self.hub.publish(data)
+
+
+def test_matcher_finds_overlapping_patterns_across_chunks():
+    matcher = MultiPatternMatcher([b"he", b"she", b"hers", b"aa"])
+    matches = matcher.feed(b"ush") + matcher.feed(b"ers aaaa")
+    assert matches == [(1, 4), (0, 4), (2, 6), (3, 9), (3, 11)]
+    assert matcher.position == 11
+
+
+def test_rules_run_without_clients(monkeypatch):
+    monkeypatch.setattr(triggers, "EVENT_INTERVAL", 0.01)
+
+    async def scenario():
+        registry = TriggerRegistry()
+        updates = []
+        registry.add_listener(updates.extend)
+        registry.set_rules([
+            {"id": "boots", "type": "count", "pattern": "Booting"},
+            {"id": "light", "type": "traffic", "pattern": "PASS", "alert_pattern": "FAIL"},
+            {"id": "temp", "type": "slice", "pattern": "temp=", "end": "C"},
+            {"id": "volts", "type": "slice", "pattern": r"vbat (\d+)mV", "regex": True},
+            {"id": "login", "type": "respond", "pattern": "login:", "response": "root"},
+            {"id": "other", "type": "count", "pattern": "Booting", "port": "/dev/ttyUSB9"},
+        ])
+        backend = FakeBackend()
+        registry.attach("/dev/ttyACM0", backend)
+        backend.receive(b"Boot")
+        backend.receive(b"ing\r\n\x1b[31mFAIL\x1b[0m temp=2")
+        backend.receive(b"3.5C\nvbat 3300mV\nlogin: Booting\n")
+        await asyncio.sleep(0.05)
+        return registry, backend, updates
+
+    registry, backend, updates = asyncio.run(scenario())
+    rules = {rule["id"]: rule for rule in registry.snapshot()}
+    assert rules["boots"]["count"] == 2
+    assert rules["light"]["state"] == "red"
+    assert rules["temp"]["value"] == "23.5"
+    assert rules["volts"]["value"] == "3300"
+    assert rules["other"]["count"] == 0
+    # Answered by the server, no client round trip
+    assert backend.sent == [b"root\n"]
+    # Changes arrive batched, one update per rule
+    assert sorted(update["id"] for update in updates) == ["boots", "light", "login", "temp", "volts"]
+
+
+def test_set_rules_keeps_state_and_detach_stops_matching():
+    async def scenario():
+        registry = TriggerRegistry()
+        registry.set_rules([{"id": "boots", "type": "count", "pattern": "Booting"}])
+        backend = FakeBackend()
+        registry.attach("/dev/ttyACM0", backend)
+        backend.receive(b"Booting\n")
+        registry.set_rules([{"id": "boots", "type": "count", "pattern": "Boot"}])
+        backend.receive(b"Boot\n")
+        registry.detach_backend(backend)
+        backend.receive(b"Boot\n")
+        return registry.snapshot()[0]["count"], backend.hub.subscriber_count
+
+    assert asyncio.run(scenario()) == (2, 0)
+
+
+def test_responses_respect_the_tx_lease():
+    arbiter = TxArbiter("lease", lease=60)
+
+    async def scenario():
+        registry = TriggerRegistry(claim_tx=lambda port, owner: arbiter.claim(owner),
+                                   release_tx=lambda port, owner: arbiter.release(owner))
+        registry.set_rules([{"id": "login", "type": "respond", "pattern": "login:", "response": "root"}])
+        backend = FakeBackend()
+        registry.attach("/dev/ttyACM0", backend)
+        arbiter.claim("ws:1")
+        backend.receive(b"login: ")
+        arbiter.release("ws:1")
+        registry.rules["login"].cooldown = 0
+        backend.receive(b"login: ")
+        await asyncio.sleep(0.01)
+        return backend.sent, registry.stats()[0]
+
+    sent, stats = asyncio.run(scenario())
+    assert sent == [b"root\n"]
+    assert stats["responses"] == 1 and stats["refused_responses"] == 1
+    # The lease is given back once the response is written
+    assert arbiter.owner is None
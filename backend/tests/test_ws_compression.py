@@ -0,0 +1,76 @@
+import sys
+import os
+import zlib
+from types import SimpleNamespace
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import websocket
+from app.config import get_settings
+from app.services.compression import FrameCompressor, COMPRESS_SUBPROTOCOL, DEFLATE_FRAME, LENGTH, RAW_FRAME
+
+
+class Inflater:
+    """Decodes frames the way the browser does, with one stream per connection."""
+
+    def __init__(self):
+        self._stream = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def __call__(self, frame: bytes) -> bytes:
+        if frame[:1] == RAW_FRAME:
+            return frame[1:]
+        (length,) = LENGTH.unpack_from(frame, 1)
+        payload = self._stream.decompress(frame[1 + LENGTH.size:])
+        assert len(payload) == length
+        return payload
+
+
+def fake_websocket(subprotocols=(), **query):
+    return SimpleNamespace(scope={"subprotocols": list(subprotocols)}, query_params=query)
+
+
+def test_small_echo_is_sent_raw():
+    compressor = FrameCompressor(threshold=256)
+    frame = compressor.encode(b'ls\r\n')
+    assert frame == RAW_FRAME + b'ls\r\n'
+    stats = compressor.stats()
+    assert stats["compressed_frames"] == 0
+    assert stats["compressed_bytes"] == len(frame)
+    assert compressor.cpu_time == 0
+
+
+def test_repetitive_logs_shrink_and_round_trip():
+    compressor = FrameCompressor(threshold=256)
+    inflate = Inflater()
+    log = b''.join(b'[00:00:%02d.123,456] <inf> sensor: temp=21.5 humidity=40\r\n' % (i % 60) for i in range(500))
+    chunks = [log[i:i + 4096] for i in range(0, len(log), 4096)]
+    frames = [compressor.encode(chunk) for chunk in chunks]
+    # A prompt echoed in between stays raw without breaking the stream
+    frames.insert(3, compressor.encode(b'uart:~$ '))
+
+    assert [frame[:1] for frame in frames].count(DEFLATE_FRAME) == len(chunks)
+    assert b''.join(inflate(frame) for frame in frames) == log[:3 * 4096] + b'uart:~$ ' + log[3 * 4096:]
+    assert sum(map(len, frames)) * 5 < len(log)
+    stats = compressor.stats()
+    assert stats["compression_ratio"] >= 5
+    assert stats["raw_frames"] == 1
+    assert stats["uncompressed_bytes"] == len(log) + len(b'uart:~$ ')
+
+
+def test_compression_is_opt_in(monkeypatch):
+    settings = get_settings()
+    offered = fake_websocket([COMPRESS_SUBPROTOCOL, websocket.BINARY_SUBPROTOCOL])
+
+    monkeypatch.setattr(settings, "ws_compression_enabled", False)
+    assert websocket._select_frame_mode(offered) == (True, websocket.BINARY_SUBPROTOCOL)
+    assert websocket.frame_compressor(offered, None) is None
+    assert websocket.frame_compressor(fake_websocket(compress='deflate'), None) is None
+
+    monkeypatch.setattr(settings, "ws_compression_enabled", True)
+    assert websocket._select_frame_mode(offered) == (True, COMPRESS_SUBPROTOCOL)
+    assert websocket.frame_compressor(offered, COMPRESS_SUBPROTOCOL) is not None
+    # Clients that did not ask get plain frames
+    assert websocket.frame_compressor(fake_websocket(), None) is None
+    compressor = websocket.frame_compressor(fake_websocket(compress='deflate', compress_threshold='64'), None)
+    assert compressor.threshold == 64
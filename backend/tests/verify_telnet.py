@@ -51,6 +51,8 @@ async def test_client():
     received_data = asyncio.Queue()
     
     def on_data(data):
+        # The chunk may be a view of the receive buffer; keep a copy
+        data = bytes(data)
         print(f"Test Client: Callback received {data!r}")
         received_data.put_nowait(data)
         
@@ -12,11 +12,13 @@ function terminalApp() {
         connectionMode: 'serial', // 'serial' or 'telnet'
         telnetHost: 'localhost',
         telnetPort: '23',
+        telnetMode: 'raw', // 'raw', 'telnet' or 'rfc2217'
         baudRate: '115200',
         logFileName: '',
         logMode: 'printable', // 'printable' or 'raw'
         omitSent: true, // Whether to omit transmitted data from logs
         availablePorts: [],
+        portsGeneration: null, // Backend port inventory generation of availablePorts
         loadingPorts: false,
         portMonitorWs: null,
         statusMessage: '',
@@ -133,7 +135,7 @@ function terminalApp() {
         counters: [],
         showCounters: true,
         counterPanelHeight: 'normal', // 'normal' or 'large'
-        lastCounterUpdate: {}, // Store session-specific last chunks for split-text matching
+        triggerSyncTimer: null, // Debounces pushing counter and sequence rules to the backend
 
         // Toast Notification State
         toasts: [],
@@ -149,7 +151,6 @@ function terminalApp() {
             enabled: true
         },
         expandedSequenceId: null,
-        lastSequenceUpdate: {},
         draggedSequenceId: null,
         dragOverSequenceId: null,
         recentlyMovedSequenceId: null,
@@ -186,6 +187,11 @@ function terminalApp() {
                 this.logFileName = savedLogFile;
             }
 
+            const savedTelnetMode = localStorage.getItem('zfield_telnet_mode');
+            if (savedTelnetMode) {
+                this.telnetMode = savedTelnetMode;
+            }
+
             const savedLogMode = localStorage.getItem('zfield_log_mode');
             if (savedLogMode) {
                 this.logMode = savedLogMode;
@@ -239,6 +245,9 @@ function terminalApp() {
             // Load response sequences
             this.loadResponseSequences();
 
+            // Counters and sequences run on the backend
+            this.syncTriggers();
+
             // Explicitly expose flattenedCommands for Alpine to use as a reactive getter
             // Alpine 2.x doesn't always handle ES6 getters in the returned object ideally, 
             // but we can define it on 'this' or use a function.
@@ -375,7 +384,7 @@ function terminalApp() {
 
         saveCounters() {
             const toSave = this.counters.map(c => {
-                const base = { id: c.id, type: c.type, sessionId: c.sessionId };
+                const base = { id: c.id, type: c.type, sessionId: c.sessionId, port: this.counterPort(c) };
 
                 if (c.type === 'text') {
                     return { ...base, text: c.text, count: c.count };
@@ -393,12 +402,14 @@ function terminalApp() {
                         ...base,
                         startText: c.startText,
                         endText: c.endText,
+                        series: c.series || '',
                         extractedValue: c.extractedValue || ''
                     };
                 }
                 return base;
             });
             localStorage.setItem('zfield_counters', JSON.stringify(toSave));
+            this.syncTriggers();
         },
 
         addCounter(type = 'text') {
@@ -428,6 +439,7 @@ function terminalApp() {
                     ...baseCounter,
                     startText: '',
                     endText: '',
+                    series: '',
                     extractedValue: ''
                 };
             }
@@ -446,6 +458,7 @@ function terminalApp() {
             if (counter) {
                 counter.count = 0;
                 this.saveCounters();
+                this.resetTriggers(id);
             }
         },
 
@@ -454,6 +467,7 @@ function terminalApp() {
             if (confirm('Reset all counter values to zero?')) {
                 this.counters.forEach(c => c.count = 0);
                 this.saveCounters();
+                this.counters.forEach(c => this.resetTriggers(c.id));
                 this.showStatus('All counters reset', 'success');
             }
         },
@@ -509,98 +523,99 @@ function terminalApp() {
             localStorage.setItem('zfield_welcome_shown', 'true');
         },
 
-        updateCounters(sessionId, rawData) {
-            if (this.counters.length === 0) return;
-
-            // Clean ANSI for counting
-            const cleanData = rawData.replace(/\x1b\[[0-9;]*m/g, '').replace(/\x1b\[[0-9]*C/g, '');
-
-            this.counters.forEach(counter => {
-                if (counter.sessionId !== 'all' && counter.sessionId !== sessionId) return;
+        // Port a counter watches ('all', or the port of its session)
+        counterPort(counter) {
+            if (!counter.sessionId || counter.sessionId === 'all') return 'all';
+            const session = this.sessions.find(s => s.id === counter.sessionId);
+            return session ? session.port : (counter.port || counter.sessionId);
+        },
 
-                // Route to type-specific handler
-                if (counter.type === 'text') {
-                    this.updateTextCounter(counter, cleanData, sessionId);
-                } else if (counter.type === 'traffic') {
-                    this.updateTrafficCounter(counter, cleanData, sessionId);
-                } else if (counter.type === 'slicer') {
-                    this.updateSlicerCounter(counter, cleanData, sessionId);
+        // Backend trigger rules for the counters and response sequences
+        triggerRules() {
+            const rules = [];
+            this.counters.forEach(c => {
+                const base = { id: c.id, port: this.counterPort(c) };
+                if (c.type === 'text' && c.text && c.text.trim()) {
+                    rules.push({ ...base, type: 'count', pattern: c.text, count: c.count || 0 });
+                } else if (c.type === 'traffic' && ((c.greenText || '').trim() || (c.redText || '').trim())) {
+                    rules.push({
+                        ...base,
+                        type: 'traffic',
+                        pattern: (c.greenText || '').trim() ? c.greenText : '',
+                        alert_pattern: (c.redText || '').trim() ? c.redText : '',
+                        reset_after: (parseInt(c.resetTimer) || 5000) / 1000
+                    });
+                } else if (c.type === 'slicer' && c.startText && c.startText.trim()) {
+                    rules.push({
+                        ...base,
+                        type: 'slice',
+                        pattern: c.startText,
+                        end: (c.endText || '').trim() ? c.endText : '',
+                        series: (c.series || '').trim()
+                    });
                 }
             });
+            this.responseSequences.forEach(seq => {
+                if (!seq.trigger || !seq.command) return;
+                rules.push({ id: seq.id, type: 'respond', port: 'all', pattern: seq.trigger, response: seq.command, enabled: seq.enabled !== false });
+            });
+            return rules;
         },
 
-        updateTextCounter(counter, cleanData, sessionId) {
-            if (!counter.text || counter.text.trim().length === 0) return;
-
-            // Handle split chunks by keeping a small overlap buffer
-            const search = counter.text;
-            const bufferKey = sessionId + '_' + counter.id;
-            const combined = (this.lastCounterUpdate[bufferKey] || '') + cleanData;
-
-            // Count occurrences
-            const parts = combined.split(search);
-            const occurrences = parts.length - 1;
-
-            if (occurrences > 0) {
-                counter.count += occurrences;
-
-                // Leading-edge debounce for highlight effect
-                if (!counter.justUpdated) {
-                    counter.justUpdated = true;
-                    setTimeout(() => { counter.justUpdated = false; }, 1000);
+        // Push the rules to the backend (debounced while typing)
+        syncTriggers() {
+            clearTimeout(this.triggerSyncTimer);
+            this.triggerSyncTimer = setTimeout(async () => {
+                try {
+                    const response = await fetch('/api/triggers', {
+                        method: 'PUT',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ rules: this.triggerRules() })
+                    });
+                    const data = await response.json();
+                    if (data.status === 'error') {
+                        this.showStatus('Counter rules rejected: ' + data.message, 'error');
+                    } else {
+                        this.applyTriggerUpdates(data.rules || [], false);
+                    }
+                } catch (error) {
+                    console.error('Error syncing trigger rules:', error);
                 }
-            }
-
-            // Store tail for next update
-            const tailLen = search.length - 1;
-            if (tailLen > 0) {
-                this.lastCounterUpdate[bufferKey] = combined.slice(-tailLen);
-            } else {
-                this.lastCounterUpdate[bufferKey] = '';
-            }
+            }, 300);
         },
 
-        updateTrafficCounter(counter, cleanData, sessionId) {
-            const bufferKey = sessionId + '_' + counter.id;
-            const combined = (this.lastCounterUpdate[bufferKey] || '') + cleanData;
-
-            let stateChanged = false;
-
-            // Check for green pattern
-            if (counter.greenText && counter.greenText.trim() && combined.includes(counter.greenText)) {
-                counter.state = 'green';
-                counter.lastUpdate = Date.now();
-                stateChanged = true;
-            }
-
-            // Check for red pattern (overrides green)
-            if (counter.redText && counter.redText.trim() && combined.includes(counter.redText)) {
-                counter.state = 'red';
-                counter.lastUpdate = Date.now();
-                stateChanged = true;
+        async resetTriggers(id) {
+            try {
+                await fetch('/api/triggers/reset', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ id })
+                });
+            } catch (error) {
+                console.error('Error resetting trigger:', error);
             }
+        },
 
-            // Schedule reset to yellow if state changed
-            if (stateChanged) {
-                this.scheduleTrafficReset(counter);
+        // Apply counter, traffic light and slicer values computed by the backend
+        applyTriggerUpdates(updates, highlight = true) {
+            updates.forEach(update => {
+                const counter = this.counters.find(c => c.id === update.id);
+                if (!counter) return;
+                if (counter.type === 'text') {
+                    counter.count = update.count;
+                } else if (counter.type === 'traffic') {
+                    counter.state = update.state;
+                    counter.lastUpdate = Date.now();
+                    if (update.state !== 'yellow') this.scheduleTrafficReset(counter);
+                } else if (counter.type === 'slicer') {
+                    counter.extractedValue = update.value || '';
+                }
 
-                // Visual feedback
-                if (!counter.justUpdated) {
+                if (highlight && !counter.justUpdated) {
                     counter.justUpdated = true;
                     setTimeout(() => { counter.justUpdated = false; }, 1000);
                 }
-            }
-
-            // Store tail
-            const maxLen = Math.max(
-                (counter.greenText || '').length,
-                (counter.redText || '').length
-            );
-            if (maxLen > 0) {
-                this.lastCounterUpdate[bufferKey] = combined.slice(-(maxLen - 1));
-            } else {
-                this.lastCounterUpdate[bufferKey] = '';
-            }
+            });
         },
 
         scheduleTrafficReset(counter) {
@@ -617,48 +632,6 @@ function terminalApp() {
             }, resetTime);
         },
 
-        updateSlicerCounter(counter, cleanData, sessionId) {
-            if (!counter.startText || counter.startText.trim().length === 0) return;
-
-            const bufferKey = sessionId + '_' + counter.id;
-            const combined = (this.lastCounterUpdate[bufferKey] || '') + cleanData;
-
-            const startIdx = combined.lastIndexOf(counter.startText);
-            if (startIdx === -1) {
-                // Keep reasonable buffer for split chunks
-                this.lastCounterUpdate[bufferKey] = combined.slice(-200);
-                return;
-            }
-
-            const afterStart = combined.substring(startIdx + counter.startText.length);
-
-            // Extract until end text or newline
-            const endText = (counter.endText && counter.endText.trim()) || '\n';
-            const endIdx = afterStart.indexOf(endText);
-
-            if (endIdx !== -1) {
-                const extracted = afterStart.substring(0, endIdx).trim();
-                if (extracted !== counter.extractedValue) {
-                    counter.extractedValue = extracted;
-
-                    // Visual feedback
-                    if (!counter.justUpdated) {
-                        counter.justUpdated = true;
-                        setTimeout(() => { counter.justUpdated = false; }, 1000);
-                    }
-                }
-            } else {
-                // End not found yet, show partial with ellipsis
-                const partial = afterStart.substring(0, 50).trim();
-                if (partial) {
-                    counter.extractedValue = partial + (afterStart.length > 50 ? '...' : '');
-                }
-            }
-
-            // Store tail for split chunks
-            this.lastCounterUpdate[bufferKey] = combined.slice(-300);
-        },
-
         // Initialize terminal (returns term instance, doesn't attach yet if container not found)
         initTerminal(session, containerId) {
             if (session.terminal) return { term: session.terminal, fitAddon: session.fitAddon };
@@ -960,6 +933,7 @@ function terminalApp() {
                         this.counters = project.data.counters;
                         this.saveCounters();
                     }
+                    this.saveResponseSequences();
                 }
 
                 // Restore Sessions (Closed state)
@@ -1162,13 +1136,13 @@ function terminalApp() {
             }
         },
 
-        // Load available serial ports
-        async loadPorts() {
+        // Load available serial ports (served from the backend's cache unless refresh is requested)
+        async loadPorts(refresh = false) {
             this.loadingPorts = true;
             try {
-                const response = await fetch('/api/ports');
+                const response = await fetch(refresh ? '/api/ports?refresh=true' : '/api/ports');
                 const data = await response.json();
-                this.updatePortsList(data.ports || []);
+                this.updatePortsList(data.ports || [], data.generation);
             } catch (error) {
                 console.error('Error loading ports:', error);
                 this.showStatus('Error loading ports: ' + error.message, 'error');
@@ -1178,9 +1152,10 @@ function terminalApp() {
         },
 
         // Update ports list (called by loadPorts and port monitor)
-        updatePortsList(ports) {
+        updatePortsList(ports, generation = null) {
             const previousPort = this.selectedPort;
             this.availablePorts = ports;
+            this.portsGeneration = generation ?? null;
 
             // If no port selected and ports available, select first one
             if (!this.selectedPort && this.availablePorts.length > 0) {
@@ -1199,6 +1174,20 @@ function terminalApp() {
             }
         },
 
+        // Apply added/removed/changed ports on top of the snapshot they were computed from
+        applyPortsDelta(delta) {
+            if (this.portsGeneration !== delta.base_generation) {
+                // Missed an update: fetch the whole list instead
+                this.loadPorts();
+                return;
+            }
+            const ports = new Map(this.availablePorts.map(p => [p.device, p]));
+            delta.removed.forEach(device => ports.delete(device));
+            [...delta.added, ...delta.changed].forEach(p => ports.set(p.device, p));
+            const sorted = [...ports.values()].sort((a, b) => (a.device < b.device ? -1 : a.device > b.device ? 1 : 0));
+            this.updatePortsList(sorted, delta.generation);
+        },
+
         // Start port monitoring via WebSocket
         startPortMonitoring() {
             // Close existing connection if any
@@ -1213,26 +1202,20 @@ function terminalApp() {
             const wsUrl = `${protocol}//${host}/ws/ports`;
 
             try {
-                this.portMonitorWs = new WebSocket(wsUrl);
+                this.portMonitorWs = new WebSocket(wsUrl, this.wantsCompression() ? ['zfield.deflate'] : []);
+                this.portMonitorWs.binaryType = 'arraybuffer';
 
                 this.portMonitorWs.onopen = () => {
                     console.log('Port monitoring WebSocket connected');
                 };
 
+                // Compressed frames inflate asynchronously from one stream per
+                // connection; chain them to keep order
+                let received = Promise.resolve();
+                let inflate = null;
                 this.portMonitorWs.onmessage = (event) => {
-                    try {
-                        const data = JSON.parse(event.data);
-                        console.log('Port monitor message received:', data.type, data.ports?.length || 0, 'ports');
-                        if (data.type === 'ports_changed') {
-                            console.log('Ports changed, updating list:', data.ports);
-                            this.updatePortsList(data.ports);
-                        } else if (data.type === 'keepalive') {
-                            // Keepalive message, no action needed
-                            console.log('Port monitor keepalive received');
-                        }
-                    } catch (error) {
-                        console.error('Error parsing port monitor message:', error, event.data);
-                    }
+                    if (event.data instanceof ArrayBuffer && !inflate) inflate = this.createInflater();
+                    received = received.then(() => this.handlePortMonitorMessage(event.data, inflate));
                 };
 
                 this.portMonitorWs.onerror = (error) => {
@@ -1255,6 +1238,30 @@ function terminalApp() {
             }
         },
 
+        // Handle one port monitor message (JSON text or a compressed frame)
+        async handlePortMonitorMessage(message, inflate) {
+            try {
+                const raw = message instanceof ArrayBuffer
+                    ? new TextDecoder().decode(await inflate(message))
+                    : message;
+                const data = JSON.parse(raw);
+                console.log('Port monitor message received:', data.type, data.ports?.length || 0, 'ports');
+                if (data.type === 'ports_changed') {
+                    console.log('Ports changed, updating list:', data.ports);
+                    this.updatePortsList(data.ports, data.generation);
+                } else if (data.type === 'ports_delta') {
+                    this.applyPortsDelta(data);
+                } else if (data.type === 'triggers') {
+                    this.applyTriggerUpdates(data.updates);
+                } else if (data.type === 'keepalive') {
+                    // Keepalive message, no action needed
+                    console.log('Port monitor keepalive received');
+                }
+            } catch (error) {
+                console.error('Error parsing port monitor message:', error, message);
+            }
+        },
+
         // Check connection status
         async checkStatus() {
             try {
@@ -1909,7 +1916,15 @@ function terminalApp() {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
             const wsUrl = `${protocol}//${window.location.host}/ws?port=${encodeURIComponent(session.port)}`;
 
-            session.ws = new WebSocket(wsUrl);
+            // Ask for raw binary frames; xterm.js consumes bytes directly and a
+            // streaming decoder keeps split UTF-8 characters intact for counters
+            const protocols = ['zfield.binary', 'zfield.text'];
+            if (this.wantsCompression()) protocols.unshift('zfield.deflate');
+            session.ws = new WebSocket(wsUrl, protocols);
+            session.ws.binaryType = 'arraybuffer';
+            session.rxDecoder = new TextDecoder('utf-8');
+            session.rxChain = null;
+            session.inflate = null;
 
             session.ws.onopen = () => {
                 console.log(`WebSocket connected for ${session.port}`);
@@ -1926,45 +1941,35 @@ function terminalApp() {
             };
 
             session.ws.onmessage = (event) => {
-                if (this.commandDiscoveryInProgress && this.activeSessionId === session.id) {
-                    this.discoveryCollectedData += event.data;
+                const binary = event.data instanceof ArrayBuffer;
+                if (binary && session.ws.protocol === 'zfield.deflate') {
+                    // Frames inflate asynchronously; chain them to keep order
+                    const inflate = session.inflate || (session.inflate = this.createInflater());
+                    session.rxChain = (session.rxChain || Promise.resolve())
+                        .then(() => inflate(event.data))
+                        .then(bytes => this.handleTerminalOutput(session, bytes))
+                        .catch(error => console.error('Error decoding terminal frame:', error));
+                    return;
                 }
+                const isControl = binary ? false
+                    : session.ws.protocol === 'zfield.binary'
+                    || session.ws.protocol === 'zfield.deflate'
+                    || (event.data.length < 100 && event.data.trim().startsWith('{'));
 
-                if (event.data.length < 100 && event.data.trim().startsWith('{')) {
+                if (isControl) {
                     try {
                         const data = JSON.parse(event.data);
                         if (data.type === 'error') {
                             if (session.terminal) session.terminal.writeln('\r\n[Error] ' + data.message);
                             this.showToast(data.message, 'error');
+                        } else if (data.type === 'status') {
+                            this.handlePortState(session, data.state);
                         }
                         return;
                     } catch (e) { }
                 }
 
-                if (session.terminal) {
-                    session.terminal.write(event.data);
-                }
-
-                // Store terminal output for prompt detection
-                if (!session.terminalBuffer) {
-                    session.terminalBuffer = '';
-                }
-                session.terminalBuffer += event.data;
-                // Keep buffer size reasonable (last 5000 chars)
-                if (session.terminalBuffer.length > 5000) {
-                    session.terminalBuffer = session.terminalBuffer.slice(-5000);
-                }
-
-                // Detect prompt string if not already detected
-                if (!session.promptString || session.promptString === '') {
-                    this.detectPromptString(session);
-                }
-
-                // Update counters
-                this.updateCounters(session.id, event.data);
-
-                // Process response sequences
-                this.processResponseSequences(session.id, event.data);
+                this.handleTerminalOutput(session, binary ? new Uint8Array(event.data) : event.data);
             };
 
             session.ws.onerror = (error) => {
@@ -1982,6 +1987,93 @@ function terminalApp() {
             };
         },
 
+        // Reflect the backend reconnecting a lost port (e.g. a board reset)
+        handlePortState(session, state) {
+            const labels = {
+                reconnecting: 'Device lost, reconnecting...',
+                connected: 'Reconnected',
+                disconnected: 'Reconnect failed'
+            };
+            if (session.terminal) session.terminal.writeln(`\r\n[${labels[state] || state}]`);
+            session.connected = state !== 'disconnected';
+            this.updateCanExecuteScripts();
+            this.showToast(`${session.port}: ${labels[state] || state}`, state === 'connected' ? 'success' : 'warning');
+        },
+
+        // Feed received terminal data (bytes or text) to the terminal and the
+        // counters, discovery and prompt detection that watch the output
+        handleTerminalOutput(session, data) {
+            let text;
+            if (data instanceof Uint8Array) {
+                if (session.terminal) {
+                    session.terminal.write(data);
+                }
+                text = session.rxDecoder.decode(data, { stream: true });
+            } else {
+                text = data;
+                if (session.terminal) {
+                    session.terminal.write(text);
+                }
+            }
+
+            if (this.commandDiscoveryInProgress && this.activeSessionId === session.id) {
+                this.discoveryCollectedData += text;
+            }
+
+            // Store terminal output for prompt detection
+            if (!session.terminalBuffer) {
+                session.terminalBuffer = '';
+            }
+            session.terminalBuffer += text;
+            // Keep buffer size reasonable (last 5000 chars)
+            if (session.terminalBuffer.length > 5000) {
+                session.terminalBuffer = session.terminalBuffer.slice(-5000);
+            }
+
+            // Detect prompt string if not already detected
+            if (!session.promptString || session.promptString === '') {
+                this.detectPromptString(session);
+            }
+
+        },
+
+        // Build the frame decoder of one compressed ('zfield.deflate') WebSocket.
+        // The first byte of a frame is 0 for a raw payload or 1 for the payload
+        // length (4 bytes, big endian) followed by the next piece of the
+        // connection's DEFLATE stream, so one DecompressionStream serves all
+        // frames. Call it for one frame at a time, in order.
+        createInflater() {
+            const stream = new DecompressionStream('deflate-raw');
+            const writer = stream.writable.getWriter();
+            const reader = stream.readable.getReader();
+            let pending = new Uint8Array(0);
+            return async (buffer) => {
+                const frame = new Uint8Array(buffer);
+                if (frame[0] === 0) return frame.subarray(1);
+                const length = new DataView(buffer).getUint32(1);
+                // Not awaited: the write settles only once its output is read
+                writer.write(frame.subarray(5)).catch(() => {});
+                while (pending.length < length) {
+                    const { value, done } = await reader.read();
+                    if (done) throw new Error('Compressed stream ended');
+                    const merged = new Uint8Array(pending.length + value.length);
+                    merged.set(pending);
+                    merged.set(value, pending.length);
+                    pending = merged;
+                }
+                const payload = pending.subarray(0, length);
+                pending = pending.subarray(length);
+                return payload;
+            };
+        },
+
+        // Compression pays off over slow remote links; on the local machine it
+        // only costs CPU, so it is requested for remote hosts only
+        wantsCompression() {
+            const localHosts = ['localhost', '127.0.0.1', '[::1]'];
+            return typeof DecompressionStream !== 'undefined' && !localHosts.includes(window.location.hostname);
+        },
+
         // Disconnect from active session
         async disconnect() {
             const session = this.activeSession;
@@ -2090,6 +2182,7 @@ function terminalApp() {
                 }
                 localStorage.setItem('zfield_log_mode', this.logMode);
                 localStorage.setItem('zfield_omit_sent', this.omitSent);
+                localStorage.setItem('zfield_telnet_mode', this.telnetMode);
 
                 const response = await fetch('/api/connect', {
                     method: 'POST',
@@ -2098,6 +2191,7 @@ function terminalApp() {
                         port: portToConnect,
                         baudrate: parseInt(this.baudRate) || 115200,
                         connection_type: this.connectionMode,
+                        telnet_mode: this.telnetMode,
                         log_file: this.logFileName,
                         log_mode: this.logMode,
                         log_tx: !this.omitSent
@@ -4122,6 +4216,7 @@ function terminalApp() {
 
         saveResponseSequences() {
             localStorage.setItem('zephyr_sequences', JSON.stringify(this.responseSequences));
+            this.syncTriggers();
         },
 
         openResponseSequenceModal() {
@@ -4186,43 +4281,6 @@ function terminalApp() {
                     }
                 }, 2000);
             }
-        },
-
-        processResponseSequences(sessionId, rawData) {
-            if (!rawData || this.commandDiscoveryInProgress) return;
-            // Clean ANSI
-            const cleanData = rawData.replace(/\x1b\[[0-9;]*m/g, '').replace(/\x1b\[[0-9]*C/g, '');
-
-            this.responseSequences.forEach(seq => {
-                if (!seq.enabled || !seq.trigger || !seq.command) return;
-
-                const search = seq.trigger;
-                const bufferKey = sessionId + '_' + seq.id;
-                const combined = (this.lastSequenceUpdate[bufferKey] || '') + cleanData;
-
-                if (combined.includes(search)) {
-                    console.log(`Trigger matched: "${search}" in session ${sessionId}. Executing: "${seq.command}"`);
-
-                    // Send command to the same session that triggered it
-                    const session = this.sessions.find(s => s.id === sessionId);
-                    if (session && session.ws && session.ws.readyState === WebSocket.OPEN) {
-                        session.ws.send(seq.command + '\n');
-                    }
-
-                    // Clear the matched part from buffer to prevent immediate re-triggering 
-                    // if it happens to stay in the overlap.
-                    // Actually, for simplicity we'll just reset the buffer.
-                    this.lastSequenceUpdate[bufferKey] = '';
-                } else {
-                    // Store tail for next update
-                    const tailLen = search.length - 1;
-                    if (tailLen > 0) {
-                        this.lastSequenceUpdate[bufferKey] = combined.slice(-tailLen);
-                    } else {
-                        this.lastSequenceUpdate[bufferKey] = '';
-                    }
-                }
-            });
         }
     };
 }
\ No newline at end of file